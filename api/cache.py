@@ -0,0 +1,221 @@
+# api/cache.py - Response cache for report endpoints
+"""
+Response cache keyed on endpoint, query parameters and data version.
+
+Report responses only change when the scraper commits new data, and
+every such commit bumps the counter in the data_version table (see
+bump_data_version in src/ingest.py). The current version is part of the
+cache key, so a bump makes every older entry unreachable; the TTL and
+LRU bound only reclaim their memory. The version is read from the
+database at most once per DATA_VERSION_TTL seconds, which bounds how
+stale a response can be after a commit. A database without the
+data_version table (e.g. a Postgres warehouse nothing has written to
+yet) reads as version 0, so entries then only expire by TTL.
+
+Each cached body carries a strong ETag (hash of the body). A request
+whose If-None-Match matches gets a 304 without a body.
+
+The default backend is an in-process LRU with TTL. Setting CACHE_URL to
+a redis:// URL shares entries between API workers (needs the optional
+redis package).
+
+Cache bookkeeping never fails a request: if the version lookup or the
+backend errors, the response is computed as on a miss.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency
+    redis = None
+
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+DATA_VERSION_TTL = float(os.getenv("DATA_VERSION_TTL", "1"))
+
+LATENCY_SAMPLES = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """LRU of (expires_at, value) entries, bounded by max_entries"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared backend; values are (body, etag) pairs stored as JSON"""
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("CACHE_URL points at redis but the redis package is not installed")
+        self.client = redis.from_url(url)
+
+    async def get(self, key):
+        value = await self.client.get(key)
+        if value is None:
+            return None
+        body, etag = json.loads(value)
+        return body.encode(), etag
+
+    async def set(self, key, value, ttl):
+        body, etag = value
+        await self.client.set(key, json.dumps([body.decode(), etag]), ex=max(1, int(ttl)))
+
+
+def make_backend(url=CACHE_URL):
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    return MemoryBackend()
+
+
+class CacheMetrics:
+    """Per-endpoint hit/miss/304 counts and recent latencies"""
+
+    def __init__(self):
+        self.counts = defaultdict(lambda: {"hits": 0, "misses": 0, "not_modified": 0})
+        self.latencies = defaultdict(lambda: {"hit": deque(maxlen=LATENCY_SAMPLES),
+                                              "miss": deque(maxlen=LATENCY_SAMPLES)})
+
+    def record(self, endpoint, hit, not_modified, seconds):
+        counts = self.counts[endpoint]
+        counts["hits" if hit else "misses"] += 1
+        counts["not_modified"] += not_modified
+        self.latencies[endpoint]["hit" if hit else "miss"].append(seconds * 1000)
+
+    def snapshot(self):
+        report = {}
+        for endpoint, counts in self.counts.items():
+            lookups = counts["hits"] + counts["misses"]
+            report[endpoint] = {
+                **counts,
+                "hit_rate": round(counts["hits"] / lookups, 4) if lookups else None,
+                "latency_ms": {
+                    kind: latency_summary(samples)
+                    for kind, samples in self.latencies[endpoint].items()
+                },
+            }
+        return report
+
+
+def latency_summary(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+class ResponseCache:
+    """Caches JSON responses until the data version changes or the TTL runs out"""
+
+    def __init__(self, session_factory, backend=None, ttl=CACHE_TTL, version_ttl=DATA_VERSION_TTL):
+        self.session_factory = session_factory
+        self.backend = backend or make_backend()
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self.metrics = CacheMetrics()
+        self._version = None
+        self._version_read_at = 0.0
+
+    @property
+    def version(self):
+        """Data version seen last, None before the first request"""
+        return self._version
+
+    async def data_version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._version_read_at >= self.version_ttl:
+            try:
+                async with self.session_factory() as db:
+                    result = await db.execute(text("SELECT version FROM data_version WHERE name = 'warehouse'"))
+                    self._version = result.scalar() or 0
+            except SQLAlchemyError as e:
+                # Missing table or unreachable database: fall back to TTL-only expiry
+                logger.warning(f"data_version lookup failed, using version 0: {e}")
+                self._version = 0
+            self._version_read_at = now
+        return self._version
+
+    def key(self, request, version):
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"api:{version}:{request.url.path}?{params}"
+
+    async def respond(self, request: Request, compute):
+        """Serve from cache, or await compute() for the payload and cache it"""
+        start = time.perf_counter()
+        endpoint = request.scope["route"].path if "route" in request.scope else request.url.path
+        key = self.key(request, await self.data_version())
+
+        try:
+            cached = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Cache backend get failed: {e}")
+            cached = None
+        hit = cached is not None
+        if hit:
+            body, etag = cached
+        else:
+            payload = await compute()
+            body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            try:
+                await self.backend.set(key, (body, etag), self.ttl)
+            except Exception as e:
+                logger.warning(f"Cache backend set failed: {e}")
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        not_modified = etag_matches(request.headers.get("if-none-match"), etag)
+        if not_modified:
+            response = Response(status_code=304, headers=headers)
+        else:
+            response = Response(body, media_type="application/json", headers=headers)
+        self.metrics.record(endpoint, hit, not_modified, time.perf_counter() - start)
+        return response
@@ -0,0 +1,143 @@
+# api/search.py - Full-text message search
+"""
+Ranked full-text search over telegram_messages.
+
+SQLite uses the telegram_messages_fts FTS5 table (bm25 ranking),
+Postgres the message_tsv GIN index (ts_rank). Both are created by the
+warehouse migrations. On Postgres, with marts_schema the search runs on
+the dbt fct_messages mart, which has its own message_tsv column.
+
+Matches are ranked in windows of `candidates` messages, newest window
+first: scoring every match of a common word ("tablets") at once costs
+time in proportion to the whole table, while a window of the newest
+matches is cheap to find through the index and is what users of a
+pharmacy feed look for first. Within a window, results are ordered by
+(score, id), lower scores being better matches, and paginated by
+keyset; once a window is used up, paging continues with the next older
+one, so every match is reachable. The cursor carries the top id of the
+current window, which also pins the search to the messages that existed
+when the first page was served, so pages stay consistent while the
+scraper keeps inserting.
+"""
+import base64
+import binascii
+import json
+import os
+import re
+
+from sqlalchemy import DateTime, bindparam, text
+
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "2000"))
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def encode_cursor(score, row_id, max_id):
+    return base64.urlsafe_b64encode(json.dumps([score, row_id, max_id]).encode()).decode()
+
+
+class InvalidCursor(ValueError):
+    """A cursor that search_messages() did not hand out"""
+
+
+def decode_cursor(cursor):
+    try:
+        score, row_id, max_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        score, row_id, max_id = float(score), int(row_id), int(max_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+    # Ids are BIGINT: anything else cannot come from a real row
+    if not (0 <= row_id < 2 ** 63 and 0 <= max_id < 2 ** 63):
+        raise InvalidCursor(cursor)
+    return score, row_id, max_id
+
+
+def fts5_query(query):
+    """Turn free text into an FTS5 query matching all terms, quoted so
+    user input cannot inject FTS syntax"""
+    return " ".join('"' + term + '"' for term in TOKEN.findall(query))
+
+
+async def search_messages(db, query, channel=None, date_from=None, date_to=None,
+                          limit=20, cursor=None, candidates=SEARCH_CANDIDATES, marts_schema=None):
+    """Return (rows, next_cursor) for a page of ranked matches; db is an AsyncSession
+
+    next_cursor is None once every match has been returned. Raises
+    InvalidCursor for a cursor that does not decode.
+    """
+    # Table searched, with its row id and message date columns
+    table, pk, date = "telegram_messages", "id", "date"
+    if db.bind.dialect.name == "postgresql":
+        if marts_schema:
+            table, pk, date = f"{marts_schema}.fct_messages", "message_pk", "message_at"
+        source = f"{table} m, plainto_tsquery('simple', :query) q"
+        rowid = f"m.{pk}"
+        score = "-ts_rank(m.message_tsv, q)"
+        conditions = ["m.message_tsv @@ q"]
+        params = {"query": query}
+    else:
+        match = fts5_query(query)
+        if not match:
+            return [], None
+        # Filtering and ordering on the FTS rowid lets FTS5 walk its index newest first
+        source = "telegram_messages_fts JOIN telegram_messages m ON m.id = telegram_messages_fts.rowid"
+        rowid = "telegram_messages_fts.rowid"
+        score = "bm25(telegram_messages_fts)"
+        conditions = ["telegram_messages_fts MATCH :query"]
+        params = {"query": match}
+
+    if cursor:
+        after_score, after_id, max_id = decode_cursor(cursor)
+        after = (after_score, after_id)
+    else:
+        after = None
+        max_id = (await db.execute(text(f"SELECT MAX({pk}) FROM {table}"))).scalar() or 0
+    conditions.append(f"{rowid} <= :max_id")
+    params.update(candidates=candidates)
+
+    if channel:
+        conditions.append("m.channel_name = :channel")
+        params["channel"] = channel
+    if date_from:
+        conditions.append(f"m.{date} >= :date_from")
+        params["date_from"] = date_from
+    if date_to:
+        conditions.append(f"m.{date} < :date_to")
+        params["date_to"] = date_to
+
+    window = f"""
+        SELECT {rowid} AS id, {score} AS score
+        FROM {source}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {rowid} DESC
+        LIMIT :candidates
+    """
+    # Let SQLAlchemy format dates the way the DateTime column stores them
+    dates = [bindparam(name, type_=DateTime) for name in ("date_from", "date_to") if name in params]
+    page_statement = text(f"""
+        SELECT m.{pk} AS id, m.message_id, m.channel_name, m.message_text, m.{date} AS date,
+               m.views, c.score
+        FROM ({window}) c
+        JOIN {table} m ON m.{pk} = c.id
+        WHERE (c.score, c.id) > (:after_score, :after_id)
+        ORDER BY c.score, c.id
+        LIMIT :limit
+    """).bindparams(*dates)
+    window_statement = text(f"SELECT COUNT(*), MIN(c.id) FROM ({window}) c").bindparams(*dates)
+
+    rows = []
+    while True:
+        after_score, after_id = after or (float("-inf"), 0)
+        page = (await db.execute(page_statement, {
+            **params, "max_id": max_id, "after_score": after_score, "after_id": after_id,
+            "limit": limit - len(rows),
+        })).fetchall()
+        rows.extend(page)
+        if len(rows) == limit:
+            last = rows[-1]
+            return rows, encode_cursor(last.score, last.id, max_id)
+        # This window is used up: go on with the next older one, if any
+        size, bottom = (await db.execute(window_statement, {**params, "max_id": max_id})).one()
+        if size < candidates:
+            return rows, None
+        max_id, after = bottom - 1, None
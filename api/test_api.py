@@ -17,18 +17,23 @@ def test_api():
     response = requests.get(f"{BASE_URL}/api/reports/top-products?limit=5")
     print(f"   Response: {json.dumps(response.json(), indent=2)}\n")
     
-    # Test 3: Channel activity
-    print("3. Testing channel activity:")
+    # Test 3: Channels
+    print("3. Testing channels:")
+    response = requests.get(f"{BASE_URL}/api/channels")
+    print(f"   Response: {json.dumps(response.json(), indent=2)}\n")
+    
+    # Test 4: Channel activity
+    print("4. Testing channel activity:")
     response = requests.get(f"{BASE_URL}/api/channels/medical_education/activity")
     print(f"   Response: {json.dumps(response.json(), indent=2)}\n")
     
-    # Test 4: Search messages
-    print("4. Testing message search:")
+    # Test 5: Search messages
+    print("5. Testing message search:")
     response = requests.get(f"{BASE_URL}/api/search/messages?query=paracetamol")
     print(f"   Response: {json.dumps(response.json(), indent=2)}\n")
     
-    # Test 5: Visual content
-    print("5. Testing visual content stats:")
+    # Test 6: Visual content
+    print("6. Testing visual content stats:")
     response = requests.get(f"{BASE_URL}/api/reports/visual-content")
     print(f"   Response: {json.dumps(response.json(), indent=2)}\n")
 
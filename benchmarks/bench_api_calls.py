@@ -0,0 +1,86 @@
+# bench_api_calls.py - Telegram requests per scrape run
+"""
+Count Telegram API requests made by one scrape run.
+
+"before" replays the original flow, where save_backup_json fetched the
+channel history a second time after ingestion; "after" runs
+MedicalTelegramScraper.scrape_channel_messages, which tees a single
+fetch into the database writer and the JSON backup. Runs against the
+fake Telegram client in a temporary directory.
+
+Usage: python benchmarks/bench_api_calls.py [--limits 50 500 5000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database_sqlite import Base
+from fake_telegram import FakeTelegramClient
+from rate_limiter import RateLimiter
+from task2_scraper import MedicalTelegramScraper
+
+CHANNEL = 'bench_channel'
+
+
+async def legacy_run(client, entity, limit):
+    """Original request pattern: ingest fetch + separate backup fetch"""
+    async for _ in client.iter_messages(entity, limit=limit):
+        pass
+    async for _ in client.iter_messages(entity, limit=min(50, limit)):
+        pass
+
+
+async def count_requests(limit, channel_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+
+        client = FakeTelegramClient({CHANNEL: channel_size})
+        entity = await client.get_entity(CHANNEL)
+
+        start = client.requests
+        await legacy_run(client, entity, limit)
+        before = client.requests - start
+
+        scraper = MedicalTelegramScraper(client=client, db=db, limiter=RateLimiter(rate=1e6, burst=1000))
+        start = client.requests
+        await scraper.scrape_channel_messages(CHANNEL, entity, message_limit=limit)
+        after = client.requests - start
+
+        # A second scheduled run: only new traffic is fetched
+        client._messages[CHANNEL].extend(client._generate(channel_size + 20)[channel_size:])
+        start = client.requests
+        await scraper.scrape_channel_messages(CHANNEL, entity, message_limit=limit)
+        rerun = client.requests - start
+
+        db.close()
+        engine.dispose()
+        os.chdir(Path(__file__).resolve().parent)
+    return before, after, rerun
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--limits', type=int, nargs='+', default=[50, 500, 5000])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'limit':>8} {'before':>8} {'after':>8} {'rerun (+20 msgs)':>18}")
+    for limit in args.limits:
+        before, after, rerun = await count_requests(limit, channel_size=limit * 2)
+        print(f"{limit:>8} {before:>8} {after:>8} {rerun:>18}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
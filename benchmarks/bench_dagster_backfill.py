@@ -0,0 +1,106 @@
+# bench_dagster_backfill.py - 30-day backfill of the Dagster assets, in process
+"""
+Materialize a --days backfill of the partitioned Dagster assets over a fake Telegram source.
+
+Runs raw_channel_messages and warehouse_messages (plus image_scores and
+image_detections when ultralytics is installed) for every (day, channel) partition with
+Dagster's in-process executor against a throwaway instance and SQLite
+warehouse, then report_rollups once. Reports wall-clock for the
+backfill, then backfills again with one more day, which only runs the
+partitions that are not materialized yet.
+
+Usage: PIPELINE_CHANNELS=a,b,c python benchmarks/bench_dagster_backfill.py [--days 30]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from dagster import DagsterInstance, MultiPartitionKey, materialize
+from sqlalchemy import func, select
+
+import dagster_pipeline
+from dagster_pipeline import (
+    TelegramSource,
+    image_detections,
+    image_scores,
+    raw_channel_messages,
+    report_rollups,
+    warehouse_messages,
+)
+from database_sqlite import Base, SessionLocal, TelegramMessage, make_engine
+from migrations import apply_migrations
+
+try:
+    import ultralytics
+except ImportError:  # optional dependency
+    ultralytics = None
+
+
+def backfill(instance, assets, resources, start, days):
+    """Materialize every missing partition from start over days; returns partitions run"""
+    done = instance.get_materialized_partitions(assets[-1].key)
+    run = 0
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        for channel in dagster_pipeline.CHANNELS:
+            key = MultiPartitionKey({'date': day, 'channel': channel})
+            if key in done:
+                continue
+            result = materialize(assets, partition_key=key, resources=resources, instance=instance)
+            assert result.success, key
+            run += 1
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    start = date.fromisoformat(dagster_pipeline.START_DATE)
+    assets = [raw_channel_messages, warehouse_messages]
+    if ultralytics is not None:
+        assets += [image_scores, image_detections]
+    else:
+        print("ultralytics not installed: image_scores and image_detections left out")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Raw lake paths are relative to the working directory
+        os.chdir(tmp)
+        engine = make_engine(Path(tmp) / 'warehouse.db', 'ingest')
+        Base.metadata.create_all(engine)
+        apply_migrations(engine)
+        SessionLocal.configure(bind=engine)
+
+        # One more day than the backfill, for the incremental run
+        resources = {'telegram': TelegramSource(fake=True, fake_days=args.days + 1)}
+        partitions = args.days * len(dagster_pipeline.CHANNELS)
+        print(f"Backfilling {args.days} days x {len(dagster_pipeline.CHANNELS)} channels = {partitions} partitions")
+
+        with DagsterInstance.ephemeral() as instance:
+            began = time.perf_counter()
+            run = backfill(instance, assets, resources, start, args.days)
+            partitioned = time.perf_counter() - began
+            materialize([report_rollups], resources=resources, instance=instance)
+            total = time.perf_counter() - began
+            with SessionLocal() as db:
+                stored = db.execute(select(func.count()).select_from(TelegramMessage)).scalar()
+            print(f"backfill        {run:>4} partitions  {partitioned:>7.1f}s "
+                  f"({partitioned / run:.2f}s each), with report_rollups {total:.1f}s, {stored:,} messages")
+
+            began = time.perf_counter()
+            run = backfill(instance, assets, resources, start, args.days + 1)
+            print(f"backfill +1 day {run:>4} partitions  {time.perf_counter() - began:>7.1f}s")
+        os.chdir(ROOT)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
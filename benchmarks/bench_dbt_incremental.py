@@ -0,0 +1,166 @@
+# bench_dbt_incremental.py - Nightly dbt refresh: full rebuild vs incremental marts
+"""
+Benchmark refreshing the dbt marts after one more day of data.
+
+Loads --days days of synthetic messages (--per-day per channel, with
+image detections for a tenth of them) into Postgres, builds the marts of
+medical_warehouse/ from scratch, then adds one more day and times a
+--full-refresh rebuild against an incremental `dbt run`, which only
+reads the new rows and the stats lookback window. Ends with `dbt test`.
+
+The database comes from --url or BENCH_POSTGRES_URL and must be a
+scratch database: the warehouse tables are created in its public schema
+and the models in its staging and marts schemas. Without one, a
+throwaway local server is started if the pgserver package is installed;
+otherwise the benchmark is skipped.
+
+Usage: python benchmarks/bench_dbt_incremental.py [--url postgresql://...] [--days 90] [--per-day 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, ChannelInfo, ImageDetection
+from fake_telegram import SAMPLE_TEXTS
+from ingest import CopyMessageWriter
+from migrations import apply_migrations
+
+try:
+    from dbt.cli.main import dbtRunner
+except ImportError:  # optional dependency
+    dbtRunner = None
+
+try:
+    import pgserver
+except ImportError:  # optional dependency, local stand-in server
+    pgserver = None
+
+PROJECT_DIR = ROOT / 'medical_warehouse'
+CHANNELS = [f"channel_{i:02d}" for i in range(10)]
+CATEGORIES = ["promotional", "product_display", "lifestyle", "other"]
+START = datetime(2025, 1, 1)
+
+
+def load_day(db, day, per_day, rng):
+    """Insert one day of messages per channel, and detections for a tenth of them"""
+    date = START + timedelta(days=day)
+    detections = []
+    for channel in CHANNELS:
+        writer = CopyMessageWriter(db, channel)
+        for i in range(per_day):
+            message_id = day * per_day + i + 1
+            writer.add_row({
+                'message_id': message_id,
+                'channel_name': channel,
+                'channel_title': channel.title(),
+                'message_text': rng.choice(SAMPLE_TEXTS),
+                'sender_id': None,
+                'views': rng.randint(0, 5000),
+                'forwards': rng.randint(0, 50),
+                'date': date + timedelta(seconds=i * 86400 // per_day),
+                'scraped_at': date + timedelta(days=1),
+            })
+            if i % 10 == 0:
+                detections.append({
+                    'channel_name': channel,
+                    'message_id': message_id,
+                    'image_category': rng.choice(CATEGORIES),
+                    'object_count': rng.randint(0, 5),
+                    'max_confidence': rng.random(),
+                    'model_name': 'yolov8n.pt',
+                    'detected_at': date + timedelta(days=1),
+                })
+        writer.close()
+    db.execute(ImageDetection.__table__.insert(), detections)
+    db.commit()
+
+
+def dbt(*args):
+    """Run a dbt command on the project; returns seconds taken"""
+    start = time.perf_counter()
+    result = dbtRunner().invoke([*args, '--project-dir', str(PROJECT_DIR),
+                                 '--profiles-dir', str(PROJECT_DIR), '--quiet'])
+    assert result.success, (args, result.exception)
+    return time.perf_counter() - start
+
+
+def run(url, days, per_day):
+    url = make_url(url).set(drivername='postgresql+psycopg2')
+    # profiles.yml reads the connection from the environment
+    os.environ.update({
+        'POSTGRES_HOST': url.host or url.query.get('host', 'localhost'),
+        'POSTGRES_PORT': str(url.port or 5432),
+        'POSTGRES_USER': url.username or 'postgres',
+        'POSTGRES_PASSWORD': url.password or '',
+        'POSTGRES_DB': url.database,
+    })
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        for schema in ('marts', 'staging'):
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    apply_migrations(engine)
+
+    rng = random.Random(5)
+    with Session(engine) as db:
+        db.add_all([ChannelInfo(channel_name=channel, channel_title=channel.title()) for channel in CHANNELS])
+        db.commit()
+        print(f"Loading {days} days x {len(CHANNELS)} channels x {per_day:,} messages...")
+        for day in range(days):
+            load_day(db, day, per_day, rng)
+
+        elapsed = dbt('run', '--full-refresh')
+        print(f"initial build           {elapsed:>7.1f}s")
+
+        load_day(db, days, per_day, rng)
+        messages = db.execute(text("SELECT count(*) FROM telegram_messages")).scalar()
+        print(f"+1 day: {per_day * len(CHANNELS):,} new messages, {messages:,} in total")
+
+        # Incremental first: the full refresh would leave nothing new to read
+        elapsed = dbt('run')
+        print(f"incremental run         {elapsed:>7.1f}s")
+        elapsed = dbt('run', '--full-refresh')
+        print(f"full-refresh run        {elapsed:>7.1f}s")
+
+        facts = db.execute(text("SELECT count(*) FROM marts.fct_messages")).scalar()
+        assert facts == messages, (facts, messages)
+        elapsed = dbt('test')
+        print(f"dbt test                {elapsed:>7.1f}s  (fct_messages: {facts:,} rows)")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default=os.getenv('BENCH_POSTGRES_URL'))
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--per-day', type=int, default=5000)
+    args = parser.parse_args()
+
+    if dbtRunner is None:
+        print("Skipped: dbt is not installed (pip install dbt-postgres)")
+    elif args.url:
+        run(args.url, args.days, args.per_day)
+    elif pgserver is not None:
+        with tempfile.TemporaryDirectory() as tmp:
+            server = pgserver.get_server(tmp, cleanup_mode='stop')
+            print(f"Started local Postgres in {tmp}")
+            run(server.get_uri(), args.days, args.per_day)
+            server.cleanup()
+    else:
+        print("Skipped: no Postgres (set BENCH_POSTGRES_URL or pip install pgserver)")
+
+
+if __name__ == "__main__":
+    main()
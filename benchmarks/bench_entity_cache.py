@@ -0,0 +1,88 @@
+# bench_entity_cache.py - Channel discovery: get_entity per run vs the entity cache
+"""
+Benchmark resolving a sweep of channel usernames at scraper startup.
+
+Resolves --channels usernames (the last --missing of them do not exist)
+against a fake client with --latency seconds per request, under the
+default rate limiter (5 requests/s, burst 10):
+
+    get_entity loop   one get_entity() after the other, every run
+    cold cache        EntityCache on an empty warehouse: concurrent resolves
+    warm cache        the next run: ids and access hashes from the channels
+                      table, misses from unresolved_channels
+
+Reports wall-clock and Telegram requests for each, and checks that the
+cached peers read the same history as the resolved entities.
+
+Usage: python benchmarks/bench_entity_cache.py [--channels 50] [--missing 5] [--latency 0.3]
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, make_engine
+from entity_cache import EntityCache
+from fake_telegram import FakeTelegramClient
+from rate_limiter import RateLimiter
+
+
+async def get_entity_loop(client, names):
+    limiter = RateLimiter()
+    entities = {}
+    for name in names:
+        try:
+            entities[name] = await limiter.call(name, client.get_entity, name)
+        except ValueError:
+            entities[name] = None
+    return entities
+
+
+async def first_ids(client, entities):
+    return {name: [m.id async for m in client.iter_messages(entity, limit=3)]
+            for name, entity in entities.items() if entity is not None}
+
+
+def timed(label, client, coroutine):
+    before = client.requests
+    start = time.perf_counter()
+    entities = asyncio.run(coroutine)
+    elapsed = time.perf_counter() - start
+    found = sum(entity is not None for entity in entities.values())
+    print(f"  {label:<18} {elapsed:>7.2f}s  {client.requests - before:>4} requests  {found} found")
+    return entities
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--missing', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    existing = args.channels - args.missing
+    client = FakeTelegramClient({f"channel_{i:02d}": 20 for i in range(existing)}, latency=args.latency)
+    names = list(client._channels) + [f"missing_{i:02d}" for i in range(args.missing)]
+    print(f"{args.channels} channels ({args.missing} not existing), {args.latency * 1000:.0f} ms per request")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(Path(tmp) / 'warehouse.db', 'ingest')
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            resolved = timed("get_entity loop", client, get_entity_loop(client, names))
+            timed("cold cache", client, EntityCache(db, client, RateLimiter()).resolve_many(names))
+            cached = timed("warm cache", client, EntityCache(db, client, RateLimiter()).resolve_many(names))
+        engine.dispose()
+
+    assert asyncio.run(first_ids(client, cached)) == asyncio.run(first_ids(client, resolved))
+    print("  cached peers read the same history as resolved entities")
+
+
+if __name__ == "__main__":
+    main()
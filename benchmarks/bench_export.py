@@ -0,0 +1,131 @@
+# bench_export.py - Message export: load-everything vs streaming
+"""
+Benchmark exporting telegram_messages to CSV and Parquet.
+
+Fills a SQLite warehouse with --rows synthetic messages, then runs each
+export method in its own subprocess and reports wall time, the RSS after
+imports and the peak RSS (ru_maxrss) of the export. The old method loads every row
+through the ORM into a pandas DataFrame; it is skipped above
+--legacy-max-rows because its memory grows with the table.
+
+Usage: python benchmarks/bench_export.py [--rows 10000000] [--page-size 10000]
+"""
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, TelegramMessage, make_engine
+from fake_telegram import SAMPLE_TEXTS
+from export import export_messages
+
+CHANNELS = [f"channel_{i:02d}" for i in range(50)]
+
+
+def populate(engine, rows):
+    rng = random.Random(11)
+    start = datetime(2024, 1, 1)
+    table = Base.metadata.tables['telegram_messages']
+    with engine.begin() as connection:
+        for offset in range(0, rows, 100_000):
+            connection.execute(table.insert(), [{
+                'message_id': i // len(CHANNELS) + 1,
+                'channel_name': CHANNELS[i % len(CHANNELS)],
+                'message_text': rng.choice(SAMPLE_TEXTS),
+                'views': rng.randint(0, 5000),
+                'forwards': rng.randint(0, 50),
+                'date': start + timedelta(seconds=i * 3),
+                'scraped_at': start,
+            } for i in range(offset, min(rows, offset + 100_000))])
+
+
+def legacy_export(engine, output):
+    """The original export_to_csv: ORM .all() into a DataFrame"""
+    import pandas as pd
+    with Session(engine) as db:
+        messages = db.query(TelegramMessage).all()
+        df = pd.DataFrame([{
+            'message_id': msg.message_id,
+            'channel': msg.channel_name,
+            'date': msg.date,
+            'message': msg.message_text,
+            'views': msg.views,
+            'forwards': msg.forwards,
+            'scraped_at': msg.scraped_at,
+        } for msg in messages])
+    df.to_csv(output, index=False, encoding='utf-8-sig')
+    return len(df)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_method(method, db_file, output, page_size):
+    """Child process: run one export and print 'rows seconds baseline_mb peak_mb'"""
+    # No mmap: mapped database pages would count towards RSS
+    engine = make_engine(db_file, 'default')
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if method == 'legacy-csv':
+        rows = legacy_export(engine, output)
+    else:
+        rows = export_messages(output, method.split('-')[1], page_size=page_size, bind=engine)
+    print(rows, time.perf_counter() - start, baseline, peak_rss_mb())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--page-size', type=int, default=10_000)
+    parser.add_argument('--legacy-max-rows', type=int, default=2_000_000)
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_method(args.run, args.db, args.output, args.page_size)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / 'bench.db'
+        engine = make_engine(db_file, 'ingest')
+        Base.metadata.create_all(engine)
+        print(f"Populating {args.rows:,} rows...")
+        populate(engine, args.rows)
+        engine.dispose()
+
+        methods = ['stream-csv', 'stream-parquet']
+        if args.rows <= args.legacy_max_rows:
+            methods.insert(0, 'legacy-csv')
+        else:
+            print(f"Skipping legacy-csv above {args.legacy_max_rows:,} rows")
+
+        print(f"\n{'method':<16} {'rows':>11} {'seconds':>9} {'rows/s':>10} {'base MB':>8} {'peak MB':>8} {'file MB':>8}")
+        for method in methods:
+            output = Path(tmp) / f"export-{method}.{method.split('-')[1]}"
+            result = subprocess.run(
+                [sys.executable, __file__, '--run', method, '--db', str(db_file),
+                 '--output', str(output), '--page-size', str(args.page_size)],
+                capture_output=True, text=True, check=True,
+            )
+            rows, seconds, baseline, peak = result.stdout.split()
+            rows, seconds, baseline, peak = int(rows), float(seconds), float(baseline), float(peak)
+            size = output.stat().st_size / 1024 / 1024
+            print(f"{method:<16} {rows:>11,} {seconds:>9.1f} {rows / seconds:>10,.0f} "
+                  f"{baseline:>8.1f} {peak:>8.1f} {size:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_flood_wait.py - Scraping throughput under injected flood waits
+"""
+Measure scraping throughput while Telegram keeps returning flood waits.
+
+"before" replays the original working_scraper handling: time.sleep()
+inside the coroutine (stalling every channel) and a recursive restart of
+the channel from its newest message. "after" uses
+iter_messages_resumable, which pauses all workers asynchronously and
+resumes each channel after its last processed message. The fake client
+fails every --flood-every'th request with a --flood-seconds wait.
+
+Usage: python benchmarks/bench_flood_wait.py [--channels 5] [--messages 3000]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from telethon.errors import FloodWaitError
+
+from fake_telegram import FakeTelegramClient
+from rate_limiter import RateLimiter, iter_messages_resumable, run_channels
+
+
+async def legacy_scrape(client, channel, limit, counter):
+    """Original scrape_safe flood handling"""
+    try:
+        async for _ in client.iter_messages(channel, limit=limit):
+            counter['fetched'] += 1
+    except FloodWaitError as e:
+        time.sleep(e.seconds)
+        await legacy_scrape(client, channel, limit, counter)
+
+
+async def resumable_scrape(client, channel, limit, counter, limiter):
+    async for _ in iter_messages_resumable(client, channel, channel, limiter, limit=limit):
+        counter['fetched'] += 1
+
+
+async def run(mode, args):
+    channels = [f"channel_{i}" for i in range(args.channels)]
+    client = FakeTelegramClient(
+        {name: args.messages for name in channels},
+        latency=args.latency, flood_every=args.flood_every, flood_seconds=args.flood_seconds,
+    )
+    counter = {'fetched': 0}
+    start = time.perf_counter()
+    if mode == 'before':
+        await asyncio.gather(*(legacy_scrape(client, name, args.messages, counter) for name in channels))
+    else:
+        limiter = RateLimiter(rate=1000, burst=100, per_channel=1)
+        await run_channels(
+            channels, lambda name: resumable_scrape(client, name, args.messages, counter, limiter), limiter
+        )
+    elapsed = time.perf_counter() - start
+    unique = args.channels * args.messages
+    return elapsed, counter['fetched'], unique, client.requests, client.flood_waits
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--channels', type=int, default=5)
+    parser.add_argument('--messages', type=int, default=3000)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--flood-every', type=int, default=40)
+    parser.add_argument('--flood-seconds', type=int, default=1)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'':>7} {'seconds':>8} {'msgs fetched':>13} {'unique msg/s':>13} {'requests':>9} {'flood waits':>12}")
+    for mode in ('before', 'after'):
+        elapsed, fetched, unique, requests, floods = await run(mode, args)
+        print(f"{mode:>7} {elapsed:>8.2f} {fetched:>13} {unique / elapsed:>13,.0f} {requests:>9} {floods:>12}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+# bench_image_detection.py - CPU throughput of the image detection stage
+"""
+Benchmark image detection throughput on CPU.
+
+Writes --images synthetic JPEGs, then runs ImageDetector over them for
+every combination of inference batch size and decode worker count,
+each against a fresh SQLite database, and reports images/sec. Offline,
+--model yolov8n.yaml builds the same network with random weights, which
+costs the same to run as the trained one.
+
+Usage: python benchmarks/bench_image_detection.py [--images 256] [--batch-sizes 1 8 32] [--workers 1 2 4]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import cv2
+import numpy as np
+from sqlalchemy.orm import Session
+from ultralytics import YOLO
+
+from database_sqlite import Base, make_engine
+from image_detection import YOLO_MODEL, ImageDetector
+
+CHANNEL = 'bench_channel'
+
+
+def write_images(images_dir, count, seed=5):
+    """Noisy 1280x960 JPEGs with a few solid shapes, roughly Telegram photo sized"""
+    rng = np.random.default_rng(seed)
+    channel_dir = images_dir / CHANNEL
+    channel_dir.mkdir(parents=True)
+    for message_id in range(1, count + 1):
+        image = rng.integers(0, 255, (960, 1280, 3), dtype=np.uint8)
+        for _ in range(4):
+            x, y = rng.integers(0, 1100), rng.integers(0, 800)
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            cv2.rectangle(image, (int(x), int(y)), (int(x) + 180, int(y) + 160), color, -1)
+        cv2.imwrite(str(channel_dir / f"{message_id}.jpg"), image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+
+
+def run(model, images_dir, db_file, batch_size, workers):
+    engine = make_engine(db_file)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        detector = ImageDetector(db, model=model, batch_size=batch_size, workers=workers, images_dir=images_dir)
+        start = time.perf_counter()
+        scored = detector.run()
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return scored / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--images', type=int, default=256)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--model', default=YOLO_MODEL)
+    args = parser.parse_args()
+
+    model = YOLO(args.model)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        images_dir = tmp / 'images'
+        print(f"Writing {args.images} synthetic images...")
+        write_images(images_dir, args.images)
+
+        # Warm-up so model fusing and first-call allocation are not timed
+        model.predict(np.zeros((640, 640, 3), dtype=np.uint8), device='cpu', verbose=False)
+
+        print(f"\n{'batch':>5} {'workers':>8} {'images/sec':>11}")
+        for batch_size in args.batch_sizes:
+            for workers in args.workers:
+                db_file = tmp / f"bench_{batch_size}_{workers}.db"
+                rate = run(model, images_dir, db_file, batch_size, workers)
+                print(f"{batch_size:>5} {workers:>8} {rate:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
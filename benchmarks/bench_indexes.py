@@ -0,0 +1,138 @@
+# bench_indexes.py - Query latency before/after the index migrations
+"""
+Benchmark warehouse queries on a synthetic telegram_messages table.
+
+Builds the original, index-free schema with --rows synthetic messages,
+times the queries the scraper and reports run, applies the migrations
+from migrations.py and times them again.
+
+Usage: python benchmarks/bench_indexes.py [--rows 1000000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from sqlalchemy import create_engine, text
+
+from migrations import apply_migrations
+
+LEGACY_SCHEMA = [
+    """CREATE TABLE telegram_messages (
+        id INTEGER NOT NULL PRIMARY KEY,
+        message_id BIGINT NOT NULL,
+        channel_name VARCHAR(255) NOT NULL,
+        channel_title VARCHAR(255),
+        message_text TEXT,
+        sender_id BIGINT,
+        views INTEGER,
+        forwards INTEGER,
+        date DATETIME,
+        scraped_at DATETIME
+    )""",
+    """CREATE TABLE channels (
+        id INTEGER NOT NULL PRIMARY KEY,
+        channel_name VARCHAR(255) NOT NULL UNIQUE,
+        channel_title VARCHAR(255),
+        telegram_id BIGINT UNIQUE,
+        description TEXT,
+        participant_count INTEGER,
+        is_active INTEGER,
+        last_scraped DATETIME,
+        created_at DATETIME
+    )""",
+]
+
+CHANNELS = [f"channel_{i:02d}" for i in range(50)]
+
+QUERIES = {
+    "existence lookup x200": (
+        "SELECT id FROM telegram_messages WHERE message_id = :message_id AND channel_name = :channel",
+        200,
+    ),
+    "messages per channel": (
+        "SELECT channel_name, COUNT(id) FROM telegram_messages GROUP BY channel_name",
+        1,
+    ),
+    "latest 3 messages": (
+        "SELECT id FROM telegram_messages ORDER BY date DESC LIMIT 3",
+        1,
+    ),
+    "channel daily activity": (
+        "SELECT date(date), COUNT(*), SUM(views), SUM(forwards) FROM telegram_messages "
+        "WHERE channel_name = :channel GROUP BY date(date)",
+        1,
+    ),
+}
+
+
+def populate(engine, rows):
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    per_channel = rows // len(CHANNELS)
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+        insert = text(
+            "INSERT INTO telegram_messages (message_id, channel_name, message_text, views, forwards, date) "
+            "VALUES (:message_id, :channel_name, :message_text, :views, :forwards, :date)"
+        )
+        for channel in CHANNELS:
+            batch = [{
+                'message_id': message_id,
+                'channel_name': channel,
+                'message_text': 'synthetic message',
+                'views': rng.randint(0, 5000),
+                'forwards': rng.randint(0, 50),
+                'date': start + timedelta(minutes=message_id * 3),
+            } for message_id in range(1, per_channel + 1)]
+            connection.execute(insert, batch)
+    return per_channel
+
+
+def time_queries(engine, per_channel):
+    rng = random.Random(11)
+    results = {}
+    with engine.connect() as connection:
+        for name, (sql, repeat) in QUERIES.items():
+            statement = text(sql)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(statement, {
+                    'message_id': rng.randint(1, per_channel),
+                    'channel': rng.choice(CHANNELS),
+                }).fetchall()
+            results[name] = (time.perf_counter() - start) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        print(f"Populating {args.rows:,} rows...")
+        per_channel = populate(engine, args.rows)
+
+        before = time_queries(engine, per_channel)
+        start = time.perf_counter()
+        apply_migrations(engine)
+        migrate_seconds = time.perf_counter() - start
+        after = time_queries(engine, per_channel)
+        engine.dispose()
+
+    print(f"Migrations applied in {migrate_seconds:.1f}s\n")
+    print(f"{'query':<26} {'before ms':>11} {'after ms':>10} {'speedup':>9}")
+    for name in QUERIES:
+        print(f"{name:<26} {before[name]:>11.1f} {after[name]:>10.1f} {before[name] / after[name]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
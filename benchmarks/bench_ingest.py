@@ -0,0 +1,94 @@
+# bench_ingest.py - Per-row vs batched message ingestion
+"""
+Benchmark message ingestion into telegram_messages.
+
+Compares the original per-message path (existence query + ORM add per
+message) against MessageBatchWriter, feeding both from a fake Telegram
+message source. Each run uses a fresh SQLite database file.
+
+Usage: python benchmarks/bench_ingest.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database_sqlite import Base, TelegramMessage
+from fake_telegram import FakeTelegramClient
+from ingest import MessageBatchWriter
+
+CHANNEL = 'bench_channel'
+
+
+def make_session(db_file):
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+async def ingest_per_row(db, client, entity, limit):
+    """The original scrape_channel_messages loop"""
+    async for message in client.iter_messages(entity, limit=limit):
+        existing = db.query(TelegramMessage).filter_by(
+            message_id=message.id,
+            channel_name=CHANNEL
+        ).first()
+        if existing:
+            continue
+        db.add(TelegramMessage(
+            message_id=message.id,
+            channel_name=CHANNEL,
+            channel_title=entity.title,
+            message_text=message.text,
+            sender_id=message.sender_id,
+            views=message.views,
+            forwards=message.forwards,
+            date=message.date
+        ))
+    db.commit()
+
+
+async def ingest_batched(db, client, entity, limit):
+    writer = MessageBatchWriter(db, CHANNEL, channel_title=entity.title)
+    async for message in client.iter_messages(entity, limit=limit):
+        writer.add(message)
+    writer.close()
+
+
+async def run(method, size):
+    client = FakeTelegramClient({CHANNEL: size})
+    entity = await client.get_entity(CHANNEL)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_session(Path(tmp) / 'bench.db')
+        try:
+            start = time.perf_counter()
+            await method(db, client, entity, size)
+            elapsed = time.perf_counter() - start
+            assert db.query(TelegramMessage).count() == size
+        finally:
+            db.close()
+            db.get_bind().dispose()
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} {'per-row msg/s':>15} {'batched msg/s':>15} {'speedup':>8}")
+    for size in args.sizes:
+        before = await run(ingest_per_row, size)
+        after = await run(ingest_batched, size)
+        print(f"{size:>10} {size / before:>15,.0f} {size / after:>15,.0f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+# bench_lake_loader.py - Backfill from the raw JSON lake into the warehouse
+"""
+Benchmark loading a raw lake backfill into telegram_messages.
+
+Writes --messages synthetic messages as NDJSON parts (--per-file
+messages per day and channel, as the Task 1 scrapers write them), then
+loads them into a fresh SQLite warehouse (migrations applied, so the
+full-text triggers and rollups are maintained too) with lake_loader,
+and runs the loader a second time to show the incremental no-op.
+Also compares json and orjson on parsing alone.
+
+Usage: python benchmarks/bench_lake_loader.py [--messages 5000000] [--channels 50] [--workers N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import lake_loader
+from database_sqlite import Base, TelegramMessage, make_engine
+from fake_telegram import SAMPLE_TEXTS
+from migrations import apply_migrations
+from parquet_lake import find_raw_files
+from raw_lake import RawLakeWriter
+
+
+def write_raw_lake(raw_dir, messages, channels, per_file):
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1)
+    files = 0
+    for offset in range(0, messages, per_file * channels):
+        day = start + timedelta(days=files // channels)
+        for c in range(channels):
+            channel = f"channel_{c:02d}"
+            with RawLakeWriter(channel, root=raw_dir, date=day.strftime("%Y-%m-%d")) as lake:
+                for i in range(min(per_file, (messages - offset) // channels)):
+                    lake.write({
+                        'message_id': offset // channels + i + 1,
+                        'channel_name': channel,
+                        'message_date': (day + timedelta(seconds=i * 8)).isoformat() + "+00:00",
+                        'message_text': rng.choice(SAMPLE_TEXTS),
+                        'views': rng.randint(0, 5000),
+                        'forwards': rng.randint(0, 50),
+                        'has_media': False,
+                    })
+            files += 1
+
+
+def compare_parsers(raw_dir, sample_files=20):
+    paths = [path for path, _ in find_raw_files(raw_dir)][:sample_files]
+    lines = [line for path in paths for line in path.read_bytes().splitlines()]
+    parsers = [('json', json.loads)]
+    if lake_loader.orjson:
+        parsers.append(('orjson', lake_loader.orjson.loads))
+    for name, loads in parsers:
+        start = time.perf_counter()
+        for line in lines:
+            loads(line)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<8} {len(lines) / elapsed:>12,.0f} records/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=5_000_000)
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--per-file', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=lake_loader.LOAD_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = Path(tmp) / 'raw'
+        print(f"Writing {args.messages:,} messages to the raw lake...")
+        write_raw_lake(raw_dir, args.messages, args.channels, args.per_file)
+
+        print("Parsing only:")
+        compare_parsers(raw_dir)
+
+        engine = make_engine(Path(tmp) / 'bench.db', 'ingest')
+        Base.metadata.create_all(engine)
+        apply_migrations(engine)
+        with Session(engine) as db:
+            for run in ("first load", "rerun"):
+                start = time.perf_counter()
+                stats = lake_loader.load_lake(db, raw_dir, args.workers, args.batch_size)
+                elapsed = time.perf_counter() - start
+                print(f"{run:<11} {elapsed:>8.1f}s  {stats['files']:>5} files  {stats['inserted']:>10,} inserted "
+                      f"{stats['inserted'] / elapsed:>10,.0f} msgs/s  ({args.workers} workers)")
+            stored = db.execute(select(func.count()).select_from(TelegramMessage)).scalar()
+            print(f"telegram_messages: {stored:,} rows")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
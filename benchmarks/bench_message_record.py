@@ -0,0 +1,99 @@
+# bench_message_record.py - Memory of in-flight messages: dicts vs MessageRecord
+"""
+Benchmark the memory and conversion cost of a large in-flight batch of messages.
+
+Builds --messages messages as per-message dicts (the row format the
+writers buffered before) and as MessageRecords, and reports the memory
+each batch holds (tracemalloc, values included) and per message. Then
+times the conversions each writer needs on both: telegram_messages row
+tuples (COPY), NDJSON lines (raw lake) and an Arrow record batch
+(Parquet lake).
+
+Usage: python benchmarks/bench_message_record.py [--messages 1000000]
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import pyarrow as pa
+
+from fake_telegram import SAMPLE_TEXTS
+from message_record import ROW_COLUMNS, MessageRecord, to_record_batch
+from parquet_lake import SCHEMA
+
+
+def message_values(count):
+    """Fresh value objects per message, as parsed from Telegram or JSON"""
+    rng = random.Random(11)
+    start = datetime(2025, 1, 1)
+    scraped_at = datetime(2025, 6, 1)
+    for i in range(count):
+        yield (i + 1, 'tikvahpharma', 'Tikvah Pharma', f"{rng.choice(SAMPLE_TEXTS)} #{i}",
+               rng.randint(1, 10**9), rng.randint(0, 5000), rng.randint(0, 50),
+               start + timedelta(seconds=i * 30), scraped_at)
+
+
+def build_dicts(count):
+    return [dict(zip(ROW_COLUMNS, values)) for values in message_values(count)]
+
+
+def build_records(count):
+    return [MessageRecord(*values) for values in message_values(count)]
+
+
+def measure(build, count):
+    """(batch, bytes held by it) for one build"""
+    gc.collect()
+    tracemalloc.start()
+    batch = build(count)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return batch, held
+
+
+def timed(label, convert, batch):
+    start = time.perf_counter()
+    convert(batch)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:>7.2f}s  {len(batch) / elapsed:>12,.0f} msgs/s")
+
+
+def dict_ndjson(rows):
+    return [json.dumps({**row, 'date': row['date'].isoformat(), 'scraped_at': None},
+                       ensure_ascii=False).encode('utf-8') for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{args.messages:,} in-flight messages")
+    dicts, dict_bytes = measure(build_dicts, args.messages)
+    records, record_bytes = measure(build_records, args.messages)
+    for label, held in (("dict rows", dict_bytes), ("MessageRecord", record_bytes)):
+        print(f"  {label:<16} {held / 2**20:>8.1f} MB  {held / args.messages:>6.0f} bytes/message")
+    print(f"  MessageRecord batch is {record_bytes / dict_bytes:.0%} of the dict batch")
+
+    # Lake rows leave out channel_title, as in parquet_lake.SCHEMA
+    lake_dicts = [{name: row.get(name) for name in SCHEMA.names} for row in dicts[:200_000]]
+
+    print("Conversions:")
+    timed("dict -> row tuple", lambda rows: [tuple(row[c] for c in ROW_COLUMNS) for row in rows], dicts)
+    timed("record -> row tuple", lambda batch: [record.to_row() for record in batch], records)
+    timed("dict -> NDJSON (json)", dict_ndjson, dicts[:200_000])
+    timed("record -> NDJSON", lambda batch: [record.to_ndjson() for record in batch], records[:200_000])
+    timed("dicts -> Arrow (from_pylist)", lambda rows: pa.Table.from_pylist(rows, schema=SCHEMA), lake_dicts)
+    timed("records -> Arrow batch", lambda batch: to_record_batch(batch, SCHEMA), records[:200_000])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# bench_parquet_lake.py - Analytics scan: raw JSON lake vs Parquet lake
+"""
+Benchmark "views by channel for the last 30 days" on the raw and Parquet lakes.
+
+Writes a synthetic raw lake (one NDJSON partition per day and channel,
+as the Task 1 scrapers do), compacts it into the Parquet lake, then
+times the query by parsing every raw file against read_messages() with
+partition pruning and column projection (and without pruning, for
+reference). All three must produce the same totals.
+
+Usage: python benchmarks/bench_parquet_lake.py [--days 90] [--channels 20] [--per-day 1000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from fake_telegram import SAMPLE_TEXTS
+from message_record import parse_time
+from parquet_lake import compact, find_sources, read_json_records, read_messages
+from raw_lake import RawLakeWriter
+
+
+def write_raw_lake(raw_dir, days, channels, per_day):
+    rng = random.Random(5)
+    start = datetime(2025, 1, 1)
+    for day in range(days):
+        day_start = start + timedelta(days=day)
+        for c in range(channels):
+            channel = f"channel_{c:02d}"
+            with RawLakeWriter(channel, root=raw_dir, date=day_start.strftime("%Y-%m-%d")) as lake:
+                for i in range(per_day):
+                    lake.write({
+                        'message_id': day * per_day + i + 1,
+                        'channel_name': channel,
+                        'message_date': (day_start + timedelta(seconds=i * 60)).isoformat() + "+00:00",
+                        'message_text': rng.choice(SAMPLE_TEXTS),
+                        'views': rng.randint(0, 5000),
+                        'forwards': rng.randint(0, 50),
+                        'has_media': rng.random() < 0.3,
+                    })
+    return (start + timedelta(days=days)).date()
+
+
+def views_from_json(raw_dir, since):
+    totals = Counter()
+    for path, channel_name, _ in find_sources(raw_dir, backup_dir=Path(raw_dir) / 'no-backups'):
+        for record in read_json_records(path):
+            if parse_time(record['message_date']).date() >= since:
+                totals[record['channel_name']] += record['views']
+    return totals
+
+
+def views_from_parquet(lake_dir, since, prune=True):
+    if prune:
+        table = read_messages(columns=['channel_name', 'views'], date_from=since, lake_dir=lake_dir)
+    else:
+        table = read_messages(lake_dir=lake_dir)
+        table = table.filter(pc.greater_equal(table['date'], pa.scalar(datetime.combine(since, datetime.min.time()), pa.timestamp('us'))))
+    totals = table.group_by('channel_name').aggregate([('views', 'sum')])
+    return Counter(dict(zip(totals['channel_name'].to_pylist(), totals['views_sum'].to_pylist())))
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--per-day', type=int, default=1000)
+    parser.add_argument('--window', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir, lake_dir = Path(tmp) / 'raw', Path(tmp) / 'lake'
+        total = args.days * args.channels * args.per_day
+        print(f"Writing raw lake: {args.days} days x {args.channels} channels x {args.per_day} = {total:,} messages...")
+        end = write_raw_lake(raw_dir, args.days, args.channels, args.per_day)
+        since = end - timedelta(days=args.window)
+
+        _, ms = timed(compact, raw_dir, Path(tmp) / 'no-backups', lake_dir)
+        print(f"Compaction: {ms / 1000:.1f}s")
+        raw_mb = sum(p.stat().st_size for p in raw_dir.rglob('*.ndjson')) / 1024 / 1024
+        lake_mb = sum(p.stat().st_size for p in lake_dir.rglob('*.parquet')) / 1024 / 1024
+        print(f"Size: raw NDJSON {raw_mb:.1f} MB, Parquet {lake_mb:.1f} MB\n")
+
+        print(f"views by channel since {since} ({args.window} days)")
+        expected, json_ms = timed(views_from_json, raw_dir, since)
+        print(f"{'parse all JSON':<28} {json_ms:>10.1f} ms")
+        for label, prune in (("Parquet, no pruning", False), ("Parquet, pruned + projected", True)):
+            result, ms = timed(views_from_parquet, lake_dir, since, prune)
+            assert result == expected, label
+            print(f"{label:<28} {ms:>10.1f} ms {json_ms / ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# bench_pg_copy.py - Postgres ingestion: ORM vs batched INSERT vs COPY
+"""
+Benchmark message ingestion into Postgres.
+
+Compares the original ORM path (db.add per message), MessageBatchWriter
+(bulk INSERT ... ON CONFLICT DO NOTHING) and CopyMessageWriter (COPY
+into a staging table, then merge), plus a second COPY pass over the same
+messages, which are then all duplicates.
+
+The database comes from --url or BENCH_POSTGRES_URL. Without one, a
+throwaway local server is started if the pgserver package is installed;
+otherwise the benchmark is skipped. Tables are created in a scratch
+schema (bench_pg_copy) that is dropped afterwards.
+
+Usage: python benchmarks/bench_pg_copy.py [--url postgresql://...] [--rows 1000000] [--orm-rows 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from sqlalchemy import create_engine, func, make_url, select, text
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, TelegramMessage
+from fake_telegram import SAMPLE_TEXTS
+from ingest import CopyMessageWriter, MessageBatchWriter
+from migrations import apply_migrations
+
+try:
+    import pgserver
+except ImportError:  # optional dependency, local stand-in server
+    pgserver = None
+
+SCHEMA = "bench_pg_copy"
+CHANNELS = [f"channel_{i:02d}" for i in range(20)]
+
+
+def make_rows(count):
+    rng = random.Random(13)
+    start = datetime(2025, 1, 1)
+    return [{
+        'message_id': i // len(CHANNELS) + 1,
+        'channel_name': CHANNELS[i % len(CHANNELS)],
+        'channel_title': CHANNELS[i % len(CHANNELS)].title(),
+        'message_text': rng.choice(SAMPLE_TEXTS),
+        'sender_id': rng.randint(1, 10**9),
+        'views': rng.randint(0, 5000),
+        'forwards': rng.randint(0, 50),
+        'date': start + timedelta(seconds=i * 10),
+        'scraped_at': start,
+    } for i in range(count)]
+
+
+def reset(engine):
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    Base.metadata.create_all(engine)
+    # Adds the full-text column and index, as on a real warehouse
+    apply_migrations(engine)
+
+
+def load_orm(db, rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        for row in rows[start:start + batch_size]:
+            db.add(TelegramMessage(**row))
+        db.commit()
+
+
+def load_writer(writer_class, batch_size):
+    def load(db, rows, _):
+        writers = {}
+        for row in rows:
+            writer = writers.get(row['channel_name'])
+            if writer is None:
+                writer = writers[row['channel_name']] = writer_class(db, row['channel_name'], batch_size=batch_size)
+            writer.add_row(row)
+        for writer in writers.values():
+            writer.close()
+    return load
+
+
+def run(url, rows, orm_rows, insert_batch, copy_batch):
+    # CopyMessageWriter uses psycopg2's copy_expert
+    url = make_url(url).set(drivername='postgresql+psycopg2')
+    engine = create_engine(url, connect_args={'options': f'-csearch_path={SCHEMA}'})
+    data = make_rows(rows)
+    methods = [
+        ("ORM add", load_orm, data[:orm_rows], insert_batch, True),
+        ("batched INSERT", load_writer(MessageBatchWriter, insert_batch), data, insert_batch, True),
+        ("COPY + merge", load_writer(CopyMessageWriter, copy_batch), data, copy_batch, True),
+        ("COPY, all duplicates", load_writer(CopyMessageWriter, copy_batch), data, copy_batch, False),
+    ]
+    print(f"{'method':<22} {'rows':>10} {'batch':>7} {'seconds':>9} {'rows/s':>10}")
+    try:
+        for label, load, subset, batch_size, fresh in methods:
+            if fresh:
+                reset(engine)
+            with Session(engine) as db:
+                start = time.perf_counter()
+                load(db, subset, batch_size)
+                elapsed = time.perf_counter() - start
+                stored = db.execute(select(func.count()).select_from(TelegramMessage)).scalar()
+            assert stored == len(subset), (label, stored)
+            print(f"{label:<22} {len(subset):>10,} {batch_size:>7} {elapsed:>9.1f} {len(subset) / elapsed:>10,.0f}")
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default=os.getenv('BENCH_POSTGRES_URL'))
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--orm-rows', type=int, default=50_000)
+    parser.add_argument('--insert-batch', type=int, default=500)
+    parser.add_argument('--copy-batch', type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url, args.rows, args.orm_rows, args.insert_batch, args.copy_batch)
+    elif pgserver is not None:
+        with tempfile.TemporaryDirectory() as tmp:
+            server = pgserver.get_server(tmp, cleanup_mode='stop')
+            print(f"Started local Postgres in {tmp}")
+            run(server.get_uri(), args.rows, args.orm_rows, args.insert_batch, args.copy_batch)
+            server.cleanup()
+    else:
+        print("Skipped: no Postgres (set BENCH_POSTGRES_URL or pip install pgserver)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# bench_product_mentions.py - Product-mention extraction throughput
+"""
+Benchmark product-mention extraction in messages/sec.
+
+Times matching synthetic English/Amharic messages against the product
+lexicon with one regex search per spelling (the straightforward
+approach) and with the Aho-Corasick matcher (pure Python, and
+pyahocorasick when installed). Then times update_product_mentions()
+end to end on a SQLite database: a first run over every message, and
+an incremental run after new messages arrive.
+
+Usage: python benchmarks/bench_product_mentions.py [--messages 200000]
+"""
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, make_engine
+from fake_telegram import SAMPLE_TEXTS
+import product_mentions
+from product_mentions import LEXICON, ProductMatcher, update_product_mentions
+
+FILLER = [
+    "call us", "delivery available", "Addis Ababa", "Bole", "price", "original product",
+    "ዋጋ", "ይደውሉ", "በቅናሽ", "አዲስ አበባ", "ፋርማሲ", "ለማዘዝ", "ፓራሲታሞል", "ቫይታሚን ሲ",
+]
+CHANNELS = [f"channel_{i:02d}" for i in range(20)]
+
+
+def make_texts(count):
+    rng = random.Random(3)
+    return [
+        " ".join([rng.choice(SAMPLE_TEXTS)] + rng.choices(FILLER, k=rng.randint(3, 12)))
+        for _ in range(count)
+    ]
+
+
+class RegexMatcher:
+    """One compiled pattern per spelling, searched one after another"""
+
+    def __init__(self, lexicon=LEXICON):
+        self.patterns = [
+            (product, re.compile(r"(?<!\w)" + re.escape(spelling) + r"(?!\w)", re.IGNORECASE))
+            for product, spellings in lexicon.items()
+            for spelling in spellings
+        ]
+
+    def products(self, text):
+        return {product for product, pattern in self.patterns if pattern.search(text)}
+
+
+def throughput(matcher, texts):
+    start = time.perf_counter()
+    for text in texts:
+        matcher.products(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def insert_messages(engine, texts, first_id):
+    table = Base.metadata.tables['telegram_messages']
+    start = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(table.insert(), [{
+            'message_id': first_id + i,
+            'channel_name': CHANNELS[i % len(CHANNELS)],
+            'message_text': text,
+            'date': start + timedelta(minutes=first_id + i),
+        } for i, text in enumerate(texts)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--incremental', type=int, default=10_000)
+    args = parser.parse_args()
+
+    texts = make_texts(args.messages)
+    sample = texts[:min(len(texts), 20_000)]
+    spellings = sum(len(s) for s in LEXICON.values())
+    print(f"Lexicon: {len(LEXICON)} products, {spellings} spellings\n")
+    print(f"{'matcher':<28} {'msgs/sec':>12}")
+    print(f"{'regex per spelling':<28} {throughput(RegexMatcher(), sample):>12,.0f}")
+    print(f"{'aho-corasick (pure python)':<28} {throughput(ProductMatcher(use_native=False), sample):>12,.0f}")
+    if product_mentions.ahocorasick:
+        print(f"{'aho-corasick (pyahocorasick)':<28} {throughput(ProductMatcher(), sample):>12,.0f}")
+    else:
+        print(f"{'aho-corasick (pyahocorasick)':<28} {'not installed':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(Path(tmp) / 'bench.db')
+        Base.metadata.create_all(engine)
+        insert_messages(engine, texts, 1)
+        extra = make_texts(args.incremental)
+
+        with Session(engine) as db:
+            print()
+            start = time.perf_counter()
+            processed = update_product_mentions(db)
+            elapsed = time.perf_counter() - start
+            print(f"first run:       {processed:>9,} messages in {elapsed:6.2f}s  ({processed / elapsed:,.0f} msgs/sec)")
+
+            insert_messages(engine, extra, args.messages + 1)
+            start = time.perf_counter()
+            processed = update_product_mentions(db)
+            elapsed = time.perf_counter() - start
+            print(f"incremental run: {processed:>9,} messages in {elapsed:6.2f}s  ({processed / elapsed:,.0f} msgs/sec)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# bench_scraper_engine.py - Scraping engine: interrupted run resumed from the checkpoint
+"""
+Benchmark an interrupted scrape resumed from the engine's checkpoint.
+
+Scrapes --channels fake channels (with --latency seconds per request)
+into the raw lake and a SQLite warehouse with ScraperEngine. One run
+goes through uninterrupted; another is cancelled after --interrupt-after
+seconds and started again, and resumes every channel from the
+checkpoint. Reports wall-clock, Telegram requests and messages stored
+for both, and checks the resumed run stored every message exactly once.
+
+Usage: python benchmarks/bench_scraper_engine.py [--channels 50] [--messages 2000] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, TelegramMessage, make_engine
+from fake_telegram import FakeTelegramClient
+from rate_limiter import RateLimiter
+from scraper_engine import ChannelConfig, Checkpoint, ScraperEngine, db_sink, lake_sink
+
+
+def make_client(args):
+    channels = {f"channel_{i:02d}": args.messages for i in range(args.channels)}
+    return FakeTelegramClient(channels, latency=args.latency)
+
+
+def run_engine(client, db, tmp, args):
+    channels = [ChannelConfig(name, limit=None, priority=i % 3) for i, name in enumerate(client._channels)]
+    engine = ScraperEngine(
+        client, channels, [lake_sink(Path(tmp) / 'raw'), db_sink(db)],
+        RateLimiter(rate=1000, burst=100), Checkpoint(Path(tmp) / 'checkpoint.json'),
+    )
+    return engine.run()
+
+
+def scrape(args, interrupt_after=None):
+    """(seconds, requests, stored, distinct) for one full scrape, optionally interrupted once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(Path(tmp) / 'warehouse.db', 'ingest')
+        Base.metadata.create_all(engine)
+        client = make_client(args)
+        start = time.perf_counter()
+        with Session(engine) as db:
+            if interrupt_after is not None:
+                try:
+                    asyncio.run(asyncio.wait_for(run_engine(client, db, tmp, args), interrupt_after))
+                except asyncio.TimeoutError:
+                    pass
+                interrupted = db.execute(select(func.count()).select_from(TelegramMessage)).scalar()
+                print(f"  interrupted after {interrupt_after}s with {interrupted:,} messages stored")
+            asyncio.run(run_engine(client, db, tmp, args))
+            elapsed = time.perf_counter() - start
+            stored = db.execute(select(func.count()).select_from(TelegramMessage)).scalar()
+            distinct = db.execute(select(func.count()).select_from(
+                select(TelegramMessage.channel_name, TelegramMessage.message_id).distinct().subquery()
+            )).scalar()
+        engine.dispose()
+    return elapsed, client.requests, stored, distinct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--interrupt-after', type=float, default=2.0)
+    args = parser.parse_args()
+
+    expected = args.channels * args.messages
+    print(f"{args.channels} channels x {args.messages:,} messages, {args.latency * 1000:.0f} ms per request")
+    for label, interrupt_after in (("uninterrupted", None), ("interrupted + resumed", args.interrupt_after)):
+        elapsed, requests, stored, distinct = scrape(args, interrupt_after)
+        assert stored == distinct == expected, (label, stored, distinct, expected)
+        print(f"{label:<22} {elapsed:>6.1f}s  {requests:>6,} requests  {stored:>9,} messages stored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# bench_search.py - Message search: LIKE scan vs full-text index
+"""
+Benchmark /api/search/messages queries on a synthetic warehouse.
+
+Fills telegram_messages with --rows synthetic messages, applies the
+migrations (which build the full-text index), then times a first and a
+deeper page of search for common, rare and multi-word queries against
+the LIKE '%term%' scan the endpoint would otherwise need.
+
+Usage: python benchmarks/bench_search.py [--rows 1000000]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'api'))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from database_sqlite import Base, make_engine
+from fake_telegram import SAMPLE_TEXTS
+from migrations import apply_migrations
+from search import search_messages
+
+CHANNELS = [f"channel_{i:02d}" for i in range(50)]
+# Long tail of product names: "drug0000" is common, "drug1999" rare
+PRODUCTS = [f"drug{i:04d}" for i in range(2000)]
+
+QUERIES = ["paracetamol", "drug1500", "ibuprofen tablets"]
+
+LIKE_SQL = """
+    SELECT id, message_id, channel_name, message_text, date, views
+    FROM telegram_messages
+    WHERE {conditions}
+    ORDER BY date DESC, id
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def populate(engine, rows):
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    weights = [1 / (rank + 1) for rank in range(len(PRODUCTS))]
+    table = Base.metadata.tables['telegram_messages']
+    with engine.begin() as connection:
+        for offset in range(0, rows, 50_000):
+            batch = []
+            for i in range(offset, min(rows, offset + 50_000)):
+                product = rng.choices(PRODUCTS, weights)[0]
+                batch.append({
+                    'message_id': i // len(CHANNELS) + 1,
+                    'channel_name': CHANNELS[i % len(CHANNELS)],
+                    'message_text': f"{rng.choice(SAMPLE_TEXTS)} {product}",
+                    'views': rng.randint(0, 5000),
+                    'forwards': rng.randint(0, 50),
+                    'date': start + timedelta(seconds=i * 30),
+                })
+            connection.execute(table.insert(), batch)
+
+
+async def time_like(db, query, limit, pages):
+    terms = query.split()
+    conditions = " AND ".join(f"message_text LIKE :t{i}" for i in range(len(terms)))
+    params = {f"t{i}": f"%{term}%" for i, term in enumerate(terms)}
+    statement = text(LIKE_SQL.format(conditions=conditions))
+    start = time.perf_counter()
+    for page in range(pages):
+        (await db.execute(statement, {**params, 'limit': limit, 'offset': page * limit})).fetchall()
+    return (time.perf_counter() - start) * 1000
+
+
+async def time_search(db, query, limit, pages):
+    cursor = None
+    start = time.perf_counter()
+    for _ in range(pages):
+        _, cursor = await search_messages(db, query, limit=limit, cursor=cursor)
+    return (time.perf_counter() - start) * 1000
+
+
+async def compare(db_file, limit, pages_deep):
+    """Time both approaches through the API's async driver"""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    async with AsyncSession(async_engine) as db:
+        for query in QUERIES:
+            for pages in (1, pages_deep):
+                like = await time_like(db, query, limit, pages)
+                fts = await time_search(db, query, limit, pages)
+                print(f"{query:<20} {pages:>5} {like:>10.1f} {fts:>10.1f} {like / fts:>8.1f}x")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(Path(tmp) / 'bench.db')
+        Base.metadata.create_all(engine)
+        print(f"Populating {args.rows:,} rows...")
+        populate(engine, args.rows)
+        start = time.perf_counter()
+        apply_migrations(engine)
+        print(f"Migrations (incl. full-text index build) applied in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'query':<20} {'pages':>5} {'LIKE ms':>10} {'FTS ms':>10} {'speedup':>9}")
+        asyncio.run(compare(Path(tmp) / 'bench.db', args.limit, args.pages))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# bench_sqlite_profiles.py - Mixed read/write load per SQLite profile
+"""
+Mixed read/write benchmark for the SQLite engine profiles.
+
+One writer thread inserts messages in small committed batches (like a
+running scrape) while reader threads repeatedly run the per-channel
+activity query (like the API and verify scripts). Reports writer
+throughput and reader latency for each profile in SQLITE_PROFILES.
+
+Usage: python benchmarks/bench_sqlite_profiles.py [--seconds 5] [--readers 4]
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database_sqlite import Base, SQLITE_PROFILES, TelegramMessage, make_engine
+
+BATCH = 50
+SEED_ROWS = 50_000
+ACTIVITY = text(
+    "SELECT date(date), COUNT(*), SUM(views) FROM telegram_messages "
+    "WHERE channel_name = :channel GROUP BY date(date)"
+)
+
+
+def seed(engine):
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2025, 1, 1)
+    rows = [{
+        'message_id': i, 'channel_name': f"channel_{i % 10}", 'message_text': 'seed',
+        'views': i % 500, 'forwards': i % 7, 'date': start + timedelta(minutes=i),
+    } for i in range(SEED_ROWS)]
+    with engine.begin() as connection:
+        connection.execute(TelegramMessage.__table__.insert(), rows)
+
+
+def writer(engine, stop, stats):
+    message_id = SEED_ROWS
+    start = datetime(2026, 1, 1)
+    insert = TelegramMessage.__table__.insert()
+    while not stop.is_set():
+        rows = []
+        for _ in range(BATCH):
+            message_id += 1
+            rows.append({
+                'message_id': message_id, 'channel_name': f"channel_{message_id % 10}",
+                'message_text': 'new', 'views': 1, 'forwards': 0,
+                'date': start + timedelta(seconds=message_id),
+            })
+        try:
+            with engine.begin() as connection:
+                connection.execute(insert, rows)
+            stats['written'] += BATCH
+        except OperationalError:
+            stats['write_errors'] += 1
+
+
+def reader(engine, stop, latencies, errors, index):
+    with engine.connect() as connection:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                connection.execute(ACTIVITY, {'channel': f"channel_{index % 10}"}).fetchall()
+                connection.commit()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except OperationalError:
+                connection.rollback()
+                errors.append(1)
+
+
+def run(profile, seconds, readers):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(Path(tmp) / 'bench.db', profile=profile)
+        seed(engine)
+
+        stop = threading.Event()
+        stats = {'written': 0, 'write_errors': 0}
+        latencies, read_errors = [], []
+        threads = [threading.Thread(target=writer, args=(engine, stop, stats))]
+        threads += [threading.Thread(target=reader, args=(engine, stop, latencies, read_errors, i))
+                    for i in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else float('nan')
+    median = statistics.median(latencies) if latencies else float('nan')
+    return stats['written'] / seconds, median, p95, len(latencies) / seconds, stats['write_errors'] + len(read_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'profile':<12} {'writes/s':>10} {'read p50 ms':>12} {'read p95 ms':>12} {'reads/s':>9} {'lock errors':>12}")
+    for profile in SQLITE_PROFILES:
+        writes, p50, p95, reads, errors = run(profile, args.seconds, args.readers)
+        print(f"{profile:<12} {writes:>10,.0f} {p50:>12.1f} {p95:>12.1f} {reads:>9,.0f} {errors:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# load_test_api.py - Concurrent load test for the FastAPI service
+"""
+Load test the analytics API with concurrent clients.
+
+Builds a synthetic SQLite warehouse (messages, full-text index, activity
+rollups, product mentions), starts the API on it with uvicorn in a
+subprocess, then for each concurrency level keeps that many clients
+sending requests for --duration seconds. Requests rotate over the
+report, activity and search endpoints. Reports req/s and p50/p95/p99
+latency per level.
+
+Usage: python benchmarks/load_test_api.py [--clients 10 100 500] [--duration 10] [--messages 200000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import cycle
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, make_engine
+from fake_telegram import SAMPLE_TEXTS
+from migrations import apply_migrations
+from product_mentions import update_product_mentions
+
+CHANNELS = [f"channel_{i:02d}" for i in range(20)]
+
+REQUESTS = [
+    "/api/reports/top-products?limit=10",
+    "/api/channels/channel_03/activity",
+    "/api/channels/channel_07/activity?granularity=hour&date_from=2025-01-10&date_to=2025-01-12",
+    "/api/search/messages?query=amoxicillin&limit=20",
+    "/api/search/messages?query=vitamin&channel=channel_05&limit=20",
+    "/api/reports/visual-content",
+]
+
+
+def build_database(db_file, messages):
+    rng = random.Random(9)
+    start = datetime(2025, 1, 1)
+    engine = make_engine(db_file)
+    Base.metadata.create_all(engine)
+    table = Base.metadata.tables['telegram_messages']
+    with engine.begin() as connection:
+        connection.execute(table.insert(), [{
+            'message_id': i // len(CHANNELS) + 1,
+            'channel_name': CHANNELS[i % len(CHANNELS)],
+            'message_text': rng.choice(SAMPLE_TEXTS),
+            'views': rng.randint(0, 5000),
+            'forwards': rng.randint(0, 50),
+            'date': start + timedelta(seconds=i * 20),
+        } for i in range(messages)])
+    # Builds the search index and backfills the activity rollups
+    apply_migrations(engine)
+    with Session(engine) as db:
+        update_product_mentions(db)
+    engine.dispose()
+
+
+def start_server(db_file, port):
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{db_file}"}
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', str(ROOT / 'api'),
+         '--port', str(port), '--log-level', 'warning', '--no-access-log'],
+        env=env,
+    )
+
+
+async def wait_ready(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            await asyncio.sleep(0.2)
+            continue
+        await get(reader, writer, host, "/")
+        writer.close()
+        return
+    raise RuntimeError("API server did not start")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+async def get(reader, writer, host, path):
+    """One GET on a keep-alive connection; returns the status code"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = dict(line.split(": ", 1) for line in lines[1:] if line)
+    length = int(next(v for k, v in headers.items() if k.lower() == "content-length"))
+    await reader.readexactly(length)
+    return status
+
+
+async def run_level(host, port, clients, duration):
+    """Run `clients` request loops for `duration` seconds; returns (latencies, errors, elapsed)
+
+    Each client keeps one HTTP/1.1 connection open. A minimal client
+    keeps the load generator's own CPU use (it shares the machine with
+    the server) small next to the server's.
+    """
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def loop(offset):
+        nonlocal errors
+        paths = cycle(REQUESTS[offset % len(REQUESTS):] + REQUESTS[:offset % len(REQUESTS)])
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                if await get(reader, writer, host, next(paths)) != 200:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(loop(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+async def run(host, port, levels, duration):
+    await wait_ready(host, port)
+    print(f"{'clients':>7} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for clients in levels:
+        latencies, errors, elapsed = await run_level(host, port, clients, duration)
+        latencies.sort()
+        print(f"{clients:>7} {len(latencies):>9} {errors:>7} {len(latencies) / elapsed:>9.0f} "
+              f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / 'load.db'
+        print(f"Building warehouse with {args.messages:,} messages...")
+        build_database(db_file, args.messages)
+
+        server = start_server(db_file, args.port)
+        try:
+            asyncio.run(run("127.0.0.1", args.port, args.clients, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
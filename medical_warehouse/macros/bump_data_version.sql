@@ -0,0 +1,19 @@
+{# Same counter ingest bumps (bump_data_version in src/ingest.py): cached API
+   responses computed from the previous marts are dropped after a run. The
+   table is created here too (as the DataVersion model defines it), since
+   dbt may run against a warehouse nothing has bumped yet #}
+{% macro bump_data_version() %}
+    {% set built = results | selectattr('node.resource_type', 'equalto', 'model')
+                          | selectattr('status', 'equalto', 'success') | list %}
+    {% if execute and built %}
+        create table if not exists {{ var('source_schema') }}.data_version (
+            name varchar(100) primary key,
+            version bigint not null default 0
+        );
+        insert into {{ var('source_schema') }}.data_version (name, version)
+        values ('warehouse', 1)
+        on conflict (name) do update set version = data_version.version + 1
+    {% else %}
+        select 1
+    {% endif %}
+{% endmacro %}
@@ -0,0 +1,9 @@
+{# Models land in the schema named in their config (staging, marts) as is,
+   not prefixed with the target schema, so the API can name them directly #}
+{% macro generate_schema_name(custom_schema_name, node) -%}
+    {%- if custom_schema_name is none -%}
+        {{ target.schema }}
+    {%- else -%}
+        {{ custom_schema_name | trim }}
+    {%- endif -%}
+{%- endmacro %}
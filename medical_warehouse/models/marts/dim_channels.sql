@@ -0,0 +1,40 @@
+-- One row per channel. Rebuilt each run from the channels table and the
+-- daily activity rollup (one row per channel and day), not from messages.
+{{
+    config(
+        materialized='table',
+        indexes=[{'columns': ['channel_name'], 'unique': True}]
+    )
+}}
+
+with activity as (
+    select
+        channel_name,
+        min(date_key) as first_post_date,
+        max(date_key) as last_post_date,
+        count(*) filter (where message_count > 0) as active_days,
+        sum(message_count) as total_messages,
+        sum(total_views) as total_views,
+        sum(total_forwards) as total_forwards
+    from {{ ref('stg_channel_activity_daily') }}
+    group by channel_name
+)
+
+select
+    coalesce(channels.channel_name, activity.channel_name) as channel_name,
+    channels.channel_id,
+    channels.channel_title,
+    channels.telegram_id,
+    channels.participant_count,
+    coalesce(channels.is_active, true) as is_active,
+    channels.last_scraped,
+    activity.first_post_date,
+    activity.last_post_date,
+    coalesce(activity.active_days, 0) as active_days,
+    coalesce(activity.total_messages, 0) as total_messages,
+    coalesce(activity.total_views, 0) as total_views,
+    coalesce(activity.total_forwards, 0) as total_forwards,
+    round(activity.total_views::numeric / nullif(activity.total_messages, 0), 1) as avg_views_per_message
+from {{ ref('stg_channels') }} as channels
+full outer join activity
+    on activity.channel_name = channels.channel_name
@@ -0,0 +1,27 @@
+-- Calendar from the first to the last message day. The bounds come from
+-- the message_at index of fct_messages, so the rebuild is a few thousand rows.
+{{
+    config(
+        materialized='table',
+        indexes=[{'columns': ['date_key'], 'unique': True}]
+    )
+}}
+
+with bounds as (
+    select min(message_at)::date as first_day, max(message_at)::date as last_day
+    from {{ ref('fct_messages') }}
+)
+
+select
+    day::date as date_key,
+    extract(year from day)::int as year,
+    extract(quarter from day)::int as quarter,
+    extract(month from day)::int as month,
+    to_char(day, 'Month') as month_name,
+    extract(week from day)::int as week_of_year,
+    extract(day from day)::int as day_of_month,
+    extract(isodow from day)::int as day_of_week,
+    trim(to_char(day, 'Day')) as day_name,
+    extract(isodow from day) in (6, 7) as is_weekend
+from bounds,
+    generate_series(bounds.first_day, bounds.last_day, interval '1 day') as day
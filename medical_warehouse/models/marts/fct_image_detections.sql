@@ -0,0 +1,35 @@
+-- One row per detected message photo. image_detections is insert-only, so
+-- incremental runs read just the rows past the mart's high-watermark.
+{{
+    config(
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key=['channel_name', 'message_id'],
+        indexes=[
+            {'columns': ['channel_name', 'message_id'], 'unique': True},
+            {'columns': ['detection_pk']},
+            {'columns': ['channel_name', 'image_category']},
+        ]
+    )
+}}
+
+select
+    detections.detection_pk,
+    detections.channel_name,
+    detections.message_id,
+    messages.message_pk,
+    messages.date_key,
+    detections.content_hash,
+    detections.image_category,
+    detections.object_count,
+    detections.max_confidence,
+    detections.model_name,
+    detections.detected_at
+from {{ ref('stg_image_detections') }} as detections
+left join {{ ref('fct_messages') }} as messages
+    on messages.channel_name = detections.channel_name
+   and messages.message_id = detections.message_id
+
+{% if is_incremental() %}
+where detections.detection_pk > (select coalesce(max(detection_pk), 0) from {{ this }})
+{% endif %}
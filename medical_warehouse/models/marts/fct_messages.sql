@@ -0,0 +1,44 @@
+-- One row per message. Incremental runs only read rows inserted since the
+-- last run (message_pk above the mart's high-watermark) plus the posts of
+-- the last stats_lookback_days, whose views/forwards are still refreshed
+-- in place by update_message_stats without touching scraped_at.
+-- message_tsv backs /api/search/messages, (channel_name, date_key) and
+-- message_at /api/channels/{name}/activity. A mart built before
+-- message_tsv existed needs `dbt run --full-refresh -s fct_messages`.
+{{
+    config(
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key=['channel_name', 'message_id'],
+        on_schema_change='append_new_columns',
+        indexes=[
+            {'columns': ['channel_name', 'message_id'], 'unique': True},
+            {'columns': ['message_pk']},
+            {'columns': ['message_at']},
+            {'columns': ['channel_name', 'date_key']},
+            {'columns': ['message_tsv'], 'type': 'gin'},
+        ]
+    )
+}}
+
+select
+    message_pk,
+    message_id,
+    channel_name,
+    date_key,
+    message_at,
+    message_text,
+    message_length,
+    sender_id,
+    views,
+    forwards,
+    scraped_at,
+    -- Same configuration as the message_tsv column of telegram_messages
+    to_tsvector('simple', message_text) as message_tsv
+from {{ ref('stg_telegram_messages') }}
+
+{% if is_incremental() %}
+where message_pk > (select coalesce(max(message_pk), 0) from {{ this }})
+   or message_at >= (select max(message_at) from {{ this }})
+                     - interval '{{ var("stats_lookback_days") }} days'
+{% endif %}
@@ -0,0 +1,7 @@
+select
+    channel_name,
+    day as date_key,
+    message_count,
+    total_views,
+    total_forwards
+from {{ source('warehouse', 'channel_activity_daily') }}
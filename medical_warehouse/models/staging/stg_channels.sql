@@ -0,0 +1,12 @@
+select
+    id as channel_id,
+    channel_name,
+    nullif(trim(channel_title), '') as channel_title,
+    telegram_id,
+    description,
+    participant_count,
+    coalesce(is_active, 1) = 1 as is_active,
+    last_scraped,
+    last_message_id,
+    created_at
+from {{ source('warehouse', 'channels') }}
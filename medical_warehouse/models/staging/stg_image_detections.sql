@@ -0,0 +1,11 @@
+select
+    id as detection_pk,
+    channel_name,
+    message_id,
+    content_hash,
+    coalesce(image_category, 'other') as image_category,
+    coalesce(object_count, 0) as object_count,
+    max_confidence,
+    model_name,
+    detected_at
+from {{ source('warehouse', 'image_detections') }}
@@ -0,0 +1,16 @@
+-- Messages renamed and typed for the marts. A view, so filters on
+-- message_pk / message_at reach the primary key and date indexes.
+select
+    id as message_pk,
+    message_id,
+    channel_name,
+    nullif(trim(channel_title), '') as channel_title,
+    coalesce(message_text, '') as message_text,
+    length(coalesce(message_text, '')) as message_length,
+    sender_id,
+    coalesce(views, 0) as views,
+    coalesce(forwards, 0) as forwards,
+    date as message_at,
+    cast(date as date) as date_key,
+    scraped_at
+from {{ source('warehouse', 'telegram_messages') }}
@@ -0,0 +1,242 @@
+# dagster_pipeline.py - Dagster code location for the warehouse pipeline
+"""
+Dagster assets for scrape -> load -> enrich -> aggregate.
+
+    raw_channel_messages  one day of one channel, scraped into the raw lake
+    warehouse_messages    that raw partition loaded into telegram_messages
+    image_scores          YOLO detections for that day's photos of the channel
+    image_detections      those detections stored in image_detections
+    report_rollups        product-mention index behind the reports
+
+The first four are partitioned by day and channel, so a backfill is one
+run per (day, channel): the run queue launches them in parallel, each in
+its own process, and only partitions that are missing (or were marked
+stale by a new upstream materialization) are run. The channel activity
+rollups are maintained by the load itself (see ingest.py).
+report_rollups is not partitioned: the product-mention stage advances
+one global watermark, so it runs once after the partitions it depends
+on instead of once per partition.
+
+Assets that write to the warehouse share the "warehouse_db" concurrency
+pool, and raw_channel_messages uses the "telegram" pool. main() sets
+their limits on the instance (see pool_limits()):
+
+    warehouse_db  1 on SQLite, which allows one writer at a time;
+                  WAREHOUSE_POOL_LIMIT (default 4) on Postgres
+    telegram      1: one process talks to the Telegram account, so the
+                  RateLimiter budget and its flood-wait pauses (which
+                  live in a process) hold across a backfill
+
+Everything else runs outside the pools, in parallel up to the run
+queue's limit: image_scores decodes and scores photos while only
+reading the warehouse, and image_detections holds a writer slot just
+for the insert. Until main() has run, dagster_home/dagster.yaml's
+default limit of one op per pool applies. Channels are resolved through
+entity_cache.EntityCache, so a backfill resolves each username once,
+not once per partition.
+
+PIPELINE_CHANNELS (comma separated) and PIPELINE_START_DATE define the
+partitions; PIPELINE_FAKE_TELEGRAM=1 serves messages from
+FakeTelegramClient instead of Telegram.
+
+Usage: DAGSTER_HOME=$PWD/dagster_home python src/dagster_pipeline.py   (sets the pool limits)
+       DAGSTER_HOME=$PWD/dagster_home dagster dev -f src/dagster_pipeline.py
+"""
+import asyncio
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from dagster import (
+    AssetExecutionContext,
+    AssetSelection,
+    ConfigurableResource,
+    DagsterInstance,
+    DailyPartitionsDefinition,
+    Definitions,
+    MaterializeResult,
+    MultiPartitionsDefinition,
+    StaticPartitionsDefinition,
+    asset,
+    define_asset_job,
+)
+from sqlalchemy import select
+
+from database_sqlite import SessionLocal, TelegramMessage, engine
+from entity_cache import EntityCache
+from fake_telegram import FakeTelegramClient
+from image_detection import ImageDetector, write_detections
+from lake_loader import load_files
+from message_record import MessageRecord
+from product_mentions import update_product_mentions
+from rate_limiter import RateLimiter, iter_messages_resumable
+from raw_lake import RAW_MESSAGES_DIR, RawLakeWriter
+
+CHANNELS = [name.strip() for name in
+            os.getenv('PIPELINE_CHANNELS', 'CheMed123,lobelia4cosmetics,tikvahpharma').split(',')]
+START_DATE = os.getenv('PIPELINE_START_DATE', '2025-01-01')
+
+PARTITIONS = MultiPartitionsDefinition({
+    'date': DailyPartitionsDefinition(start_date=START_DATE),
+    'channel': StaticPartitionsDefinition(CHANNELS),
+})
+
+WAREHOUSE_WRITER = {'dagster/concurrency_key': 'warehouse_db'}
+TELEGRAM_CLIENT = {'dagster/concurrency_key': 'telegram'}
+WAREHOUSE_POOL_LIMIT = int(os.getenv('WAREHOUSE_POOL_LIMIT', '4'))
+
+
+def pool_limits(url=None):
+    """Slots per concurrency pool for the warehouse at `url` (default: the configured one)"""
+    url = url or engine.url
+    writers = 1 if url.get_backend_name() == 'sqlite' else WAREHOUSE_POOL_LIMIT
+    return {'warehouse_db': writers, 'telegram': 1}
+
+
+def configure_pools(instance, url=None):
+    """Set the pool limits on a Dagster instance, as `dagster instance concurrency set` does"""
+    limits = pool_limits(url)
+    for pool, limit in limits.items():
+        instance.event_log_storage.set_concurrency_slots(pool, limit)
+    return limits
+
+
+class TelegramSource(ConfigurableResource):
+    """Telethon client from .env credentials, or a fake one for offline runs"""
+
+    fake: bool = False
+    # The fake client posts one message a minute from fake_start_date on
+    fake_start_date: str = START_DATE
+    fake_days: int = 30
+
+    def client(self, channel):
+        if self.fake:
+            start = datetime.fromisoformat(self.fake_start_date).replace(tzinfo=timezone.utc)
+            return FakeTelegramClient({channel: self.fake_days * 24 * 60}, start_date=start)
+
+        from telethon import TelegramClient
+        from telethon.sessions import StringSession
+
+        # Parallel runs cannot share one session file; a string session can be
+        session = StringSession(os.environ['TELEGRAM_SESSION']) if os.getenv('TELEGRAM_SESSION') \
+            else 'medical_scraper'
+        return TelegramClient(session, int(os.environ['TELEGRAM_API_ID']),
+                              os.environ['TELEGRAM_API_HASH'], flood_sleep_threshold=0)
+
+
+def partition_keys(context):
+    """(day, channel) of the partition being materialized"""
+    keys = context.partition_key.keys_by_dimension
+    return date.fromisoformat(keys['date']), keys['channel']
+
+
+def day_bounds(day):
+    start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+async def scrape_day(client, channel, day):
+    """Stream one channel's messages from one day into the raw lake"""
+    day_start, day_end = day_bounds(day)
+    await client.start()
+    try:
+        limiter = RateLimiter.from_env()
+        with SessionLocal() as db:
+            entity = await EntityCache(db, client, limiter).resolve(channel)
+        if entity is None:
+            raise ValueError(f"Channel {channel} does not exist")
+        with RawLakeWriter(channel, date=day.isoformat()) as lake:
+            # Newest first from the end of the day, until the day is done
+            async for message in iter_messages_resumable(client, entity, channel, limiter,
+                                                         offset_date=day_end):
+                if message.date < day_start:
+                    break
+                lake.write(MessageRecord.from_telethon(message, channel))
+        return lake.records
+    finally:
+        await client.disconnect()
+
+
+@asset(partitions_def=PARTITIONS, group_name='ingest', op_tags=TELEGRAM_CLIENT)
+def raw_channel_messages(context: AssetExecutionContext, telegram: TelegramSource) -> MaterializeResult:
+    """One day of a channel's messages as NDJSON parts in the raw lake"""
+    day, channel = partition_keys(context)
+    records = asyncio.run(scrape_day(telegram.client(channel), channel, day))
+    return MaterializeResult(metadata={'messages': records})
+
+
+@asset(partitions_def=PARTITIONS, deps=[raw_channel_messages], group_name='warehouse',
+       op_tags=WAREHOUSE_WRITER)
+def warehouse_messages(context: AssetExecutionContext) -> MaterializeResult:
+    """The partition's raw files loaded into telegram_messages (and the activity rollups)"""
+    day, channel = partition_keys(context)
+    partition_dir = RAW_MESSAGES_DIR / day.isoformat() / channel
+    files = [(path, channel) for path in sorted(partition_dir.glob('part-*.ndjson*'))]
+    with SessionLocal() as db:
+        stats = load_files(db, files, workers=1)
+    return MaterializeResult(metadata={'files': stats['files'], 'inserted': stats['inserted']})
+
+
+@asset(partitions_def=PARTITIONS, deps=[warehouse_messages], group_name='enrichment')
+def image_scores(context: AssetExecutionContext) -> list:
+    """YOLO detection rows for the photos of the partition's messages, not yet stored
+
+    Decoding and inference only read the warehouse, so they run outside
+    the writer pool.
+    """
+    day, channel = partition_keys(context)
+    day_start, day_end = day_bounds(day)
+    messages = TelegramMessage.__table__
+    with SessionLocal() as db:
+        message_ids = set(db.execute(
+            select(messages.c.message_id)
+            .where(messages.c.channel_name == channel)
+            .where(messages.c.date >= day_start.replace(tzinfo=None))
+            .where(messages.c.date < day_end.replace(tzinfo=None))
+        ).scalars())
+        if not message_ids:
+            return []
+        detector = ImageDetector(db, channel=channel, message_ids=message_ids, workers=1, collect=True)
+        detector.run()
+    context.add_output_metadata({'images': len(detector.rows)})
+    return detector.rows
+
+
+@asset(partitions_def=PARTITIONS, group_name='enrichment', op_tags=WAREHOUSE_WRITER)
+def image_detections(image_scores: list) -> MaterializeResult:
+    """The partition's detection rows inserted into image_detections"""
+    with SessionLocal() as db:
+        write_detections(db, image_scores)
+    return MaterializeResult(metadata={'images': len(image_scores)})
+
+
+@asset(deps=[warehouse_messages], group_name='reports', op_tags=WAREHOUSE_WRITER)
+def report_rollups() -> MaterializeResult:
+    """Product-mention index read by /api/reports/top-products"""
+    with SessionLocal() as db:
+        processed = update_product_mentions(db)
+    return MaterializeResult(metadata={'messages_processed': processed})
+
+
+partitioned_assets_job = define_asset_job(
+    'partitioned_assets_job',
+    selection=AssetSelection.assets(raw_channel_messages, warehouse_messages, image_scores,
+                                    image_detections),
+    partitions_def=PARTITIONS,
+)
+
+defs = Definitions(
+    assets=[raw_channel_messages, warehouse_messages, image_scores, image_detections, report_rollups],
+    jobs=[partitioned_assets_job],
+    resources={'telegram': TelegramSource(fake=os.getenv('PIPELINE_FAKE_TELEGRAM') == '1')},
+)
+
+
+def main():
+    with DagsterInstance.get() as instance:
+        limits = configure_pools(instance)
+    for pool, limit in limits.items():
+        print(f"✓ Pool {pool}: {limit} concurrent op(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,75 @@
 
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Text, BigInteger, DateTime
+from sqlalchemy import create_engine, event, make_url, Column, Integer, Float, String, Text, BigInteger, Date, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 from dotenv import load_dotenv
 
+from migrations import apply_migrations
+
 load_dotenv()
 
 # SQLite database configuration - uses a local file
 DB_PATH = os.getenv('DB_PATH', 'medical_telegram.db')
-DATABASE_URL = f"sqlite:///{DB_PATH}"
+# A postgresql:// DATABASE_URL (the database the API reads) puts the
+# warehouse on Postgres instead, where ingest writes with COPY
+DATABASE_URL = os.getenv('DATABASE_URL') or f"sqlite:///{DB_PATH}"
+
+# Connection settings per workload, applied to every new SQLite connection.
+# WAL lets readers (verify scripts, the API) run while a scrape is writing,
+# and synchronous=NORMAL fsyncs at checkpoints instead of on every commit.
+SQLITE_PROFILES = {
+    "ingest": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,        # KiB (negative) -> 64 MB page cache
+        "mmap_size": 268435456,      # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,        # ms to wait for a lock before failing
+    },
+    "read-mostly": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "mmap_size": 1073741824,     # 1 GB
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+    # SQLite's own defaults: rollback journal, fsync on every commit
+    "default": {},
+}
+
+def make_engine(db_path=DB_PATH, profile=None, **pragmas):
+    """Create a SQLite engine tuned with a named profile
+    
+    Extra keyword arguments override individual pragmas of the profile.
+    """
+    profile = profile or os.getenv('SQLITE_PROFILE', 'ingest')
+    settings = {**SQLITE_PROFILES[profile], **pragmas}
+    
+    sqlite_engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    
+    @event.listens_for(sqlite_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    
+    return sqlite_engine
+
+def make_warehouse_engine(url=DATABASE_URL):
+    """Engine for DATABASE_URL: a tuned SQLite engine, or a pooled Postgres one"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return make_engine(url.database or DB_PATH)
+    if url.drivername in ("postgresql", "postgres"):
+        url = url.set(drivername="postgresql+psycopg2")
+    return create_engine(url, pool_pre_ping=True)
 
 # Create engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = make_warehouse_engine()
 
 # Create base class for models
 Base = declarative_base()
@@ -24,6 +80,14 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 class TelegramMessage(Base):
     """Model for storing Telegram messages"""
     __tablename__ = "telegram_messages"
+    __table_args__ = (
+        # One row per Telegram message; lets bulk inserts skip duplicates.
+        # Its leading column also serves lookups and grouping by channel.
+        Index('ux_telegram_messages_channel_message', 'channel_name', 'message_id', unique=True),
+        Index('ix_telegram_messages_date', 'date'),
+        # Covers per-channel activity (counts, views, forwards by day)
+        Index('ix_telegram_messages_channel_activity', 'channel_name', 'date', 'views', 'forwards'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     message_id = Column(BigInteger, nullable=False)  # Original Telegram message ID
@@ -51,15 +115,157 @@ class ChannelInfo(Base):
     participant_count = Column(Integer)
     is_active = Column(Integer, default=1)
     last_scraped = Column(DateTime)
+    last_message_id = Column(BigInteger)  # High-watermark: newest message id stored
+    access_hash = Column(BigInteger)  # With telegram_id, enough to use the channel unresolved
+    resolved_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     def __repr__(self):
         return f"<ChannelInfo(name={self.channel_name}, title={self.channel_title})>"
 
+class MediaFile(Base):
+    """Maps a message's photo to its content-addressed blob in data/raw/media"""
+    __tablename__ = "media_files"
+    __table_args__ = (
+        Index('ux_media_files_channel_message', 'channel_name', 'message_id', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    channel_name = Column(String(255), nullable=False)
+    message_id = Column(BigInteger, nullable=False)
+    photo_id = Column(BigInteger, index=True)  # Telegram photo id, shared by reposts
+    content_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of the file
+    file_size = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<MediaFile(channel={self.channel_name}, message_id={self.message_id}, hash={self.content_hash[:12]})>"
+
+class ImageDetection(Base):
+    """YOLO detections and derived category for one message's photo"""
+    __tablename__ = "image_detections"
+    __table_args__ = (
+        Index('ux_image_detections_channel_message', 'channel_name', 'message_id', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    channel_name = Column(String(255), nullable=False)
+    message_id = Column(BigInteger, nullable=False)
+    content_hash = Column(String(64), index=True)  # Same photo elsewhere reuses these results
+    image_category = Column(String(50))  # promotional / product_display / lifestyle / other / unreadable
+    detected_objects = Column(Text)  # JSON list of {"class", "confidence"}
+    object_count = Column(Integer, default=0)
+    max_confidence = Column(Float)
+    model_name = Column(String(100))
+    detected_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ImageDetection(channel={self.channel_name}, message_id={self.message_id}, category={self.image_category})>"
+
+class ChannelActivityDaily(Base):
+    """Per-channel message count, views and forwards per day, kept current by ingest"""
+    __tablename__ = "channel_activity_daily"
+    __table_args__ = (
+        Index('ux_channel_activity_daily_channel_day', 'channel_name', 'day', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    channel_name = Column(String(255), nullable=False)
+    day = Column(Date, nullable=False)
+    message_count = Column(Integer, nullable=False, default=0)
+    total_views = Column(BigInteger, nullable=False, default=0)
+    total_forwards = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ChannelActivityDaily(channel={self.channel_name}, day={self.day})>"
+
+class ChannelActivityHourly(Base):
+    """Same as ChannelActivityDaily, per hour (timestamps truncated to the hour)"""
+    __tablename__ = "channel_activity_hourly"
+    __table_args__ = (
+        Index('ux_channel_activity_hourly_channel_hour', 'channel_name', 'hour', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    channel_name = Column(String(255), nullable=False)
+    hour = Column(DateTime, nullable=False)
+    message_count = Column(Integer, nullable=False, default=0)
+    total_views = Column(BigInteger, nullable=False, default=0)
+    total_forwards = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ChannelActivityHourly(channel={self.channel_name}, hour={self.hour})>"
+
+class ProductMention(Base):
+    """Messages mentioning a product, per channel and day"""
+    __tablename__ = "product_mentions"
+    __table_args__ = (
+        Index('ux_product_mentions_product_channel_day', 'product', 'channel_name', 'day', unique=True),
+        Index('ix_product_mentions_day', 'day'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product = Column(String(100), nullable=False)  # Canonical lexicon name
+    channel_name = Column(String(255), nullable=False)
+    day = Column(Date, nullable=False)
+    mention_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ProductMention(product={self.product}, channel={self.channel_name}, day={self.day})>"
+
+class PipelineState(Base):
+    """Progress of incremental processing stages over telegram_messages"""
+    __tablename__ = "pipeline_state"
+    
+    stage = Column(String(100), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)  # Highest telegram_messages.id processed
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<PipelineState(stage={self.stage}, last_id={self.last_id})>"
+
+class DataVersion(Base):
+    """Counter bumped by every commit that changes warehouse data; the API
+    uses it to invalidate cached responses"""
+    __tablename__ = "data_version"
+    
+    name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<DataVersion(name={self.name}, version={self.version})>"
+
+class LoadedFile(Base):
+    """Raw lake file already loaded into telegram_messages by lake_loader.py"""
+    __tablename__ = "loaded_files"
+    
+    path = Column(String(1024), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    mtime = Column(Float, nullable=False)
+    content_hash = Column(String(64), nullable=False)  # SHA-256 of the file
+    records = Column(Integer, nullable=False, default=0)
+    loaded_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<LoadedFile(path={self.path}, records={self.records})>"
+
+class UnresolvedChannel(Base):
+    """Username that resolved to nothing, kept so entity_cache.py does not
+    ask again before ENTITY_MISS_TTL has passed"""
+    __tablename__ = "unresolved_channels"
+    
+    channel_name = Column(String(255), primary_key=True)
+    error = Column(String(255))
+    checked_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<UnresolvedChannel(name={self.channel_name}, checked_at={self.checked_at})>"
+
 def create_tables():
     """Create all tables in the database"""
     Base.metadata.create_all(bind=engine)
-    print(f"✓ Database tables created successfully in {DB_PATH}!")
+    apply_migrations(engine)
+    print(f"✓ Database tables created successfully in {engine.url.render_as_string()}!")
 
 def get_db():
     """Get database session"""
@@ -73,7 +279,7 @@ def get_db():
 def test_connection():
     try:
         connection = engine.connect()
-        print(f"✓ Database connection successful: {DATABASE_URL}")
+        print(f"✓ Database connection successful: {engine.url.render_as_string()}")
         connection.close()
         return True
     except Exception as e:
@@ -0,0 +1,163 @@
+# entity_cache.py - Channel entity resolution cached in the warehouse
+"""
+Entity resolution cache.
+
+Resolving a username with client.get_entity() costs a Telegram request,
+and username resolution is one of the most tightly flood-limited calls.
+All a channel needs to be scraped is its id and access hash, so once a
+channel is resolved both are kept in the channels table and later runs
+build an InputPeerChannel from them without any request.
+
+Names not in the cache are resolved concurrently under the shared
+RateLimiter. Usernames that do not exist are remembered in
+unresolved_channels and not asked about again until ENTITY_MISS_TTL
+seconds (default one day) have passed. Other errors (network,
+timeouts) are not cached, and the name is left out of resolve_many()'s
+result, so the caller can try it again.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from telethon.errors import UsernameInvalidError, UsernameNotOccupiedError
+from telethon.tl.types import InputPeerChannel
+
+from database_sqlite import ChannelInfo, UnresolvedChannel
+from rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+ENTITY_MISS_TTL = float(os.getenv('ENTITY_MISS_TTL', str(24 * 3600)))
+
+# get_entity() raises ValueError for usernames nobody has
+NOT_FOUND_ERRORS = (ValueError, UsernameNotOccupiedError, UsernameInvalidError)
+
+
+def input_channel(entity):
+    """InputPeerChannel for a resolved channel (broadcast or megagroup), else None"""
+    access_hash = getattr(entity, 'access_hash', None)
+    # Users have an access hash too, but no megagroup flag
+    if access_hash is None or not hasattr(entity, 'megagroup'):
+        return None
+    return InputPeerChannel(entity.id, access_hash)
+
+
+class EntityCache:
+    """Resolves channel usernames, from the channels table where possible
+
+    Resolved channels come back as InputPeerChannel (cached) or as the
+    entity get_entity() returned; `titles` has the title of every channel
+    resolved either way, `errors` the exception of every name that could
+    not be resolved for another reason than not existing.
+    """
+
+    def __init__(self, db, client, limiter=None, miss_ttl=ENTITY_MISS_TTL):
+        self.db = db
+        self.client = client
+        self.limiter = limiter or RateLimiter.from_env()
+        self.miss_ttl = miss_ttl
+        self.titles = {}
+        self.errors = {}
+        # Counters for the sweep summary
+        self.hits = 0
+        self.cached_misses = 0
+        self.resolved = 0
+        self.not_found = 0
+
+    async def resolve(self, name):
+        """Entity, None if the name does not exist; raises on other errors"""
+        result = await self.resolve_many([name])
+        if name not in result:
+            raise self.errors[name]
+        return result[name]
+
+    async def resolve_many(self, names):
+        """{name: entity, or None if it does not exist}
+
+        Names that failed otherwise are left out; see `errors`.
+        """
+        names = list(dict.fromkeys(names))
+        known = {
+            row.channel_name: row
+            for row in self.db.query(ChannelInfo).filter(ChannelInfo.channel_name.in_(names))
+        }
+        cutoff = datetime.utcnow() - timedelta(seconds=self.miss_ttl)
+        missing = {
+            row.channel_name
+            for row in self.db.query(UnresolvedChannel).filter(
+                UnresolvedChannel.channel_name.in_(names), UnresolvedChannel.checked_at >= cutoff
+            )
+        }
+
+        result = {}
+        pending = []
+        for name in names:
+            row = known.get(name)
+            if row is not None and row.telegram_id and row.access_hash is not None:
+                result[name] = InputPeerChannel(row.telegram_id, row.access_hash)
+                self.titles[name] = row.channel_title or ''
+                self.hits += 1
+            elif name in missing:
+                result[name] = None
+                self.cached_misses += 1
+            else:
+                pending.append(name)
+
+        if pending:
+            outcomes = await asyncio.gather(*(self._fetch(name) for name in pending))
+            for name, (entity, error) in zip(pending, outcomes):
+                if isinstance(error, Exception):
+                    continue  # transient: not cached, not in the result
+                result[name] = entity
+                if entity is not None:
+                    self._store(name, entity, known.get(name))
+                else:
+                    self.db.merge(UnresolvedChannel(
+                        channel_name=name, error=error[:255], checked_at=datetime.utcnow()
+                    ))
+            self.db.commit()
+        return result
+
+    async def _fetch(self, name):
+        """(entity, None) on success, (None, message) if the name does not
+        exist, (None, exception) on other errors"""
+        try:
+            entity = await self.limiter.call(name, self.client.get_entity, name)
+        except NOT_FOUND_ERRORS as e:
+            self.not_found += 1
+            return None, str(e) or type(e).__name__
+        except Exception as e:
+            logger.error(f"  ✗ Could not resolve {name}: {e}")
+            self.errors[name] = e
+            return None, e
+        self.errors.pop(name, None)
+        self.resolved += 1
+        return entity, None
+
+    def _store(self, name, entity, row):
+        """Keep a freshly resolved channel's id and access hash"""
+        title = getattr(entity, 'title', '') or ''
+        self.titles[name] = title
+        self.db.query(UnresolvedChannel).filter_by(channel_name=name).delete()
+        peer = input_channel(entity)
+        if peer is None:
+            return  # not a channel, nothing to cache
+        # Another name for a channel we already have: leave that row alone
+        other = self.db.query(ChannelInfo).filter(
+            ChannelInfo.telegram_id == peer.channel_id, ChannelInfo.channel_name != name
+        ).first()
+        if other is not None:
+            return
+        if row is None:
+            row = ChannelInfo(channel_name=name)
+            self.db.add(row)
+        row.channel_title = row.channel_title or title
+        row.telegram_id = peer.channel_id
+        row.access_hash = peer.access_hash
+        row.resolved_at = datetime.utcnow()
+
+    def invalidate(self, name):
+        """Forget a channel's access hash so the next run resolves it again"""
+        self.db.query(ChannelInfo).filter_by(channel_name=name).update({'access_hash': None})
+        self.db.commit()
@@ -0,0 +1,158 @@
+# export.py - Streaming export of telegram_messages
+"""
+Constant-memory export of the messages table to CSV or Parquet.
+
+Rows are read in keyset pages (WHERE id > last_id ORDER BY id LIMIT n),
+each through a server-side cursor where the driver supports one, and
+written out as they arrive: CSV rows are appended to the file, Parquet
+gets one row group per page. Memory use depends on the page size, not
+on the size of the table. The output is written under a temporary name
+and renamed into place when complete.
+
+Usage: python src/export.py [--format csv|parquet] [--channel NAME] [--from DATE] [--to DATE] [--output FILE]
+"""
+import argparse
+import csv
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select
+
+from database_sqlite import TelegramMessage, engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency, needed for Parquet only
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 10000
+
+messages_table = TelegramMessage.__table__
+
+# Output column -> telegram_messages column, as in the original CSV export
+EXPORT_COLUMNS = {
+    'message_id': 'message_id',
+    'channel': 'channel_name',
+    'date': 'date',
+    'message': 'message_text',
+    'views': 'views',
+    'forwards': 'forwards',
+    'scraped_at': 'scraped_at',
+}
+
+
+def iter_message_pages(connection, channel=None, date_from=None, date_to=None, page_size=DEFAULT_PAGE_SIZE):
+    """Yield lists of message rows in primary-key order, page_size at a time"""
+    columns = [messages_table.c.id] + [messages_table.c[name] for name in EXPORT_COLUMNS.values()]
+    query = select(*columns).order_by(messages_table.c.id).limit(page_size)
+    if channel:
+        query = query.where(messages_table.c.channel_name == channel)
+    if date_from:
+        query = query.where(messages_table.c.date >= date_from)
+    if date_to:
+        query = query.where(messages_table.c.date < date_to)
+
+    last_id = 0
+    while True:
+        result = connection.execution_options(stream_results=True).execute(
+            query.where(messages_table.c.id > last_id)
+        )
+        page = result.fetchall()
+        if not page:
+            return
+        last_id = page[-1].id
+        yield page
+
+
+class CsvExportWriter:
+    def __init__(self, path):
+        # utf-8-sig keeps Amharic text readable when the file is opened in Excel
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file, lineterminator='\n')
+        self.writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, page):
+        self.writer.writerows(row[1:] for row in page)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExportWriter:
+    def __init__(self, path):
+        if pq is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        self.schema = pa.schema([
+            ('message_id', pa.int64()),
+            ('channel', pa.string()),
+            ('date', pa.timestamp('us')),
+            ('message', pa.string()),
+            ('views', pa.int64()),
+            ('forwards', pa.int64()),
+            ('scraped_at', pa.timestamp('us')),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, page):
+        columns = list(zip(*(row[1:] for row in page)))
+        # One row group per page
+        self.writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'csv': CsvExportWriter, 'parquet': ParquetExportWriter}
+
+
+def export_messages(output, format=None, channel=None, date_from=None, date_to=None,
+                    page_size=DEFAULT_PAGE_SIZE, bind=engine):
+    """Stream matching messages into `output`; returns the number of rows written"""
+    output = Path(output)
+    format = format or output.suffix.lstrip('.')
+    if format not in WRITERS:
+        raise ValueError(f"Unknown export format: {format}")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(f".{output.name}.inprogress")
+    writer = WRITERS[format](tmp_path)
+    rows = 0
+    try:
+        with bind.connect() as connection:
+            for page in iter_message_pages(connection, channel, date_from, date_to, page_size):
+                writer.write(page)
+                rows += len(page)
+        writer.close()
+    except BaseException:
+        writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, output)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+    parser.add_argument('--channel')
+    parser.add_argument('--from', dest='date_from', type=datetime.fromisoformat)
+    parser.add_argument('--to', dest='date_to', type=datetime.fromisoformat)
+    parser.add_argument('--output')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args()
+
+    output = args.output or f"telegram_messages_export.{args.format}"
+    rows = export_messages(output, args.format, args.channel, args.date_from, args.date_to, args.page_size)
+    print(f"✓ Exported {rows} messages to {output}")
+
+
+if __name__ == "__main__":
+    main()
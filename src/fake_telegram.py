@@ -0,0 +1,240 @@
+# fake_telegram.py - In-memory stand-in for TelegramClient
+"""
+Fake Telegram client for benchmarks and offline runs.
+
+Implements the small part of the Telethon client API the scrapers use
+(get_entity, iter_messages, iter_download, start/connect/disconnect)
+over synthetic channels, and counts the API requests a real client would
+have made. An optional per-request latency makes timing comparisons
+meaningful, and flood_every injects FloodWaitError to test throttling.
+"""
+import asyncio
+import bisect
+import hashlib
+import random
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from telethon.errors import ChannelInvalidError, FloodWaitError
+from telethon.tl.types import InputPeerChannel
+
+# Telegram returns history in pages of at most 100 messages per request
+HISTORY_PAGE_SIZE = 100
+# Files are downloaded in chunks of at most 512KB per request
+DOWNLOAD_CHUNK_SIZE = 512 * 1024
+
+SAMPLE_TEXTS = [
+    "Paracetamol 500mg available now, call for price",
+    "New stock: Vitamin C 1000mg effervescent tablets",
+    "Amoxicillin 250mg capsules - prescription required",
+    "Skin care sale this week only! Moisturizers and sunscreen",
+    "Ibuprofen 400mg tablets in stock",
+    "Please consult your pharmacist before using any medication",
+]
+
+
+class FakeChannel:
+    """Channel entity returned by get_entity"""
+
+    megagroup = False
+
+    def __init__(self, channel_id, username, title=None):
+        self.id = channel_id
+        self.access_hash = channel_id * 104729
+        self.username = username
+        self.title = title or username
+
+
+class FakePhoto:
+    """Photo whose bytes are derived from its id"""
+
+    def __init__(self, photo_id, size=64 * 1024):
+        self.id = photo_id
+        self.access_hash = photo_id * 7919
+        self.size = size
+
+    def content(self):
+        block = hashlib.sha256(str(self.id).encode()).digest()
+        return (block * (self.size // len(block) + 1))[:self.size]
+
+
+class FakeMessageMediaPhoto:
+    """Media wrapper, like telethon.tl.types.MessageMediaPhoto"""
+
+    def __init__(self, photo):
+        self.photo = photo
+
+
+class FakeMessage:
+    """Message with the attributes the scrapers read from Telethon messages"""
+
+    def __init__(self, message_id, date, text, sender_id=None, views=0, forwards=0, media=None, client=None):
+        self.id = message_id
+        self.date = date
+        self.text = text
+        self.sender_id = sender_id
+        self.views = views
+        self.forwards = forwards
+        self.media = media
+        self.client = client
+
+    @property
+    def photo(self):
+        return getattr(self.media, 'photo', None)
+
+    async def download_media(self, file):
+        with open(file, 'wb') as f:
+            async for chunk in self.client.iter_download(self.media):
+                f.write(chunk)
+        return file
+
+
+class FakeTelegramClient:
+    """Serves synthetic channel history and records request counts"""
+
+    def __init__(self, channels, seed=42, start_date=None, latency=0.0,
+                 photo_ratio=0.0, photo_pool=None, photo_size=64 * 1024,
+                 flood_every=0, flood_seconds=1):
+        # channels: {username: number_of_messages}
+        # photo_ratio: share of messages carrying a photo; photo_pool: number
+        # of distinct photos (smaller pools mean more reposted images)
+        # flood_every: every Nth request fails with a flood wait
+        self.requests = 0
+        self.flood_waits = 0
+        self.request_log = []
+        self.flood_every = flood_every
+        self.flood_seconds = flood_seconds
+        self.latency = latency
+        self.photo_ratio = photo_ratio
+        self.photo_pool = photo_pool
+        self.photo_size = photo_size
+        self._rng = random.Random(seed)
+        self._start_date = start_date or datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self._photo_seq = 0
+        self._channels = {}
+        self._messages = {}
+        for username, count in channels.items():
+            # Ids depend on the username only, so separate clients agree on them
+            channel_id = 1000 + zlib.crc32(username.encode()) % 10**9
+            self._channels[username] = FakeChannel(channel_id, username, f"{username} (fake)")
+            self._messages[username] = self._generate(count)
+
+    def _generate(self, count):
+        messages = []
+        for message_id in range(1, count + 1):
+            messages.append(FakeMessage(
+                message_id=message_id,
+                date=self._start_date + timedelta(minutes=message_id),
+                text=self._rng.choice(SAMPLE_TEXTS),
+                sender_id=self._rng.randint(1, 50),
+                views=self._rng.randint(0, 5000),
+                forwards=self._rng.randint(0, 50),
+                media=self._media(),
+                client=self,
+            ))
+        return messages
+
+    def _media(self):
+        if self._rng.random() >= self.photo_ratio:
+            return None
+        if self.photo_pool:
+            photo_id = self._rng.randint(1, self.photo_pool)
+        else:
+            self._photo_seq += 1
+            photo_id = self._photo_seq
+        return FakeMessageMediaPhoto(FakePhoto(photo_id, self.photo_size))
+
+    def _record(self, method, target):
+        self.requests += 1
+        self.request_log.append((method, target))
+
+    async def _request(self, method, target):
+        self._record(method, target)
+        flooded = self.flood_every and self.requests % self.flood_every == 0
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if flooded:
+            self.flood_waits += 1
+            raise FloodWaitError(request=None, capture=self.flood_seconds)
+
+    def _username(self, entity):
+        if isinstance(entity, InputPeerChannel):
+            # A cached peer: no request needed, but the access hash must match
+            for channel in self._channels.values():
+                if channel.id == entity.channel_id and channel.access_hash == entity.access_hash:
+                    return channel.username
+            raise ChannelInvalidError(request=None)
+        return entity.username if isinstance(entity, FakeChannel) else entity
+
+    async def start(self, *args, **kwargs):
+        return self
+
+    async def connect(self):
+        return True
+
+    async def is_user_authorized(self):
+        return True
+
+    async def disconnect(self):
+        return None
+
+    async def get_entity(self, channel):
+        username = self._username(channel)
+        await self._request('get_entity', username)
+        if username not in self._channels:
+            raise ValueError(f'No user has "{username}" as username')
+        return self._channels[username]
+
+    async def iter_messages(self, entity, limit=None, min_id=0, max_id=0, offset_id=0, reverse=False,
+                            offset_date=None):
+        """Yield messages newest first (oldest first if reverse), honouring Telethon's id bounds
+
+        offset_date, newest first only: start with messages older than it.
+        """
+        username = self._username(entity)
+        history = self._messages[username]
+        upper = len(history)
+        if max_id:
+            upper = min(upper, max_id - 1)
+        if offset_date and not reverse:
+            upper = min(upper, bisect.bisect_left([message.date for message in history], offset_date))
+
+        yielded = 0
+        if reverse:
+            # offset_id becomes an exclusive lower bound when reversed
+            position = max(min_id, offset_id)
+            while True:
+                await self._request('iter_messages', username)
+                page_end = min(upper, position + HISTORY_PAGE_SIZE)
+                for message_id in range(position + 1, page_end + 1):
+                    if limit is not None and yielded >= limit:
+                        break
+                    yield history[message_id - 1]
+                    yielded += 1
+                position = page_end
+                if position >= upper or (limit is not None and yielded >= limit):
+                    return
+
+        if offset_id:
+            upper = min(upper, offset_id - 1)
+        position = upper
+        while True:
+            # Like Telethon, even an empty result costs one request
+            await self._request('iter_messages', username)
+            page_end = max(min_id, position - HISTORY_PAGE_SIZE)
+            for message_id in range(position, page_end, -1):
+                if limit is not None and yielded >= limit:
+                    break
+                yield history[message_id - 1]
+                yielded += 1
+            position = page_end
+            if position <= min_id or (limit is not None and yielded >= limit):
+                break
+
+    async def iter_download(self, file, offset=0, request_size=DOWNLOAD_CHUNK_SIZE):
+        """Yield the photo's bytes from offset, one request per chunk"""
+        photo = getattr(file, 'photo', file)
+        content = photo.content()
+        for start in range(offset, len(content), request_size):
+            await self._request('iter_download', photo.id)
+            yield content[start:start + request_size]
@@ -0,0 +1,328 @@
+# image_detection.py - Batched YOLO enrichment of downloaded photos
+"""
+Image detection stage.
+
+Scores the photos under data/raw/images/<channel>/<message_id>.jpg with
+a YOLO model on CPU and stores the detections in image_detections, one
+row per (channel_name, message_id). Only images without a row are
+processed. A photo whose content hash (from media_files) was already
+scored for another message reuses that result instead of running the
+model again. Files that cannot be decoded get an 'unreadable' row too,
+so they are not tried again on every run; delete the row to retry one.
+
+JPEG decoding and resizing run in a process pool while the model scores
+the previous window of images, and images reach the model in batches of
+DETECT_BATCH_SIZE.
+
+Each image gets a category from the objects found:
+    promotional      person and product
+    product_display  product, no person
+    lifestyle        person, no product
+    other            neither
+    unreadable       the file could not be decoded
+
+With collect=True, ImageDetector keeps the rows in `rows` instead of
+writing them, and write_detections() stores them later; the Dagster
+pipeline scores outside its warehouse writer pool that way.
+
+OpenCV and ultralytics are imported when images are decoded and the
+model is loaded, so the module itself imports without them.
+
+Usage: python src/image_detection.py
+"""
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, and_, func, select
+
+from database_sqlite import ImageDetection, MediaFile, SessionLocal, create_tables
+from ingest import bump_data_version, insert_ignore
+from media_pipeline import IMAGES_DIR
+
+logger = logging.getLogger(__name__)
+
+YOLO_MODEL = os.getenv('YOLO_MODEL', 'yolov8n.pt')
+DEFAULT_BATCH_SIZE = int(os.getenv('DETECT_BATCH_SIZE', '8'))
+DEFAULT_WORKERS = int(os.getenv('DECODE_WORKERS', str(os.cpu_count() or 1)))
+IMAGE_SIZE = 640
+CONFIDENCE = 0.25
+
+# COCO classes standing in for pharmacy products (bottles, jars, tubes, boxes)
+PRODUCT_CLASSES = {"bottle", "cup", "bowl", "vase", "toothbrush", "scissors", "book", "handbag"}
+PERSON_CLASSES = {"person"}
+
+detections_table = ImageDetection.__table__
+media_table = MediaFile.__table__
+
+# Detection columns copied to another message with the same photo
+RESULT_COLUMNS = ['image_category', 'detected_objects', 'object_count', 'max_confidence', 'model_name']
+
+
+def categorize(classes):
+    """Image category from the set of detected class names"""
+    person = bool(classes & PERSON_CLASSES)
+    product = bool(classes & PRODUCT_CLASSES)
+    if person and product:
+        return "promotional"
+    if product:
+        return "product_display"
+    if person:
+        return "lifestyle"
+    return "other"
+
+
+def decode_image(path, size=IMAGE_SIZE):
+    """Read a JPEG and shrink it so its longer side is at most `size`
+
+    Runs in pool workers; shrinking there keeps the array sent back small.
+    Returns None for unreadable files.
+    """
+    import cv2
+
+    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    return image
+
+
+def chunks(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def find_images(images_dir=IMAGES_DIR, channel=None):
+    """(channel_name, message_id, path) for every stored photo, or one channel's"""
+    for path in sorted(Path(images_dir).glob(f"{channel or '*'}/*.jpg")):
+        if path.stem.isdigit():
+            yield path.parent.name, int(path.stem), path
+
+
+def pending_images(db, images_dir=IMAGES_DIR, channel=None, message_ids=None):
+    """Photos without detections, as (channel_name, message_id, path, content_hash, known)
+
+    known is the stored result of another message with the same content
+    hash (RESULT_COLUMNS), or None. channel and message_ids restrict the
+    scan (e.g. to one day of one channel). The photos found on disk go
+    into a temporary table and the database picks the ones without
+    detections (an anti-join on the unique keys) and looks up an earlier
+    result by hash for those only, so neither the scored keys nor the
+    detections of other photos are loaded here.
+    """
+    found = Table(
+        'scan_images', MetaData(),
+        Column('channel_name', String(255)),
+        Column('message_id', BigInteger),
+        Column('path', String(1024)),
+        prefixes=['TEMPORARY'],
+    )
+    connection = db.connection()
+    found.create(connection)
+    try:
+        images = (
+            {'channel_name': channel_name, 'message_id': message_id, 'path': str(path)}
+            for channel_name, message_id, path in find_images(images_dir, channel)
+            if message_ids is None or message_id in message_ids
+        )
+        for chunk in chunks(images, 10000):
+            connection.execute(found.insert(), chunk)
+
+        detected = and_(detections_table.c.channel_name == found.c.channel_name,
+                        detections_table.c.message_id == found.c.message_id)
+        stored = and_(media_table.c.channel_name == found.c.channel_name,
+                      media_table.c.message_id == found.c.message_id)
+        # One earlier detection of the same bytes, through the content_hash index
+        candidate = detections_table.alias('candidate')
+        first_scored = (
+            select(func.min(candidate.c.id))
+            .where(candidate.c.content_hash == media_table.c.content_hash)
+            .correlate(media_table)
+            .scalar_subquery()
+        )
+        known = detections_table.alias('known')
+        rows = connection.execute(
+            select(found.c.channel_name, found.c.message_id, found.c.path, media_table.c.content_hash,
+                   known.c.id, *[known.c[c] for c in RESULT_COLUMNS])
+            .select_from(
+                found.outerjoin(detections_table, detected)
+                .outerjoin(media_table, stored)
+                .outerjoin(known, known.c.id == first_scored)
+            )
+            .where(detections_table.c.id.is_(None))
+            .order_by(found.c.path)
+        )
+        return [
+            (row[0], row[1], Path(row[2]), row[3],
+             dict(zip(RESULT_COLUMNS, row[5:])) if row[4] is not None else None)
+            for row in rows
+        ]
+    finally:
+        found.drop(connection)
+
+
+def unreadable_detection(model_name):
+    """Detection columns for a file that could not be decoded"""
+    return {
+        'image_category': 'unreadable',
+        'detected_objects': '[]',
+        'object_count': 0,
+        'max_confidence': None,
+        'model_name': model_name,
+    }
+
+
+def result_to_detection(result, model_name):
+    """Detection columns from one ultralytics Results object"""
+    names = result.names
+    objects = [
+        {"class": names[int(cls)], "confidence": round(float(conf), 4)}
+        for cls, conf in zip(result.boxes.cls.tolist(), result.boxes.conf.tolist())
+    ]
+    return {
+        'image_category': categorize({o["class"] for o in objects}),
+        'detected_objects': json.dumps(objects),
+        'object_count': len(objects),
+        'max_confidence': max((o["confidence"] for o in objects), default=None),
+        'model_name': model_name,
+    }
+
+
+def write_detections(db, rows):
+    """Insert detection rows (skipping ones already stored) and commit"""
+    if not rows:
+        return
+    db.execute(insert_ignore(db.get_bind(), detections_table), rows)
+    bump_data_version(db)
+    db.commit()
+
+
+class ImageDetector:
+    """Decodes pending photos in a process pool and scores them in batches"""
+
+    def __init__(self, db, model=None, model_name=YOLO_MODEL, batch_size=DEFAULT_BATCH_SIZE,
+                 workers=DEFAULT_WORKERS, image_size=IMAGE_SIZE, images_dir=IMAGES_DIR,
+                 channel=None, message_ids=None, collect=False):
+        self.db = db
+        self.model_name = model_name
+        if model is None:
+            from ultralytics import YOLO
+            model = YOLO(model_name)
+        self.model = model
+        self.batch_size = batch_size
+        self.workers = workers
+        self.image_size = image_size
+        self.images_dir = Path(images_dir)
+        self.channel = channel
+        self.message_ids = message_ids
+        self.scored = 0
+        self.reused = 0
+        self.failed = 0
+        # Rows for write_detections() when collecting, else written as scored
+        self.rows = [] if collect else None
+
+    def run(self):
+        """Score every pending photo; returns the number of rows written (or collected)"""
+        reused = []
+        to_score = []
+        duplicates = {}  # content_hash -> later images with the same bytes
+        for *item, known in pending_images(self.db, self.images_dir, self.channel, self.message_ids):
+            content_hash = item[3]
+            if known is not None:
+                reused.append(self._row(item, known))
+            elif content_hash and content_hash in duplicates:
+                duplicates[content_hash].append(item)
+            else:
+                if content_hash:
+                    duplicates[content_hash] = []
+                to_score.append(item)
+
+        if reused:
+            self._write(reused)
+            self.reused += len(reused)
+        if to_score:
+            logger.info(f"  Scoring {len(to_score)} images ({self.reused} reused by hash)")
+            self._score(to_score, duplicates)
+        logger.info(f"  Images: {self.scored} scored, {self.reused} reused, {self.failed} unreadable")
+        return self.scored + self.reused + self.failed
+
+    def _score(self, items, duplicates):
+        # Decode the next window while the model works on the current one,
+        # keeping at most two windows of decoded images in memory
+        window = max(self.batch_size, self.workers * 4)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            windows = chunks(items, window)
+
+            def submit(chunk):
+                return [(item, pool.submit(decode_image, item[2], self.image_size)) for item in chunk]
+
+            current = submit(next(windows))
+            while current:
+                upcoming = next(windows, None)
+                following = submit(upcoming) if upcoming else None
+                decoded = [(item, future.result()) for item, future in current]
+                for batch in chunks(decoded, self.batch_size):
+                    self._score_batch(batch, duplicates)
+                current = following
+
+    def _score_batch(self, batch, duplicates):
+        readable = [(item, image) for item, image in batch if image is not None]
+        detections = []
+        if readable:
+            results = self.model.predict(
+                [image for _, image in readable], imgsz=self.image_size, conf=CONFIDENCE,
+                device='cpu', verbose=False,
+            )
+            detections = [(item, result_to_detection(result, self.model_name))
+                          for (item, _), result in zip(readable, results)]
+            self.scored += len(detections)
+        # Recorded as well, so the next run does not decode them again
+        unreadable = [(item, unreadable_detection(self.model_name)) for item, image in batch if image is None]
+        self.failed += len(unreadable)
+
+        rows = []
+        for item, detection in detections + unreadable:
+            rows.append(self._row(item, detection))
+            for duplicate in duplicates.get(item[3], []):
+                rows.append(self._row(duplicate, detection))
+                self.reused += 1
+        self._write(rows)
+
+    def _row(self, item, detection):
+        channel_name, message_id, _, content_hash = item
+        return {
+            'channel_name': channel_name,
+            'message_id': message_id,
+            'content_hash': content_hash,
+            'detected_at': datetime.utcnow(),
+            **detection,
+        }
+
+    def _write(self, rows):
+        if self.rows is not None:
+            self.rows.extend(rows)
+        else:
+            write_detections(self.db, rows)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    create_tables()
+    with SessionLocal() as db:
+        written = ImageDetector(db).run()
+    print(f"✓ Image detections written for {written} images")
+
+
+if __name__ == "__main__":
+    main()
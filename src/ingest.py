@@ -0,0 +1,322 @@
+# ingest.py - Set-based message ingestion for the warehouse
+"""
+Batch writer for the telegram_messages table.
+
+Messages are buffered into fixed-size batches. Each batch resolves
+duplicates with a single query and is written with one Core bulk insert
+using insert-or-ignore (SQLite) / ON CONFLICT DO NOTHING (Postgres), so
+ingesting N messages costs about N / batch_size round-trips instead of 2N.
+
+The channel activity rollups (daily and hourly counts, views, forwards)
+are updated in the same transaction as the messages they summarise, and
+so is the data version counter the API uses to invalidate its cache.
+
+On Postgres, make_message_writer() returns CopyMessageWriter instead: it
+streams each batch with COPY into a temporary staging table and merges
+it with one INSERT ... SELECT ... ON CONFLICT DO NOTHING, which avoids
+per-row parameter binding and lets batches grow much larger.
+"""
+import io
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database_sqlite import ChannelActivityDaily, ChannelActivityHourly, DataVersion, TelegramMessage
+from message_record import ROW_COLUMNS, MessageRecord
+
+logger = logging.getLogger(__name__)
+
+# Stays well below SQLite's bound-parameter limit for the IN (...) lookup
+DEFAULT_BATCH_SIZE = 500
+# COPY has no parameter limit; bigger batches amortise the merge and commit
+COPY_BATCH_SIZE = 10000
+
+messages_table = TelegramMessage.__table__
+daily_table = ChannelActivityDaily.__table__
+hourly_table = ChannelActivityHourly.__table__
+
+ACTIVITY_COLUMNS = ['message_count', 'total_views', 'total_forwards']
+
+WAREHOUSE_VERSION = 'warehouse'
+
+
+def update_message_stats(db, channel_name, messages):
+    """Refresh views/forwards of already stored messages in one executemany
+
+    The change against the stored values is added to the activity rollups.
+    """
+    messages = {message.id: message for message in messages}
+    if not messages:
+        return 0
+
+    stored = []
+    ids = list(messages)
+    for start in range(0, len(ids), DEFAULT_BATCH_SIZE):
+        stored += db.execute(
+            select(messages_table.c.message_id, messages_table.c.date,
+                   messages_table.c.views, messages_table.c.forwards)
+            .where(messages_table.c.channel_name == channel_name)
+            .where(messages_table.c.message_id.in_(ids[start:start + DEFAULT_BATCH_SIZE]))
+        ).fetchall()
+    if not stored:
+        return 0
+
+    rows = [
+        {'b_message_id': row.message_id,
+         'b_views': messages[row.message_id].views,
+         'b_forwards': messages[row.message_id].forwards}
+        for row in stored
+    ]
+    stmt = (
+        messages_table.update()
+        .where(messages_table.c.channel_name == channel_name)
+        .where(messages_table.c.message_id == bindparam('b_message_id'))
+        .values(views=bindparam('b_views'), forwards=bindparam('b_forwards'))
+    )
+    db.execute(stmt, rows)
+
+    deltas = [
+        {'channel_name': channel_name,
+         'date': row.date,
+         'message_count': 0,
+         'views': (messages[row.message_id].views or 0) - (row.views or 0),
+         'forwards': (messages[row.message_id].forwards or 0) - (row.forwards or 0)}
+        for row in stored
+    ]
+    add_activity(db, [delta for delta in deltas if delta['views'] or delta['forwards']])
+    bump_data_version(db)
+    db.commit()
+    return len(rows)
+
+
+def bump_data_version(db, name=WAREHOUSE_VERSION):
+    """Increment the data version in the caller's transaction (commits with it)"""
+    table = DataVersion.__table__
+    db.execute(
+        upsert_add(db.get_bind(), table, ['name'], ['version']),
+        [{'name': name, 'version': 1}],
+    )
+
+
+def rollup_activity(rows):
+    """Sum message rows into (daily, hourly) activity rollup rows"""
+    daily = defaultdict(lambda: [0, 0, 0])
+    hourly = defaultdict(lambda: [0, 0, 0])
+    for row in rows:
+        if row['date'] is None:
+            continue
+        day = row['date'].date()
+        hour = row['date'].replace(minute=0, second=0, microsecond=0)
+        for totals in (daily[row['channel_name'], day], hourly[row['channel_name'], hour]):
+            totals[0] += row.get('message_count', 1)
+            totals[1] += row['views'] or 0
+            totals[2] += row['forwards'] or 0
+    return (
+        [{'channel_name': channel, 'day': day, **dict(zip(ACTIVITY_COLUMNS, totals))}
+         for (channel, day), totals in daily.items()],
+        [{'channel_name': channel, 'hour': hour, **dict(zip(ACTIVITY_COLUMNS, totals))}
+         for (channel, hour), totals in hourly.items()],
+    )
+
+
+def add_activity(db, rows):
+    """Add message rows (or view/forward deltas) to the activity rollups, uncommitted"""
+    daily, hourly = rollup_activity(rows)
+    bind = db.get_bind()
+    if daily:
+        db.execute(upsert_add(bind, daily_table, ['channel_name', 'day'], ACTIVITY_COLUMNS), daily)
+    if hourly:
+        db.execute(upsert_add(bind, hourly_table, ['channel_name', 'hour'], ACTIVITY_COLUMNS), hourly)
+
+
+def insert_ignore(bind, table=messages_table):
+    """Build an INSERT that skips rows violating the table's unique keys"""
+    dialect = bind.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    return table.insert()
+
+
+def upsert_add(bind, table, keys, columns):
+    """Build an INSERT that adds `columns` onto an existing row with the same `keys`"""
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}[bind.dialect.name]
+    stmt = dialect.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: table.c[column] + stmt.excluded[column] for column in columns},
+    )
+
+
+def existing_message_ids(db, channel_name, message_ids):
+    """Return the subset of message_ids already stored for a channel"""
+    if not message_ids:
+        return set()
+    rows = db.execute(
+        select(messages_table.c.message_id).where(
+            messages_table.c.channel_name == channel_name,
+            messages_table.c.message_id.in_(message_ids),
+        )
+    )
+    return {row[0] for row in rows}
+
+
+class MessageBatchWriter:
+    """Buffers messages for one channel and writes them in bulk"""
+
+    def __init__(self, db, channel_name, channel_title='', batch_size=DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.channel_name = channel_name
+        self.channel_title = channel_title
+        self.batch_size = batch_size
+        self.seen = 0
+        self.inserted = 0
+        self.max_message_id = 0
+        self._buffer = {}
+        self._insert = insert_ignore(db.get_bind())
+
+    def add(self, message):
+        """Queue a Telethon message or MessageRecord; flushes when the batch is full"""
+        if not isinstance(message, MessageRecord):
+            message = MessageRecord.from_telethon(message, self.channel_name, self.channel_title)
+        self.add_record(message)
+
+    def add_row(self, row):
+        """Queue a row dict keyed by column name"""
+        self.add_record(MessageRecord.from_row(row))
+
+    def add_record(self, record):
+        """Queue a MessageRecord"""
+        self.seen += 1
+        self.max_message_id = max(self.max_message_id, record.message_id)
+        # Later copies of the same message replace earlier ones in the batch
+        self._buffer[record.message_id] = record
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered batch and commit it"""
+        if not self._buffer:
+            return 0
+
+        batch = self._buffer
+        self._buffer = {}
+
+        existing = existing_message_ids(self.db, self.channel_name, list(batch))
+        new_rows = [record.to_dict() for message_id, record in batch.items() if message_id not in existing]
+
+        if new_rows:
+            self.db.execute(self._insert, new_rows)
+            add_activity(self.db, new_rows)
+            bump_data_version(self.db)
+        self.db.commit()
+
+        self.inserted += len(new_rows)
+        return len(new_rows)
+
+    def close(self):
+        """Flush any remaining messages and return the number inserted"""
+        self.flush()
+        return self.inserted
+
+
+COPY_COLUMNS = ROW_COLUMNS
+
+STAGE_TABLE_SQL = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS telegram_messages_stage (
+        message_id BIGINT,
+        channel_name VARCHAR(255),
+        channel_title VARCHAR(255),
+        message_text TEXT,
+        sender_id BIGINT,
+        views INTEGER,
+        forwards INTEGER,
+        date TIMESTAMP,
+        scraped_at TIMESTAMP
+    ) ON COMMIT DELETE ROWS
+"""
+
+MERGE_STAGE_SQL = """
+    INSERT INTO telegram_messages (message_id, channel_name, channel_title, message_text,
+                                   sender_id, views, forwards, date, scraped_at)
+    SELECT message_id, channel_name, channel_title, message_text, sender_id, views, forwards,
+           date, COALESCE(scraped_at, now() AT TIME ZONE 'utc')
+    FROM telegram_messages_stage
+    ON CONFLICT (channel_name, message_id) DO NOTHING
+    RETURNING channel_name, date, views, forwards
+"""
+
+
+def copy_value(value):
+    """Format one value for COPY's text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        # Columns are naive UTC timestamps, as on SQLite
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(sep=' ')
+    if isinstance(value, str):
+        return (value.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+    return str(value)
+
+
+def copy_rows(db, records):
+    """COPY MessageRecords into the staging table and merge them; returns the inserted rows"""
+    buffer = io.StringIO()
+    for record in records:
+        buffer.write('\t'.join(map(copy_value, record.to_row())))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    db.execute(text(STAGE_TABLE_SQL))
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY telegram_messages_stage ({', '.join(COPY_COLUMNS)}) FROM STDIN", buffer
+        )
+    finally:
+        cursor.close()
+    return [dict(row._mapping) for row in db.execute(text(MERGE_STAGE_SQL))]
+
+
+class CopyMessageWriter(MessageBatchWriter):
+    """MessageBatchWriter for Postgres that loads each batch with COPY"""
+
+    def __init__(self, db, channel_name, channel_title='', batch_size=COPY_BATCH_SIZE):
+        super().__init__(db, channel_name, channel_title, batch_size)
+
+    def flush(self):
+        """COPY the buffered batch, merge it and commit"""
+        if not self._buffer:
+            return 0
+
+        batch = self._buffer
+        self._buffer = {}
+
+        # ON CONFLICT skips stored messages, so no lookup is needed first
+        new_rows = copy_rows(self.db, batch.values())
+        if new_rows:
+            add_activity(self.db, new_rows)
+            bump_data_version(self.db)
+        self.db.commit()
+
+        self.inserted += len(new_rows)
+        return len(new_rows)
+
+
+def make_message_writer(db, channel_name, channel_title='', batch_size=None):
+    """CopyMessageWriter on Postgres, MessageBatchWriter otherwise
+
+    batch_size defaults to the writer's own default.
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        writer_class, default_size = CopyMessageWriter, COPY_BATCH_SIZE
+    else:
+        writer_class, default_size = MessageBatchWriter, DEFAULT_BATCH_SIZE
+    return writer_class(db, channel_name, channel_title, batch_size or default_size)
@@ -0,0 +1,172 @@
+# lake_loader.py - Bulk loader from the raw JSON lake into the warehouse
+"""
+Raw lake loader.
+
+Loads data/raw/telegram_messages (NDJSON parts and legacy <channel>.json
+arrays, see raw_lake.py) into telegram_messages. Files are read,
+hashed and parsed in a process pool, using orjson when it is installed;
+the main process writes the parsed messages with the ingest writers
+(MessageBatchWriter, or CopyMessageWriter on Postgres), which skip
+messages already stored (unique on channel_name, message_id) and keep
+the activity rollups current.
+
+Every loaded file is recorded in loaded_files with its size, mtime and
+SHA-256. A rerun skips files whose size and mtime are unchanged, and
+files whose content hash is unchanged, so only new data is parsed.
+
+Usage: python src/lake_loader.py [--raw-dir DIR] [--workers N] [--batch-size N]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+from database_sqlite import LoadedFile, SessionLocal, create_tables
+from ingest import make_message_writer
+from message_record import MessageRecord
+from parquet_lake import find_raw_files
+from raw_lake import RAW_MESSAGES_DIR
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Large batches for backfills; each flush is one lookup, one insert and one commit
+LOAD_BATCH_SIZE = 5000
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+json_loads = orjson.loads if orjson else json.loads
+
+
+def decompress(path, data):
+    if path.name.endswith('.gz'):
+        return gzip.decompress(data)
+    if path.name.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} needs the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def parse_file(path, channel_name):
+    """Read, hash and parse one raw file; returns (content_hash, records)
+
+    Runs in pool workers.
+    """
+    path = Path(path)
+    data = path.read_bytes()
+    content_hash = hashlib.sha256(data).hexdigest()
+    data = decompress(path, data)
+    if '.ndjson' in path.name:
+        records = [json_loads(line) for line in data.splitlines() if line.strip()]
+    else:
+        records = json_loads(data)
+    # The file was written while the messages were scraped
+    scraped_at = datetime.utcfromtimestamp(path.stat().st_mtime)
+    return content_hash, [MessageRecord.from_raw(record, channel_name, scraped_at) for record in records]
+
+
+def load_lake(db, raw_dir=RAW_MESSAGES_DIR, workers=DEFAULT_WORKERS, batch_size=LOAD_BATCH_SIZE):
+    """Load new and changed raw lake files; returns a dict of counts"""
+    return load_files(db, find_raw_files(raw_dir), workers, batch_size)
+
+
+def load_files(db, files, workers=DEFAULT_WORKERS, batch_size=LOAD_BATCH_SIZE):
+    """Load the new and changed files among (path, channel_name) pairs"""
+    loaded = {entry.path: entry for entry in db.query(LoadedFile)}
+    stats = {'files': 0, 'skipped': 0, 'records': 0, 'inserted': 0}
+
+    pending = []
+    for path, channel_name in files:
+        stat = path.stat()
+        entry = loaded.get(str(path))
+        if entry is not None and entry.size == stat.st_size and entry.mtime == stat.st_mtime:
+            stats['skipped'] += 1
+            continue
+        pending.append((path, channel_name, stat))
+    if not pending:
+        return stats
+
+    # Parse ahead of the writer, but keep only a few parsed files in memory
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        queue = iter(pending)
+
+        def submit(item):
+            path, channel_name, stat = item
+            in_flight.append((path, stat, pool.submit(parse_file, str(path), channel_name)))
+
+        for item in islice(queue, workers * 2):
+            submit(item)
+
+        while in_flight:
+            path, stat, future = in_flight.popleft()
+            item = next(queue, None)
+            if item is not None:
+                submit(item)
+
+            content_hash, records = future.result()
+            entry = loaded.get(str(path))
+            if entry is None or entry.content_hash != content_hash:
+                stats['inserted'] += write_records(db, records, batch_size)
+                stats['records'] += len(records)
+                stats['files'] += 1
+            else:
+                stats['skipped'] += 1
+            db.merge(LoadedFile(path=str(path), size=stat.st_size, mtime=stat.st_mtime,
+                                content_hash=content_hash, records=len(records),
+                                loaded_at=datetime.utcnow()))
+            db.commit()
+
+    logger.info(f"  Loaded {stats['files']} files: {stats['inserted']} new of {stats['records']} messages "
+                f"({stats['skipped']} files unchanged)")
+    return stats
+
+
+def write_records(db, records, batch_size):
+    """Insert messages not stored yet, per channel; returns the number inserted"""
+    by_channel = defaultdict(list)
+    for record in records:
+        by_channel[record.channel_name].append(record)
+
+    inserted = 0
+    for channel_name, channel_records in by_channel.items():
+        writer = make_message_writer(db, channel_name, batch_size=batch_size)
+        for record in channel_records:
+            writer.add_record(record)
+        inserted += writer.close()
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--raw-dir', type=Path, default=RAW_MESSAGES_DIR)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    create_tables()
+    with SessionLocal() as db:
+        stats = load_lake(db, args.raw_dir, args.workers, args.batch_size)
+    print(f"✓ Loaded {stats['inserted']} new messages from {stats['files']} files "
+          f"({stats['skipped']} unchanged files skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# media_pipeline.py - Background photo downloads for the scrapers
+"""
+Media download stage.
+
+The message loop only enqueues photo jobs; a pool of download workers
+drains the bounded queue concurrently. Failed downloads are retried with
+exponential backoff, and a download interrupted part-way resumes from the
+bytes already on disk (kept as <file>.part until complete). When the
+queue is full, submit() waits, which keeps memory bounded if Telegram
+serves messages faster than photos.
+
+submit() returns a future for the photo's path, resolved once the file
+is on disk, or to None if the download gave up, so callers only record
+paths that exist. A photo submitted again while its download is still
+queued or running (e.g. a channel retried after a flood wait) shares
+that download instead of writing the same .part file twice.
+
+With a MediaStore attached, photos whose Telegram id is already stored
+are linked without downloading, and downloaded files are deduplicated
+on their content hash.
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+from telethon.errors import FloodWaitError
+from telethon.tl.types import PhotoEmpty
+
+logger = logging.getLogger(__name__)
+
+IMAGES_DIR = Path("data/raw/images")
+
+
+def has_photo(message):
+    """True if the message carries a photo worth downloading
+
+    Expired and self-destructing photos come as MessageMediaPhoto with no
+    photo, or with a PhotoEmpty; there is nothing to download for those.
+    """
+    photo = getattr(message.media, 'photo', None)
+    return photo is not None and not isinstance(photo, PhotoEmpty)
+
+
+class MediaDownloader:
+    """Bounded queue of photo downloads served by a pool of workers"""
+
+    def __init__(self, client, limiter=None, workers=None, queue_size=None,
+                 retries=3, backoff=1.0, images_dir=IMAGES_DIR, store=None):
+        self.client = client
+        self.limiter = limiter
+        self.workers = workers or int(os.getenv('MEDIA_WORKERS', '4'))
+        self.queue_size = queue_size or self.workers * 8
+        self.retries = retries
+        self.backoff = backoff
+        self.images_dir = Path(images_dir)
+        self.store = store
+        self.downloaded = 0
+        self.skipped = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self._queue = None
+        self._tasks = []
+        self._in_flight = {}  # path -> future of the queued download
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def start(self):
+        """Start the worker pool"""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def image_path(self, message, channel_name):
+        return self.images_dir / channel_name / f"{message.id}.jpg"
+
+    async def submit(self, message, channel_name):
+        """Queue the message's photo; returns a future of its path (None if there is
+        no photo or the download failed)"""
+        future = asyncio.get_running_loop().create_future()
+        if not has_photo(message):
+            future.set_result(None)
+            return future
+        path = self.image_path(message, channel_name)
+        if path in self._in_flight:
+            return self._in_flight[path]
+        if path.exists():
+            self.skipped += 1
+            future.set_result(path)
+            return future
+        if self.store and self.store.link_known_photo(channel_name, message.id, message.media.photo.id):
+            # Same Telegram photo already stored (e.g. reposted in another channel)
+            self.deduplicated += 1
+            future.set_result(path)
+            return future
+        # Registered before waiting for queue space, so a second submit finds it
+        self._in_flight[path] = future
+        await self._queue.put((message, channel_name, path))
+        return future
+
+    async def close(self):
+        """Wait for queued downloads to finish, then stop the workers"""
+        if self._queue is None:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queue = None
+        self._tasks = []
+        logger.info(
+            f"  Media: {self.downloaded} downloaded, {self.deduplicated} deduplicated, "
+            f"{self.skipped} already on disk, {self.failed} failed"
+        )
+
+    async def _worker(self):
+        while True:
+            message, channel_name, path = await self._queue.get()
+            future = self._in_flight[path]
+            try:
+                saved = await self._download_with_retries(message, channel_name, path)
+                future.set_result(path if saved else None)
+            except Exception as e:
+                logger.error(f"  Download of {channel_name}/{path.name} failed: {e}")
+                self.failed += 1
+                future.set_result(None)
+            finally:
+                if not future.done():
+                    future.cancel()  # worker cancelled mid-download
+                del self._in_flight[path]
+                self._queue.task_done()
+
+    async def _download_with_retries(self, message, channel_name, path):
+        """True once the photo is at `path`, False if every attempt failed"""
+        # Another worker may have stored the same photo since it was queued
+        if self.store and self.store.link_known_photo(channel_name, message.id, message.media.photo.id):
+            self.deduplicated += 1
+            return True
+
+        attempt = 0
+        while True:
+            try:
+                if self.limiter:
+                    async with self.limiter.slot(channel_name):
+                        await self._download(message, channel_name, path)
+                else:
+                    await self._download(message, channel_name, path)
+                self.downloaded += 1
+                return True
+            except FloodWaitError as e:
+                # Not a failure: wait as instructed, then try again
+                if self.limiter:
+                    self.limiter.pause(e.seconds)
+                else:
+                    await asyncio.sleep(e.seconds)
+            except Exception as e:
+                if attempt == self.retries:
+                    break
+                delay = self.backoff * 2 ** attempt
+                attempt += 1
+                logger.warning(f"  Download of {path.name} failed ({e}); retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+
+        self.failed += 1
+        logger.error(f"  Giving up on {channel_name}/{path.name}")
+        return False
+
+    async def _download(self, message, channel_name, path):
+        """Download into <path>.part, resuming from its current size"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = path.with_name(path.name + '.part')
+        offset = part_path.stat().st_size if part_path.exists() else 0
+
+        with open(part_path, 'ab') as f:
+            async for chunk in self.client.iter_download(message.media, offset=offset):
+                f.write(chunk)
+
+        if self.store:
+            _, is_new = self.store.add_file(channel_name, message.id, message.media.photo.id, part_path)
+            if not is_new:
+                self.deduplicated += 1
+        else:
+            os.replace(part_path, path)
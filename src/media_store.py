@@ -0,0 +1,108 @@
+# media_store.py - Content-addressed storage for downloaded photos
+"""
+Content-addressed media store.
+
+Each distinct photo is stored once as data/raw/media/<hh>/<sha256>.jpg.
+The media_files table maps (channel_name, message_id) to the blob's hash
+and remembers Telegram's photo id, so a photo reposted in another
+channel is recognised before it is downloaded again. Photos that are
+re-uploaded (new photo id, same bytes) are deduplicated on their hash
+after download.
+
+data/raw/images/<channel>/<message_id>.jpg stays available as a hard
+link to the blob (or a copy where links are not supported), so code
+reading the per-channel layout keeps working without extra disk use.
+"""
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+
+from sqlalchemy import select
+
+from database_sqlite import MediaFile
+from ingest import insert_ignore
+
+logger = logging.getLogger(__name__)
+
+MEDIA_DIR = Path("data/raw/media")
+IMAGES_DIR = Path("data/raw/images")
+
+media_table = MediaFile.__table__
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaStore:
+    """Hash-keyed photo blobs plus the (channel, message_id) -> hash index"""
+
+    def __init__(self, db, media_dir=MEDIA_DIR, images_dir=IMAGES_DIR):
+        self.db = db
+        self.media_dir = Path(media_dir)
+        self.images_dir = Path(images_dir)
+        self._insert = insert_ignore(db.get_bind(), media_table)
+
+    def blob_path(self, content_hash):
+        return self.media_dir / content_hash[:2] / f"{content_hash}.jpg"
+
+    def image_path(self, channel_name, message_id):
+        return self.images_dir / channel_name / f"{message_id}.jpg"
+
+    def hash_for_photo(self, photo_id):
+        """Hash of an already stored photo with this Telegram id, if any"""
+        return self.db.execute(
+            select(media_table.c.content_hash)
+            .where(media_table.c.photo_id == photo_id)
+            .limit(1)
+        ).scalar()
+
+    def link_known_photo(self, channel_name, message_id, photo_id):
+        """Index a message whose photo is already stored; False if unknown"""
+        content_hash = self.hash_for_photo(photo_id)
+        if content_hash is None or not self.blob_path(content_hash).exists():
+            return False
+        self._record(channel_name, message_id, photo_id, content_hash)
+        return True
+
+    def add_file(self, channel_name, message_id, photo_id, file_path):
+        """Move a downloaded file into the store; returns (hash, is_new_blob)"""
+        content_hash = file_sha256(file_path)
+        blob = self.blob_path(content_hash)
+        is_new = not blob.exists()
+        if is_new:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(file_path, blob)
+        else:
+            os.remove(file_path)
+        self._record(channel_name, message_id, photo_id, content_hash)
+        return content_hash, is_new
+
+    def _record(self, channel_name, message_id, photo_id, content_hash):
+        blob = self.blob_path(content_hash)
+        self.db.execute(self._insert, [{
+            'channel_name': channel_name,
+            'message_id': message_id,
+            'photo_id': photo_id,
+            'content_hash': content_hash,
+            'file_size': blob.stat().st_size,
+        }])
+        self.db.commit()
+        self._link_view(blob, self.image_path(channel_name, message_id))
+
+    def _link_view(self, blob, path):
+        """Expose the blob under the per-channel images layout"""
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(blob, path)
+        except OSError:
+            shutil.copyfile(blob, path)
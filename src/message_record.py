@@ -0,0 +1,163 @@
+# message_record.py - Compact in-memory record of one scraped message
+"""
+Message record.
+
+A message is turned into one MessageRecord when it enters the pipeline
+(from Telethon, a raw lake record or a JSON backup record), and that
+record is what the scrapers, sinks, ingest writers and lake builders
+pass around. It is a __slots__ class instead of a dict: no per-message
+hash table and no per-message copy of the keys, so a batch of a million
+in-flight messages takes a fraction of the memory (see
+benchmarks/bench_message_record.py).
+
+Conversions:
+
+    to_row()          tuple in ROW_COLUMNS order (telegram_messages, COPY)
+    to_dict()         the same row as a dict, for SQLAlchemy executemany
+    to_ndjson()       one raw lake line, as bytes
+    to_backup()       one JSON backup line (sinks.BackupJsonSink)
+    to_record_batch() a list of records as a pyarrow RecordBatch
+"""
+import json
+from datetime import datetime, timezone
+from operator import attrgetter
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+# telegram_messages columns written by ingest, in to_row() order
+ROW_COLUMNS = ('message_id', 'channel_name', 'channel_title', 'message_text',
+               'sender_id', 'views', 'forwards', 'date', 'scraped_at')
+
+
+def parse_time(value):
+    """ISO string (with or without offset) -> naive UTC datetime"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _dumps(record):
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n"
+
+
+class MessageRecord:
+    """One message: the telegram_messages columns plus has_media / image_path"""
+
+    __slots__ = ROW_COLUMNS + ('has_media', 'image_path')
+
+    def __init__(self, message_id, channel_name, channel_title=None, message_text=None,
+                 sender_id=None, views=None, forwards=None, date=None, scraped_at=None,
+                 has_media=None, image_path=None):
+        self.message_id = message_id
+        self.channel_name = channel_name
+        self.channel_title = channel_title
+        self.message_text = message_text
+        self.sender_id = sender_id
+        self.views = views
+        self.forwards = forwards
+        self.date = date
+        self.scraped_at = scraped_at
+        self.has_media = has_media
+        self.image_path = image_path
+
+    @classmethod
+    def from_telethon(cls, message, channel_name, channel_title='', scraped_at=None):
+        return cls(
+            message.id, channel_name, channel_title, message.text, message.sender_id,
+            message.views, message.forwards, message.date,
+            scraped_at or datetime.utcnow(), bool(message.media),
+        )
+
+    @classmethod
+    def from_raw(cls, record, channel_name, scraped_at=None):
+        """Raw lake record (the Task 1 scrapers' format, see to_ndjson)"""
+        return cls(
+            record['message_id'], record.get('channel_name') or channel_name, None,
+            record.get('message_text'), record.get('sender_id'), record.get('views'),
+            record.get('forwards'), parse_time(record.get('message_date')), scraped_at,
+            record.get('has_media'), record.get('image_path'),
+        )
+
+    @classmethod
+    def from_backup(cls, record, channel_name, scraped_at=None):
+        """JSON backup record (see to_backup)"""
+        return cls(
+            record['id'], channel_name, None, record.get('message'), record.get('sender_id'),
+            record.get('views'), record.get('forwards'), parse_time(record.get('date')),
+            scraped_at,
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """Dict keyed by column name, e.g. a telegram_messages or Parquet lake row"""
+        return cls(**row)
+
+    def to_row(self):
+        return (self.message_id, self.channel_name, self.channel_title, self.message_text,
+                self.sender_id, self.views, self.forwards, self.date, self.scraped_at)
+
+    def to_dict(self):
+        return dict(zip(ROW_COLUMNS, self.to_row()))
+
+    def to_ndjson(self):
+        record = {
+            'message_id': self.message_id,
+            'channel_name': self.channel_name,
+            'message_date': self.date.isoformat() if self.date else None,
+            'message_text': self.message_text or '',
+            'views': self.views or 0,
+            'forwards': self.forwards or 0,
+            'has_media': bool(self.has_media),
+        }
+        if self.sender_id is not None:
+            record['sender_id'] = self.sender_id
+        if self.image_path is not None:
+            record['image_path'] = self.image_path
+        return _dumps(record)
+
+    def to_backup(self):
+        return {
+            'id': self.message_id,
+            'date': self.date.isoformat() if self.date else None,
+            'message': self.message_text,
+            'sender_id': self.sender_id,
+            'views': self.views,
+            'forwards': self.forwards
+        }
+
+    def update(self, newer):
+        """Take the fields `newer` has; keep ours where it has None"""
+        for name in self.__slots__:
+            value = getattr(newer, name)
+            if value is not None:
+                setattr(self, name, value)
+
+    def __reduce__(self):
+        # Pickled as a plain tuple, e.g. on the way back from lake_loader's workers
+        return (MessageRecord, tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return f"<MessageRecord(channel={self.channel_name}, message_id={self.message_id})>"
+
+
+def to_record_batch(records, schema):
+    """Build a pyarrow RecordBatch with `schema`'s columns from a list of records"""
+    if pa is None:
+        raise RuntimeError("Arrow output needs the 'pyarrow' package")
+    return pa.RecordBatch.from_arrays(
+        [pa.array(list(map(attrgetter(field.name), records)), type=field.type) for field in schema],
+        schema=schema,
+    )
@@ -0,0 +1,186 @@
+# migrations.py - Versioned, idempotent schema migrations
+"""
+Schema migrations for the warehouse database.
+
+Base.metadata.create_all() only creates missing tables; it never alters
+tables that already exist. Changes to existing tables are listed here
+in order and recorded in schema_migrations once applied. Every step is
+also idempotent on its own (IF NOT EXISTS / column checks), so it is a
+no-op on databases created fresh from the current models.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+
+def add_column(table, column, ddl):
+    """Migration step adding a column if the table does not have it yet"""
+    def step(connection):
+        existing = {c["name"] for c in inspect(connection).get_columns(table)}
+        if column not in existing:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return step
+
+
+def run_sql(*statements):
+    """Migration step running plain SQL statements"""
+    def step(connection):
+        for statement in statements:
+            connection.execute(text(statement))
+    return step
+
+
+def unique_message_key(connection):
+    """Drop duplicate messages, then enforce one row per (channel, message)"""
+    result = connection.execute(text("""
+        DELETE FROM telegram_messages
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM telegram_messages GROUP BY channel_name, message_id
+        )
+    """))
+    if result.rowcount:
+        logger.info(f"  Removed {result.rowcount} duplicate messages")
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_telegram_messages_channel_message "
+        "ON telegram_messages (channel_name, message_id)"
+    ))
+
+
+def message_search_index(connection):
+    """Full-text index over message_text
+
+    SQLite: an external-content FTS5 table kept in sync by triggers.
+    Postgres: a generated tsvector column with a GIN index.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            "ALTER TABLE telegram_messages ADD COLUMN IF NOT EXISTS message_tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(message_text, ''))) STORED"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_telegram_messages_tsv "
+            "ON telegram_messages USING GIN (message_tsv)"
+        ))
+        return
+
+    # unicode61 tokenizes Amharic (Ethiopic) as well as Latin script
+    connection.execute(text("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS telegram_messages_fts USING fts5(
+            message_text,
+            content='telegram_messages',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS telegram_messages_fts_insert
+        AFTER INSERT ON telegram_messages BEGIN
+            INSERT INTO telegram_messages_fts (rowid, message_text)
+            VALUES (new.id, new.message_text);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS telegram_messages_fts_delete
+        AFTER DELETE ON telegram_messages BEGIN
+            INSERT INTO telegram_messages_fts (telegram_messages_fts, rowid, message_text)
+            VALUES ('delete', old.id, old.message_text);
+        END
+    """))
+    # Only text edits touch the index; views/forwards refreshes do not
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS telegram_messages_fts_update
+        AFTER UPDATE OF message_text ON telegram_messages BEGIN
+            INSERT INTO telegram_messages_fts (telegram_messages_fts, rowid, message_text)
+            VALUES ('delete', old.id, old.message_text);
+            INSERT INTO telegram_messages_fts (rowid, message_text)
+            VALUES (new.id, new.message_text);
+        END
+    """))
+    # Index the messages that existed before the triggers
+    connection.execute(text("INSERT INTO telegram_messages_fts (telegram_messages_fts) VALUES ('rebuild')"))
+
+
+def backfill_channel_activity(connection):
+    """Fill the activity rollups from messages stored before ingest maintained them"""
+    if connection.dialect.name == "postgresql":
+        day, hour = "CAST(date AS DATE)", "date_trunc('hour', date)"
+    else:
+        # Same text formats SQLAlchemy uses for Date / DateTime columns
+        day, hour = "date(date)", "strftime('%Y-%m-%d %H:00:00.000000', date)"
+    tables = set(inspect(connection).get_table_names())
+    for table, period, expression in (
+        ("channel_activity_daily", "day", day),
+        ("channel_activity_hourly", "hour", hour),
+    ):
+        if table not in tables:  # schema not created from the current models
+            continue
+        connection.execute(text(f"DELETE FROM {table}"))
+        connection.execute(text(f"""
+            INSERT INTO {table} (channel_name, {period}, message_count, total_views, total_forwards)
+            SELECT channel_name, {expression}, COUNT(*), COALESCE(SUM(views), 0), COALESCE(SUM(forwards), 0)
+            FROM telegram_messages
+            WHERE date IS NOT NULL
+            GROUP BY channel_name, {expression}
+        """))
+
+
+# (version, description, step) - append only, never renumber
+MIGRATIONS = [
+    (1, "channels.last_message_id watermark",
+     add_column("channels", "last_message_id", "BIGINT")),
+    (2, "unique (channel_name, message_id) on telegram_messages",
+     unique_message_key),
+    (3, "telegram_messages.date index",
+     run_sql("CREATE INDEX IF NOT EXISTS ix_telegram_messages_date ON telegram_messages (date)")),
+    (4, "covering index for per-channel activity",
+     run_sql("CREATE INDEX IF NOT EXISTS ix_telegram_messages_channel_activity "
+             "ON telegram_messages (channel_name, date, views, forwards)")),
+    (5, "full-text search index on message_text",
+     message_search_index),
+    (6, "backfill daily/hourly channel activity rollups",
+     backfill_channel_activity),
+    (7, "channels.access_hash for cached entity resolution",
+     add_column("channels", "access_hash", "BIGINT")),
+    (8, "channels.resolved_at",
+     add_column("channels", "resolved_at", "TIMESTAMP")),
+]
+
+
+def ensure_migrations_table(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR(255),
+            applied_at TIMESTAMP
+        )
+    """))
+
+
+def applied_versions(connection):
+    return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def apply_migrations(engine):
+    """Apply pending migrations in order; returns the versions applied"""
+    with engine.begin() as connection:
+        ensure_migrations_table(connection)
+        done = applied_versions(connection)
+
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version in done:
+            continue
+        # One transaction per migration, so a failure leaves earlier ones recorded
+        with engine.begin() as connection:
+            step(connection)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) "
+                     "VALUES (:version, :description, :applied_at)"),
+                {"version": version, "description": description, "applied_at": datetime.utcnow()},
+            )
+        logger.info(f"  Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
@@ -0,0 +1,253 @@
+# parquet_lake.py - Columnar message lake compacted from the raw JSON layers
+"""
+Parquet message lake.
+
+The raw layers are written for durability, not for analysis: the raw
+lake holds one directory per scrape day and channel (NDJSON parts, or a
+single <channel>.json array from older runs), and the JSON backups hold
+one NDJSON part per channel and run (one array per channel and scrape
+day from older runs). Reading either means parsing every file.
+Compaction regroups their records by message date and channel into
+typed Parquet files:
+
+    data/lake/telegram_messages/date=<YYYY-MM-DD>/channel=<channel>/part-0.parquet
+
+A message seen by several scrapes is kept once, from the latest scrape.
+Source files already compacted are listed (with size and mtime) in
+_compacted.json, so a rerun only reads new or changed files and only
+rewrites the partitions they touch.
+
+read_messages() prunes partitions on the directory names and reads only
+the requested columns.
+
+Usage: python src/parquet_lake.py
+"""
+import gzip
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from message_record import MessageRecord, to_record_batch
+from raw_lake import RAW_MESSAGES_DIR
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+LAKE_DIR = Path("data/lake/telegram_messages")
+BACKUP_DIR = Path("data")
+COMPACTED_NAME = "_compacted.json"
+PART_NAME = "part-0.parquet"
+DEFAULT_MAX_PENDING_ROWS = 500_000
+
+# Typed like the TelegramMessage columns; times are naive UTC as in the warehouse
+SCHEMA = pa.schema([
+    ('message_id', pa.int64()),
+    ('channel_name', pa.string()),
+    ('message_text', pa.string()),
+    ('sender_id', pa.int64()),
+    ('views', pa.int32()),
+    ('forwards', pa.int32()),
+    ('date', pa.timestamp('us')),
+    ('scraped_at', pa.timestamp('us')),
+    ('has_media', pa.bool_()),
+    ('image_path', pa.string()),
+])
+
+# <channel>_backup_<YYYYMMDD>-<run>.ndjson, or <channel>_backup_<YYYYMMDD>.json from older runs
+BACKUP_PATTERN = re.compile(r"(?P<channel>.+)_backup_(?P<day>\d{8})(?:-[\w-]+\.ndjson|\.json)$")
+DAY_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+
+def open_text(path):
+    if path.name.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.name.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} needs the 'zstandard' package")
+        return zstandard.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def read_json_records(path):
+    """Records from a JSON array file or an NDJSON part"""
+    with open_text(path) as f:
+        if '.ndjson' in path.name:
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def find_raw_files(raw_dir=RAW_MESSAGES_DIR):
+    """Yield (path, channel_name) for every finished file in the raw lake"""
+    raw_dir = Path(raw_dir)
+    if not raw_dir.exists():
+        return
+    for day_dir in sorted(raw_dir.iterdir()):
+        if not (day_dir.is_dir() and DAY_PATTERN.match(day_dir.name)):
+            continue
+        for entry in sorted(day_dir.iterdir()):
+            if entry.is_file() and entry.suffix == '.json':
+                yield entry, entry.stem
+            elif entry.is_dir():
+                # Finished parts only; in-progress ones start with "."
+                for part in sorted(entry.glob('part-*.ndjson*')):
+                    yield part, entry.name
+
+
+def find_sources(raw_dir=RAW_MESSAGES_DIR, backup_dir=BACKUP_DIR):
+    """Yield (path, channel_name, to_record) for every raw and backup file"""
+    for path, channel_name in find_raw_files(raw_dir):
+        yield path, channel_name, MessageRecord.from_raw
+
+    backup_dir = Path(backup_dir)
+    if backup_dir.exists():
+        # In-progress parts start with "." and end in ".inprogress"
+        for path in sorted(backup_dir.glob('*_backup_*')):
+            match = BACKUP_PATTERN.match(path.name)
+            if match:
+                yield path, match['channel'], MessageRecord.from_backup
+
+
+def file_signature(path):
+    stat = path.stat()
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def read_compacted(lake_dir):
+    path = Path(lake_dir) / COMPACTED_NAME
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_compacted(lake_dir, compacted):
+    path = Path(lake_dir) / COMPACTED_NAME
+    tmp_path = path.with_name(f".{COMPACTED_NAME}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(compacted, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def partition_dir(lake_dir, day, channel_name):
+    return Path(lake_dir) / f"date={day.isoformat()}" / f"channel={channel_name}"
+
+
+def merge_partition(path, records):
+    """Rewrite one partition with `records` merged in; latest scrape of a message wins"""
+    merged = {}
+    if path.exists():
+        for row in pq.read_table(path).to_pylist():
+            merged[row['message_id']] = MessageRecord.from_row(row)
+    for record in records:
+        current = merged.get(record.message_id)
+        if current is None:
+            merged[record.message_id] = record
+        elif (record.scraped_at or datetime.min) >= (current.scraped_at or datetime.min):
+            # Backups lack some fields; keep those from the older record
+            current.update(record)
+
+    ordered = sorted(merged.values(), key=lambda record: record.message_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.inprogress")
+    table = pa.Table.from_batches([to_record_batch(ordered, SCHEMA)], schema=SCHEMA)
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    return len(ordered)
+
+
+def compact(raw_dir=RAW_MESSAGES_DIR, backup_dir=BACKUP_DIR, lake_dir=LAKE_DIR,
+            max_pending_rows=DEFAULT_MAX_PENDING_ROWS):
+    """Compact new raw and backup files into the lake; returns (files, partitions written)
+
+    Messages are buffered (as MessageRecords) up to max_pending_rows, then
+    merged into their partitions, so a large backfill does not have to
+    fit in memory.
+    """
+    lake_dir = Path(lake_dir)
+    lake_dir.mkdir(parents=True, exist_ok=True)
+    compacted = read_compacted(lake_dir)
+
+    pending = defaultdict(list)
+    pending_rows = files = written = 0
+
+    def flush():
+        for (day, channel_name), records in sorted(pending.items()):
+            merge_partition(partition_dir(lake_dir, day, channel_name) / PART_NAME, records)
+        # Record sources only once every partition they touched is written
+        write_compacted(lake_dir, compacted)
+        flushed = len(pending)
+        pending.clear()
+        return flushed
+
+    for path, channel_name, to_record in find_sources(raw_dir, backup_dir):
+        signature = file_signature(path)
+        if compacted.get(str(path)) == signature:
+            continue
+        scraped_at = datetime.utcfromtimestamp(signature['mtime'])
+        for raw in read_json_records(path):
+            record = to_record(raw, channel_name, scraped_at)
+            if record.date is None:
+                continue
+            pending[record.date.date(), record.channel_name].append(record)
+            pending_rows += 1
+        compacted[str(path)] = signature
+        files += 1
+        if pending_rows >= max_pending_rows:
+            written += flush()
+            pending_rows = 0
+
+    written += flush()
+    if files:
+        logger.info(f"  Compacted {files} files into {written} partition writes")
+    return files, written
+
+
+def iter_partitions(lake_dir=LAKE_DIR, channels=None, date_from=None, date_to=None):
+    """Yield (day, channel_name, path) for partitions that pass the filters
+
+    date_from is inclusive and date_to exclusive, as in the API.
+    """
+    lake_dir = Path(lake_dir)
+    if not lake_dir.exists():
+        return
+    channels = set(channels) if channels else None
+    for day_dir in sorted(lake_dir.glob('date=*')):
+        day = date.fromisoformat(day_dir.name.split('=', 1)[1])
+        if (date_from and day < date_from) or (date_to and day >= date_to):
+            continue
+        for channel_dir in sorted(day_dir.glob('channel=*')):
+            channel_name = channel_dir.name.split('=', 1)[1]
+            if channels is not None and channel_name not in channels:
+                continue
+            path = channel_dir / PART_NAME
+            if path.exists():
+                yield day, channel_name, path
+
+
+def read_messages(columns=None, channels=None, date_from=None, date_to=None, lake_dir=LAKE_DIR):
+    """Read lake rows as a pyarrow Table, touching only matching partitions and columns"""
+    paths = [str(path) for _, _, path in iter_partitions(lake_dir, channels, date_from, date_to)]
+    dataset = ds.dataset(paths, schema=SCHEMA, format='parquet')
+    return dataset.to_table(columns=columns)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    files, partitions = compact()
+    print(f"✓ Compacted {files} new files into {partitions} partition writes under {LAKE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# product_mentions.py - Product-mention extraction stage
+"""
+Product-mention index.
+
+Message text is matched against a lexicon of drug and product names in
+English and Amharic with one Aho-Corasick pass per message, so the cost
+does not grow with the number of spellings. Matches are aggregated into
+product_mentions (one row per product, channel and day, counting the
+messages that mention the product), which /api/reports/top-products
+reads instead of scanning message text.
+
+Each run only processes messages ingested since the previous one: the
+highest telegram_messages.id processed is kept in pipeline_state and
+advanced in the same transaction as the counts.
+
+The pure-Python automaton is used unless pyahocorasick is installed.
+
+Usage: python src/product_mentions.py
+"""
+import logging
+from collections import Counter, deque
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database_sqlite import PipelineState, ProductMention, SessionLocal, TelegramMessage, create_tables
+from ingest import bump_data_version, upsert_add
+
+try:
+    import ahocorasick
+except ImportError:  # optional dependency
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+STAGE = "product_mentions"
+DEFAULT_BATCH_SIZE = 5000
+
+# Canonical product -> spellings seen in channel posts (brand names included)
+LEXICON = {
+    "paracetamol": ["paracetamol", "acetaminophen", "panadol", "tylenol", "ፓራሲታሞል", "ፓራሲታሞን"],
+    "ibuprofen": ["ibuprofen", "brufen", "advil", "አይቡፕሮፌን", "ኢቡፕሮፌን"],
+    "aspirin": ["aspirin", "acetylsalicylic acid", "አስፕሪን"],
+    "diclofenac": ["diclofenac", "voltaren", "ዳይክሎፌናክ", "ዲክሎፌናክ"],
+    "amoxicillin": ["amoxicillin", "amoxil", "augmentin", "አሞክሲሲሊን", "አሞክሳሲሊን"],
+    "azithromycin": ["azithromycin", "zithromax", "አዚትሮማይሲን"],
+    "ciprofloxacin": ["ciprofloxacin", "cipro", "ሲፕሮፍሎክሳሲን"],
+    "metronidazole": ["metronidazole", "flagyl", "ሜትሮኒዳዞል"],
+    "omeprazole": ["omeprazole", "ኦሜፕራዞል"],
+    "metformin": ["metformin", "glucophage", "ሜትፎርሚን"],
+    "insulin": ["insulin", "ኢንሱሊን"],
+    "amlodipine": ["amlodipine", "አምሎዲፒን"],
+    "vitamin c": ["vitamin c", "vitamin-c", "vit c", "ascorbic acid", "ቫይታሚን ሲ"],
+    "vitamin d": ["vitamin d", "vitamin d3", "vit d", "ቫይታሚን ዲ"],
+    "zinc": ["zinc", "ዚንክ"],
+    "ors": ["oral rehydration salts", "ors", "ኦአርኤስ"],
+    "sunscreen": ["sunscreen", "sunblock", "የፀሐይ መከላከያ"],
+    "moisturizer": ["moisturizer", "moisturiser", "lotion", "ሎሽን"],
+    "condom": ["condom", "condoms", "ኮንዶም"],
+    "pregnancy test": ["pregnancy test", "የእርግዝና መመርመሪያ"],
+}
+
+
+def is_word_char(char):
+    return char.isalnum()
+
+
+class PureAutomaton:
+    """Aho-Corasick automaton over characters, with a pyahocorasick-like iter()"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+    def add_word(self, word, value):
+        state = 0
+        for char in word:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(value)
+
+    def make_automaton(self):
+        """Compute failure links breadth first and merge their outputs"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def iter(self, text):
+        """Yield (end_index, value) for every occurrence of every word"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for value in output[state]:
+                yield index, value
+
+
+class ProductMatcher:
+    """Finds lexicon products in free text"""
+
+    def __init__(self, lexicon=LEXICON, use_native=True):
+        self.automaton = ahocorasick.Automaton() if ahocorasick and use_native else PureAutomaton()
+        for product, spellings in lexicon.items():
+            for spelling in spellings:
+                spelling = spelling.casefold()
+                # Latin spellings must stand alone ("ors" not inside "doctors");
+                # Amharic ones may carry attached prefixes/suffixes (በ-, -ን, -ም)
+                whole_word = spelling.isascii()
+                self.automaton.add_word(spelling, (product, len(spelling), whole_word))
+        self.automaton.make_automaton()
+
+    def products(self, text):
+        """Set of canonical products mentioned in text"""
+        found = set()
+        if not text:
+            return found
+        text = text.casefold()
+        for end, (product, length, whole_word) in self.automaton.iter(text):
+            if product in found:
+                continue
+            if whole_word:
+                start = end - length + 1
+                if start > 0 and is_word_char(text[start - 1]):
+                    continue
+                if end + 1 < len(text) and is_word_char(text[end + 1]):
+                    continue
+            found.add(product)
+        return found
+
+
+def get_watermark(db, stage=STAGE):
+    state = db.get(PipelineState, stage)
+    return state.last_id if state else 0
+
+
+def set_watermark(db, last_id, stage=STAGE):
+    state = db.get(PipelineState, stage)
+    if state is None:
+        state = PipelineState(stage=stage)
+        db.add(state)
+    state.last_id = last_id
+    state.updated_at = datetime.utcnow()
+
+
+def update_product_mentions(db, matcher=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Add mentions from messages ingested since the last run; returns messages processed"""
+    matcher = matcher or ProductMatcher()
+    messages = TelegramMessage.__table__
+    upsert = upsert_add(db.get_bind(), ProductMention.__table__,
+                        ['product', 'channel_name', 'day'], ['mention_count'])
+    last_id = get_watermark(db)
+    processed = 0
+
+    while True:
+        rows = db.execute(
+            select(messages.c.id, messages.c.channel_name, messages.c.date, messages.c.message_text)
+            .where(messages.c.id > last_id)
+            .order_by(messages.c.id)
+            .limit(batch_size)
+        ).fetchall()
+        if not rows:
+            break
+
+        counts = Counter()
+        for row in rows:
+            if row.date is None:
+                continue
+            day = row.date.date()
+            for product in matcher.products(row.message_text):
+                counts[product, row.channel_name, day] += 1
+
+        if counts:
+            db.execute(upsert, [
+                {'product': product, 'channel_name': channel, 'day': day, 'mention_count': count}
+                for (product, channel, day), count in counts.items()
+            ])
+            bump_data_version(db)
+        last_id = rows[-1].id
+        set_watermark(db, last_id)
+        db.commit()
+        processed += len(rows)
+
+    if processed:
+        logger.info(f"  Product mentions: processed {processed} new messages")
+    return processed
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    create_tables()
+    with SessionLocal() as db:
+        processed = update_product_mentions(db)
+    print(f"✓ Product mentions updated from {processed} new messages")
+
+
+if __name__ == "__main__":
+    main()
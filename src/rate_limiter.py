@@ -0,0 +1,167 @@
+# rate_limiter.py - Shared Telegram rate limiting for concurrent scrapers
+"""
+Token-bucket rate limiter and concurrent channel runner.
+
+All scraping workers draw request tokens from one RateLimiter, so the
+request rate against the Telegram account is bounded no matter how many
+channels run at once. A FloodWaitError pauses every worker for the
+requested number of seconds, not just the one that hit it.
+
+On top of the shared budget, at most PER_CHANNEL_CONCURRENCY requests
+for one channel are in flight at a time. A channel's history is read by
+one sequential stream, so the cap does not bind there. It binds for
+media: MediaDownloader's workers all take slots of the channel whose
+photos they fetch, next to that channel's history stream. Without it, a
+photo-heavy channel could run every download worker in parallel against
+one channel (and its file DC), crowding out the other channels'
+downloads and drawing the per-peer flood waits first.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from telethon.errors import FloodWaitError
+
+logger = logging.getLogger(__name__)
+
+# Telegram returns history in pages of at most 100 messages per request
+HISTORY_PAGE_SIZE = 100
+
+
+class RateLimiter:
+    """Token bucket shared by all workers, with per-channel concurrency caps
+
+    per_channel bounds the requests in flight for one channel (history
+    stream plus photo downloads); see the module docstring.
+    """
+
+    def __init__(self, rate=5.0, burst=10, per_channel=2):
+        self.rate = rate
+        self.capacity = burst
+        self.per_channel = per_channel
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+        self._channel_slots = defaultdict(lambda: asyncio.Semaphore(self.per_channel))
+
+    @classmethod
+    def from_env(cls):
+        """Build a limiter from TELEGRAM_RATE / TELEGRAM_BURST / PER_CHANNEL_CONCURRENCY"""
+        return cls(
+            rate=float(os.getenv('TELEGRAM_RATE', '5')),
+            burst=int(os.getenv('TELEGRAM_BURST', '10')),
+            per_channel=int(os.getenv('PER_CHANNEL_CONCURRENCY', '2')),
+        )
+
+    def pause(self, seconds):
+        """Stop handing out tokens to every worker for `seconds`"""
+        resume_at = time.monotonic() + seconds
+        if resume_at > self._resume_at:
+            self._resume_at = resume_at
+            logger.warning(f"⏳ Flood wait: pausing all workers for {seconds}s")
+
+    async def acquire(self):
+        """Wait for one request token"""
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._resume_at:
+                    await asyncio.sleep(self._resume_at - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @asynccontextmanager
+    async def slot(self, channel):
+        """Hold one of the channel's concurrency slots and a request token"""
+        async with self._channel_slots[channel]:
+            await self.acquire()
+            yield
+
+    async def call(self, channel, func, *args, **kwargs):
+        """Await func(*args) under the limiter, retrying after flood waits"""
+        while True:
+            async with self.slot(channel):
+                try:
+                    return await func(*args, **kwargs)
+                except FloodWaitError as e:
+                    self.pause(e.seconds)
+
+    async def throttle(self, channel, messages, page_size=HISTORY_PAGE_SIZE):
+        """Pass through an iter_messages() stream, taking a token per page fetched"""
+        iterator = messages.__aiter__()
+        count = 0
+        while True:
+            try:
+                if count % page_size == 0:
+                    # This __anext__ triggers the next history request
+                    async with self.slot(channel):
+                        message = await iterator.__anext__()
+                else:
+                    message = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            count += 1
+            yield message
+
+
+async def iter_messages_resumable(client, entity, channel, limiter, limit=None, **kwargs):
+    """iter_messages() under the limiter that survives flood waits
+
+    On FloodWaitError every worker is paused and this stream parks without
+    blocking the event loop, then resumes just past the last message it
+    yielded instead of starting the channel over.
+    """
+    reverse = kwargs.get('reverse', False)
+    last_id = None
+    yielded = 0
+    while limit is None or yielded < limit:
+        remaining = None if limit is None else limit - yielded
+        if last_id is not None:
+            # Newest-first streams continue below the cursor, reversed ones above it
+            if reverse:
+                kwargs['min_id'] = max(kwargs.get('min_id', 0), last_id)
+            else:
+                kwargs['offset_id'] = last_id
+        messages = client.iter_messages(entity, limit=remaining, **kwargs)
+        try:
+            async for message in limiter.throttle(channel, messages):
+                last_id = message.id
+                yielded += 1
+                yield message
+            return
+        except FloodWaitError as e:
+            limiter.pause(e.seconds)
+
+
+async def run_channels(channels, worker, limiter, concurrency=None):
+    """Run worker(channel) for every channel, at most `concurrency` at a time
+
+    A worker that raises FloodWaitError triggers a global pause and is
+    restarted once the limiter lets requests through again. Results are
+    returned in the same order as `channels`.
+    """
+    if concurrency is None:
+        concurrency = int(os.getenv('CHANNEL_CONCURRENCY', '8'))
+    workers = asyncio.Semaphore(concurrency)
+
+    async def run(channel):
+        async with workers:
+            while True:
+                try:
+                    return await worker(channel)
+                except FloodWaitError as e:
+                    limiter.pause(e.seconds)
+                    await limiter.acquire()
+
+    return await asyncio.gather(*(run(channel) for channel in channels))
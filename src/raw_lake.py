@@ -0,0 +1,161 @@
+# raw_lake.py - Streaming, append-only writer for the raw message lake
+"""
+Raw lake writer.
+
+Messages are appended as newline-delimited JSON while they are scraped,
+so memory use does not depend on channel size. Layout:
+
+    data/raw/telegram_messages/<YYYY-MM-DD>/<channel>/
+        part-<run>-<seq>.ndjson[.gz|.zst]
+        _manifest.json
+
+A part is written under a hidden ".inprogress" name and renamed into
+place when it is complete (on close or when it reaches max_part_bytes),
+so readers only ever see finished files. Every run adds new parts and
+records them in the partition manifest; reruns on the same day append
+to the partition instead of overwriting it.
+"""
+import gzip
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from message_record import MessageRecord
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+RAW_MESSAGES_DIR = Path("data/raw/telegram_messages")
+MANIFEST_NAME = "_manifest.json"
+DEFAULT_COMPRESSION = os.getenv('RAW_LAKE_COMPRESSION') or None
+DEFAULT_MAX_PART_BYTES = 64 * 1024 * 1024
+
+EXTENSIONS = {None: ".ndjson", "gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+
+def read_manifest(partition_dir):
+    """Load a partition manifest, or an empty one if none exists yet"""
+    path = Path(partition_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {"parts": []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(partition_dir, manifest):
+    """Replace the partition manifest atomically"""
+    path = Path(partition_dir) / MANIFEST_NAME
+    tmp_path = path.with_name(f".{MANIFEST_NAME}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class RawLakeWriter:
+    """Append-only NDJSON writer for one (date, channel) partition"""
+
+    def __init__(self, channel_name, root=RAW_MESSAGES_DIR, date=None,
+                 compression=DEFAULT_COMPRESSION, max_part_bytes=DEFAULT_MAX_PART_BYTES):
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+
+        self.channel_name = channel_name
+        self.date = date or datetime.now().strftime("%Y-%m-%d")
+        self.partition_dir = Path(root) / self.date / channel_name
+        self.partition_dir.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.max_part_bytes = max_part_bytes
+        self.run_id = f"{datetime.now().strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.records = 0
+        self.parts = []
+
+        self._seq = 0
+        self._file = None
+        self._raw = None
+        self._part = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Keep whatever was scraped before an error
+        self.close()
+
+    def _open_part(self):
+        name = f"part-{self.run_id}-{self._seq:04d}{EXTENSIONS[self.compression]}"
+        self._seq += 1
+        tmp_path = self.partition_dir / f".{name}.inprogress"
+
+        self._raw = open(tmp_path, 'wb')
+        if self.compression == "gzip":
+            self._file = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        elif self.compression == "zstd":
+            self._file = zstandard.ZstdCompressor().stream_writer(self._raw)
+        else:
+            self._file = self._raw
+        self._part = {"file": name, "tmp_path": tmp_path, "records": 0,
+                      "min_message_id": None, "max_message_id": None}
+
+    def _finish_part(self):
+        """Close the current part, move it into place and record it"""
+        if self._file is not self._raw:
+            self._file.close()
+        self._raw.close()
+
+        part = self._part
+        tmp_path = part.pop("tmp_path")
+        final_path = self.partition_dir / part["file"]
+        os.replace(tmp_path, final_path)
+        part["bytes"] = final_path.stat().st_size
+        part["created_at"] = datetime.now().isoformat()
+        self.parts.append(part)
+
+        manifest = read_manifest(self.partition_dir)
+        manifest.update({"date": self.date, "channel_name": self.channel_name})
+        manifest["parts"].append(part)
+        write_manifest(self.partition_dir, manifest)
+
+        self._file = self._raw = self._part = None
+
+    def write(self, record):
+        """Append one message, as a MessageRecord or a record dict"""
+        if self._file is None:
+            self._open_part()
+
+        if isinstance(record, MessageRecord):
+            line = record.to_ndjson()
+            message_id = record.message_id
+        else:
+            line = json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n"
+            message_id = record.get("message_id")
+        self._file.write(line)
+        self.records += 1
+
+        part = self._part
+        part["records"] += 1
+        if message_id is not None:
+            if part["min_message_id"] is None or message_id < part["min_message_id"]:
+                part["min_message_id"] = message_id
+            if part["max_message_id"] is None or message_id > part["max_message_id"]:
+                part["max_message_id"] = message_id
+
+        if self._raw.tell() >= self.max_part_bytes:
+            self._finish_part()
+
+    def add(self, record):
+        """Sink interface (see sinks.py), same as write()"""
+        self.write(record)
+
+    def close(self):
+        """Finish the open part, if any"""
+        if self._file is not None:
+            self._finish_part()
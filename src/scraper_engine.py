@@ -0,0 +1,422 @@
+# scraper_engine.py - Configurable, resumable Telegram scraping engine
+"""
+Scraping engine behind the Task 1 scrapers.
+
+Channels, per-channel limits, priorities and media flags come from a
+TOML or YAML config (config/channels.toml). Every message is fetched
+once, turned into a MessageRecord and handed to the configured sinks:
+
+    lake     raw NDJSON lake (raw_lake.RawLakeWriter)
+    db       telegram_messages (ingest.make_message_writer)
+    backup   NDJSON backup part per run (sinks.BackupJsonSink)
+
+Photos of channels with include_media are queued on the background
+downloader (media_pipeline.MediaDownloader); such a record reaches the
+sinks once its download is done, with the path only if it succeeded.
+Channels run concurrently under one RateLimiter, highest priority first.
+Channel usernames are resolved through entity_cache.EntityCache, so
+channels seen before cost no resolve request.
+
+Progress is kept per channel in a checkpoint file. A pass reads the
+channel newest first, down to the highest id of the last completed
+pass, at most `limit` messages per run. A pass cut short (the limit was
+reached, or the run was interrupted) continues below the last message
+it got to on the next run, so no history is skipped; once it reaches
+the previous pass, the next run starts from the newest message again.
+The checkpoint is written after the channel's sinks are closed, so it
+never runs ahead of what they stored. That includes records still
+waiting for their photo: an interrupted pass resumes at the newest of
+those, so the photo is fetched again (messages below it that were
+already stored may be stored twice; the loaders skip duplicates).
+
+Usage: python src/scraper_engine.py [--config config/channels.toml] [--sinks lake,db] [--limit N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from telethon.errors import FloodWaitError, RPCError
+
+from database_sqlite import SessionLocal, create_tables
+from entity_cache import EntityCache
+from ingest import make_message_writer
+from media_pipeline import IMAGES_DIR, MediaDownloader, has_photo
+from media_store import MediaStore
+from message_record import MessageRecord
+from rate_limiter import RateLimiter, iter_messages_resumable, run_channels
+from raw_lake import RAW_MESSAGES_DIR, RawLakeWriter
+from sinks import BackupJsonSink
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:  # optional dependency
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:  # optional dependency
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = Path("config/channels.toml")
+CHECKPOINT_PATH = Path("data/scrape_checkpoint.json")
+DATA_DIR = Path("data")
+
+DEFAULT_LIMIT = 100
+
+
+class ChannelConfig:
+    """One channel to scrape and how"""
+
+    def __init__(self, name, limit=DEFAULT_LIMIT, priority=0, include_media=True):
+        self.name = name
+        self.limit = limit  # None or 0: no limit
+        self.priority = priority
+        self.include_media = include_media
+
+    def __repr__(self):
+        return f"<ChannelConfig(name={self.name}, limit={self.limit}, priority={self.priority})>"
+
+
+class ScraperConfig:
+    """Channels plus session, login mode, sinks and checkpoint path"""
+
+    def __init__(self, channels, session='medical_scraper', login='start', sinks=('lake',),
+                 checkpoint=CHECKPOINT_PATH):
+        self.channels = channels
+        self.session = session
+        self.login = login
+        self.sinks = list(sinks)
+        self.checkpoint = Path(checkpoint)
+
+
+def read_config_file(path):
+    """Parse a .toml or .yaml/.yml config file into a dict"""
+    path = Path(path)
+    if path.suffix == '.toml':
+        if tomllib is None:
+            raise RuntimeError("TOML configs need Python 3.11+ or the 'tomli' package")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if path.suffix in ('.yaml', '.yml'):
+        if yaml is None:
+            raise RuntimeError("YAML configs need the 'pyyaml' package")
+        with open(path, encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    raise ValueError(f"Unsupported config format: {path.name}")
+
+
+def load_config(path=CONFIG_PATH, channels=None, limit=None, session=None, login=None, sinks=None):
+    """Build a ScraperConfig from a config file
+
+    The keyword arguments override the file: `channels` keeps only those
+    channels (adding any the file does not list), `limit` replaces the
+    default limit (channels with their own limit keep it).
+    """
+    raw = read_config_file(path)
+    telegram = raw.get('telegram', {})
+    scrape = raw.get('scrape', {})
+    defaults = {'limit': DEFAULT_LIMIT, 'priority': 0, 'include_media': True,
+                **raw.get('defaults', {})}
+    if limit is not None:
+        defaults['limit'] = limit
+
+    entries = {entry['name']: entry for entry in raw.get('channels', [])}
+    if channels is not None:
+        entries = {name: entries.get(name, {'name': name}) for name in channels}
+
+    return ScraperConfig(
+        channels=[ChannelConfig(**{**defaults, **entry}) for entry in entries.values()],
+        session=session or telegram.get('session', 'medical_scraper'),
+        login=login or telegram.get('login', 'start'),
+        sinks=sinks or scrape.get('sinks', ['lake']),
+        checkpoint=scrape.get('checkpoint', CHECKPOINT_PATH),
+    )
+
+
+class Checkpoint:
+    """Per-channel scrape progress, persisted as JSON
+
+    For each channel: max_id, the newest message id of the last completed
+    pass, and pending, the unfinished pass ({offset_id, top_id}) if any.
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = Path(path)
+        self._state = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                self._state = json.load(f)
+
+    def get(self, channel):
+        return dict(self._state.get(channel, {'max_id': 0, 'pending': None}))
+
+    def update(self, channel, max_id, pending=None):
+        """Record the channel's progress and write the file atomically"""
+        self._state[channel] = {'max_id': max_id, 'pending': pending,
+                                'updated_at': datetime.utcnow().isoformat()}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def lake_sink(raw_dir=RAW_MESSAGES_DIR):
+    return lambda channel_name, channel_title: RawLakeWriter(channel_name, root=raw_dir)
+
+
+def db_sink(db):
+    return lambda channel_name, channel_title: make_message_writer(db, channel_name, channel_title)
+
+
+def backup_sink(data_dir=DATA_DIR):
+    return lambda channel_name, channel_title: BackupJsonSink(data_dir, channel_name)
+
+
+class ScraperEngine:
+    """Scrapes channels into sinks, resuming each channel from the checkpoint
+
+    sink_factories are callables (channel_name, channel_title) -> sink;
+    a sink has add(record) and close(). Without a downloader, photos are
+    not fetched. Without a resolver (an EntityCache), every channel is
+    resolved with get_entity() on every run.
+    """
+
+    def __init__(self, client, channels, sink_factories, limiter=None, checkpoint=None,
+                 downloader=None, resolver=None):
+        self.client = client
+        self.channels = sorted(channels, key=lambda channel: -channel.priority)
+        self.sink_factories = sink_factories
+        self.limiter = limiter or RateLimiter.from_env()
+        self.checkpoint = checkpoint or Checkpoint()
+        self.downloader = downloader
+        self.resolver = resolver
+        self._entities = {}
+
+    async def run(self):
+        """Scrape every channel; returns {channel: (messages, images)}"""
+        by_name = {channel.name: channel for channel in self.channels}
+        if self.resolver is not None:
+            # One sweep up front: cached channels cost nothing, the rest resolve concurrently
+            self._entities = await self.resolver.resolve_many(list(by_name))
+        results = await run_channels(
+            list(by_name), lambda name: self._run_channel(by_name[name]), self.limiter
+        )
+        return dict(zip(by_name, results))
+
+    async def _run_channel(self, channel):
+        try:
+            return await self.scrape_channel(channel)
+        except FloodWaitError:
+            raise  # run_channels pauses all workers and retries the channel
+        except Exception as e:
+            logger.error(f"✗ Failed to scrape {channel.name}: {e}")
+            if self.resolver is not None and isinstance(e, RPCError):
+                # The cached access hash may be what Telegram rejected; resolve afresh next run
+                self.resolver.invalidate(channel.name)
+            return 0, 0
+
+    async def resolve(self, name):
+        """(entity, title) for a channel, entity None if it does not exist
+
+        A name the up-front sweep could not resolve (e.g. a network error)
+        is tried again here; a second failure raises.
+        """
+        if self.resolver is None:
+            entity = await self.limiter.call(name, self.client.get_entity, name)
+            return entity, getattr(entity, 'title', '')
+        if name in self._entities:
+            entity = self._entities[name]
+        else:
+            entity = await self.resolver.resolve(name)
+        return entity, getattr(entity, 'title', None) or self.resolver.titles.get(name, '')
+
+    async def scrape_channel(self, channel):
+        """Run (or continue) one pass over a channel; returns (messages, images)"""
+        state = self.checkpoint.get(channel.name)
+        max_id = state['max_id']
+        pending = state['pending'] or {'offset_id': None, 'top_id': max_id}
+        fetch = {'min_id': max_id}
+        if pending['offset_id']:
+            fetch['offset_id'] = pending['offset_id']
+            logger.info(f"Scraping: @{channel.name} (resuming below message {pending['offset_id']})")
+        else:
+            logger.info(f"Scraping: @{channel.name}")
+
+        entity, title = await self.resolve(channel.name)
+        if entity is None:
+            logger.warning(f"  ✗ @{channel.name}: not found, skipped")
+            return 0, 0
+        media = channel.include_media and self.downloader is not None
+        limit = channel.limit or None
+
+        sinks = [factory(channel.name, title) for factory in self.sink_factories]
+        messages = images = 0
+        photos = deque()  # (record, future of its image path), newest first, until stored
+        complete = False
+        try:
+            async for message in iter_messages_resumable(self.client, entity, channel.name,
+                                                         self.limiter, limit=limit, **fetch):
+                record = MessageRecord.from_telethon(message, channel.name, title)
+                if media and has_photo(message):
+                    photos.append((record, await self.downloader.submit(message, channel.name)))
+                else:
+                    for sink in sinks:
+                        sink.add(record)
+                messages += 1
+                pending['offset_id'] = message.id
+                pending['top_id'] = max(pending['top_id'], message.id)
+                while photos and photos[0][1].done():
+                    images += self._store_photo(photos.popleft(), sinks)
+            while photos:
+                await photos[0][1]
+                images += self._store_photo(photos.popleft(), sinks)
+            # Fewer messages than the limit: the pass reached max_id
+            complete = limit is None or messages < limit
+        finally:
+            for sink in sinks:
+                sink.close()
+            if photos:
+                # Not stored yet: resume at (Telethon's offset_id is exclusive)
+                pending['offset_id'] = photos[0][0].message_id + 1
+            if complete:
+                self.checkpoint.update(channel.name, pending['top_id'])
+            elif messages:
+                self.checkpoint.update(channel.name, max_id, pending)
+
+        logger.info(f"  ✓ @{channel.name}: {messages} messages, {images} images"
+                    + ("" if complete else " (more to fetch next run)"))
+        return messages, images
+
+    @staticmethod
+    def _store_photo(photo, sinks):
+        """Hand a record with a finished download to the sinks; 1 if the photo was saved"""
+        record, future = photo
+        path = None if future.cancelled() else future.result()
+        # image_path only if the download succeeded
+        if path is not None:
+            record.image_path = str(path)
+        for sink in sinks:
+            sink.add(record)
+        return int(path is not None)
+
+
+def get_password():
+    """Get password from user, with option to skip if no 2FA"""
+    try:
+        # Try to get password without showing input
+        import getpass
+        password = getpass.getpass(" Enter your Telegram 2FA password (press Enter if none): ")
+        return password if password else None
+    except Exception:
+        # Fallback to regular input
+        password = input(" Enter your Telegram 2FA password (press Enter if none): ")
+        return password if password else None
+
+
+def make_client(session):
+    """TelegramClient from .env credentials; TELEGRAM_SESSION overrides the session file"""
+    from telethon import TelegramClient
+    from telethon.sessions import StringSession
+
+    if os.getenv('TELEGRAM_SESSION'):
+        session = StringSession(os.environ['TELEGRAM_SESSION'])
+    # Flood waits are raised so the shared limiter can pause every channel
+    return TelegramClient(session, int(os.environ['TELEGRAM_API_ID']),
+                          os.environ['TELEGRAM_API_HASH'], flood_sleep_threshold=0)
+
+
+async def login(client, mode):
+    """Connect the client; returns False if mode is 'session' and it is not authorized"""
+    if mode == 'session':
+        await client.connect()
+        return await client.is_user_authorized()
+    if mode == 'interactive':
+        print("Note: If asked for password, enter your Telegram 2FA password")
+        await client.start(
+            phone=lambda: input(" Enter your phone number (with country code): "),
+            password=get_password,
+            code_callback=lambda: input(" Enter the code you received: ")
+        )
+        return True
+    await client.start()
+    return True
+
+
+async def run_scraper(config, client=None):
+    """Log in, scrape the configured channels into the configured sinks and print a summary"""
+    load_dotenv()
+    Path(IMAGES_DIR).mkdir(parents=True, exist_ok=True)
+    Path(RAW_MESSAGES_DIR).mkdir(parents=True, exist_ok=True)
+    client = client or make_client(config.session)
+
+    # The db sink and the media index share the warehouse database
+    create_tables()
+    db = SessionLocal()
+    factories = {'lake': lake_sink, 'db': lambda: db_sink(db), 'backup': backup_sink}
+    unknown = set(config.sinks) - set(factories)
+    if unknown:
+        raise ValueError(f"Unknown sinks: {', '.join(sorted(unknown))}")
+    sink_factories = [factories[name]() for name in config.sinks]
+
+    try:
+        print(" Connecting to Telegram...")
+        if not await login(client, config.login):
+            print("❌ Not logged in. Run test_connection.py first!")
+            return {}
+        print(" Connected to Telegram")
+
+        limiter = RateLimiter.from_env()
+        engine = ScraperEngine(client, config.channels, sink_factories, limiter,
+                               Checkpoint(config.checkpoint),
+                               resolver=EntityCache(db, client, limiter))
+        if any(channel.include_media for channel in config.channels):
+            # Photos download in the background while messages keep streaming
+            async with MediaDownloader(client, limiter, store=MediaStore(db)) as downloader:
+                engine.downloader = downloader
+                results = await engine.run()
+        else:
+            results = await engine.run()
+
+        print("\n" + "=" * 60)
+        print(f" Total Messages Scraped: {sum(messages for messages, _ in results.values())}")
+        print(f" Total Images Saved: {sum(images for _, images in results.values())}")
+        print(f" Sinks: {', '.join(config.sinks)}")
+        print("=" * 60)
+        return results
+    finally:
+        await client.disconnect()
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--config', type=Path, default=CONFIG_PATH)
+    parser.add_argument('--channels', help="comma separated subset of the configured channels")
+    parser.add_argument('--sinks', help="comma separated: lake, db, backup")
+    parser.add_argument('--limit', type=int, help="default messages per channel per run")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', datefmt='%H:%M:%S')
+    config = load_config(
+        args.config,
+        channels=args.channels.split(',') if args.channels else None,
+        limit=args.limit,
+        sinks=args.sinks.split(',') if args.sinks else None,
+    )
+    asyncio.run(run_scraper(config))
+
+
+if __name__ == "__main__":
+    main()
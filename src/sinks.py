@@ -0,0 +1,64 @@
+# sinks.py - Writers fed from a single scraped message stream
+"""
+Message sinks.
+
+A scrape fetches each message from Telegram once, turns it into one
+MessageRecord and hands that to every sink (database writer, raw
+backup, ...). Sinks expose add(message) and close(); MessageBatchWriter
+in ingest.py follows the same interface. add() also takes a Telethon
+message and converts it.
+"""
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from message_record import MessageRecord
+
+logger = logging.getLogger(__name__)
+
+
+class BackupJsonSink:
+    """Streams the run's messages to a <channel>_backup_<date>-<run>.ndjson part
+
+    Records are appended as they arrive, so memory use does not depend on
+    channel size, and every run writes its own part instead of rewriting
+    the day's earlier backups. As in RawLakeWriter, the part is written
+    under a hidden ".inprogress" name and renamed into place on close.
+    """
+
+    def __init__(self, data_dir, channel_name):
+        self.channel_name = channel_name
+        run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.filepath = Path(data_dir) / f"{channel_name}_backup_{run_id}.ndjson"
+        self.records = 0
+        self._tmp_path = self.filepath.with_name(f".{self.filepath.name}.inprogress")
+        self._file = None
+
+    def add(self, message):
+        if not isinstance(message, MessageRecord):
+            message = MessageRecord.from_telethon(message, self.channel_name)
+        if self._file is None:
+            self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._file.write(json.dumps(message.to_backup(), ensure_ascii=False) + "\n")
+        self.records += 1
+
+    def close(self):
+        """Move the finished part into place; returns the number of records"""
+        if self._file is None:
+            return 0
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.filepath)
+
+        logger.info(f"  Backup saved: {self.filepath.name}")
+        return self.records
+
+    def discard(self):
+        """Drop the unfinished part, e.g. when the scrape is rolled back"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._tmp_path.unlink(missing_ok=True)
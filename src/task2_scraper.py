@@ -1,18 +1,24 @@
 # task2_scraper.py - Complete Task 2 with SQLite
 import asyncio
-import json
 import os
 from datetime import datetime
 from pathlib import Path
 import logging
 from telethon import TelegramClient
-from telethon.errors import SessionPasswordNeededError, UsernameNotOccupiedError
+from telethon.errors import FloodWaitError, RPCError, SessionPasswordNeededError, UsernameNotOccupiedError
 from dotenv import load_dotenv
 import sys
 
 # Add current directory to path
 sys.path.append('.')
 from database_sqlite import SessionLocal, TelegramMessage, ChannelInfo, create_tables
+from entity_cache import EntityCache
+from ingest import make_message_writer, update_message_stats
+from message_record import MessageRecord
+from rate_limiter import RateLimiter, iter_messages_resumable, run_channels
+from sinks import BackupJsonSink
+from product_mentions import update_product_mentions
+from export import EXPORT_COLUMNS, export_messages
 
 # Setup
 load_dotenv()
@@ -20,24 +26,38 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class MedicalTelegramScraper:
-    def __init__(self):
-        # Telegram API credentials
-        self.api_id = os.getenv('TELEGRAM_API_ID')
-        self.api_hash = os.getenv('TELEGRAM_API_HASH')
-        
-        if not self.api_id or not self.api_hash:
-            raise ValueError("Telegram API credentials not found in .env file")
-        
+    def __init__(self, client=None, db=None, batch_size=None, limiter=None):
         # Setup directories
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
         
-        # Telegram client
-        self.session_file = "telegram_session.session"
-        self.client = TelegramClient(self.session_file, self.api_id, self.api_hash)
+        # Telegram client (a prepared client, e.g. a fake one, can be passed in)
+        if client is None:
+            # Telegram API credentials
+            self.api_id = os.getenv('TELEGRAM_API_ID')
+            self.api_hash = os.getenv('TELEGRAM_API_HASH')
+            
+            if not self.api_id or not self.api_hash:
+                raise ValueError("Telegram API credentials not found in .env file")
+            
+            self.session_file = "telegram_session.session"
+            # Flood waits are raised to us so the shared limiter can pause all workers
+            client = TelegramClient(
+                self.session_file, self.api_id, self.api_hash, flood_sleep_threshold=0
+            )
+        self.client = client
         
-        # Database
-        self.db = SessionLocal()
+        # Database (shared by concurrent channel tasks; every write is
+        # committed before the next await, so tasks never see each other's
+        # pending state)
+        self.db = db if db is not None else SessionLocal()
+        self.batch_size = batch_size
+        
+        # Shared request budget for every channel scraped by this instance
+        self.limiter = limiter or RateLimiter.from_env()
+        
+        # Channel ids and access hashes kept in the channels table
+        self.entities = EntityCache(self.db, self.client, self.limiter)
     
     async def start(self):
         """Start Telegram client"""
@@ -69,122 +89,124 @@ class MedicalTelegramScraper:
             "sciencemagazine",          # Science Magazine
         ]
         
-        working_channels = []
+        # Known channels come from the channels table without a request;
+        # the rest are resolved concurrently under the rate limiter
+        cache = self.entities
+        entities = await cache.resolve_many(medical_channels)
         
+        working_channels = []
         for channel in medical_channels:
-            try:
-                logger.info(f"Checking: {channel}")
-                entity = await self.client.get_entity(channel)
-                
-                # Save channel to database if not exists
-                existing = self.db.query(ChannelInfo).filter_by(channel_name=channel).first()
-                if not existing:
-                    channel_info = ChannelInfo(
-                        channel_name=channel,
-                        channel_title=getattr(entity, 'title', ''),
-                        telegram_id=entity.id,
-                        last_scraped=datetime.utcnow()
-                    )
-                    self.db.add(channel_info)
-                    self.db.commit()
-                    logger.info(f"  ✓ Added to database: {getattr(entity, 'title', channel)}")
-                else:
-                    logger.info(f"  ✓ Already in database")
-                
-                working_channels.append((channel, entity))
-                
-            except Exception as e:
-                logger.info(f"  ✗ Not found or error: {str(e)[:50]}...")
-            
-            await asyncio.sleep(1)  # Be polite to Telegram API
+            if channel not in entities:
+                logger.error(f"  ✗ Could not resolve {channel} this run: {cache.errors[channel]}")
+            elif entities[channel] is None:
+                logger.info(f"  ✗ Not found: {channel}")
+            else:
+                working_channels.append((channel, entities[channel]))
         
+        logger.info(f"✓ {len(working_channels)} channels: {cache.hits} cached, "
+                    f"{cache.resolved} resolved, {cache.not_found} not found, "
+                    f"{cache.cached_misses} skipped as known misses, {len(cache.errors)} failed")
         return working_channels
     
-    async def scrape_channel_messages(self, channel_name, entity, message_limit=100):
-        """Scrape messages from a channel and save to database"""
+    async def scrape_channel_messages(self, channel_name, entity, message_limit=100, edit_window=0):
+        """Scrape messages newer than the channel's watermark and save to database
+        
+        edit_window re-scans that many message ids below the watermark to
+        pick up updated views/forwards on recent posts.
+        """
+        backup = None
         try:
             logger.info(f"\nScraping: {channel_name}")
             
-            new_message_count = 0
-            total_count = 0
-            
-            async for message in self.client.iter_messages(entity, limit=message_limit):
-                total_count += 1
-                
-                # Check if message already exists
-                existing = self.db.query(TelegramMessage).filter_by(
-                    message_id=message.id,
-                    channel_name=channel_name
-                ).first()
-                
-                if existing:
-                    continue  # Skip if already saved
-                
-                # Save new message
-                telegram_msg = TelegramMessage(
-                    message_id=message.id,
+            channel = self.db.query(ChannelInfo).filter_by(channel_name=channel_name).first()
+            if not channel:
+                channel = ChannelInfo(
                     channel_name=channel_name,
-                    channel_title=getattr(entity, 'title', ''),
-                    message_text=message.text,
-                    sender_id=message.sender_id,
-                    views=message.views,
-                    forwards=message.forwards,
-                    date=message.date
+                    channel_title=getattr(entity, 'title', '')
                 )
-                
-                self.db.add(telegram_msg)
-                new_message_count += 1
+                self.db.add(channel)
+                self.db.commit()
+            watermark = channel.last_message_id or 0
+            
+            # Messages are buffered and written in batches; duplicates are
+            # resolved once per batch instead of once per message (COPY on Postgres)
+            # Cached entities (InputPeerChannel) carry no title; the table has it
+            channel_title = getattr(entity, 'title', None) or channel.channel_title or ''
+            writer = make_message_writer(
+                self.db, channel_name,
+                channel_title=channel_title,
+                batch_size=self.batch_size
+            )
+            # The JSON backup is fed from the same stream, so every message
+            # is fetched from Telegram exactly once
+            backup = BackupJsonSink(self.data_dir, channel_name)
+            
+            if watermark:
+                # Walk forward from the watermark so a backlog larger than
+                # message_limit is picked up over the next runs without gaps
+                fetch = {'min_id': watermark, 'reverse': True}
+            else:
+                fetch = {}
+            # Flood waits park this channel and resume after the last message
+            messages = iter_messages_resumable(
+                self.client, entity, channel_name, self.limiter, limit=message_limit, **fetch
+            )
+            
+            async for message in messages:
+                # One record per message, shared by the writer and the backup
+                record = MessageRecord.from_telethon(message, channel_name, channel_title)
+                writer.add(record)
+                backup.add(record)
                 
                 # Progress indicator
-                if total_count % 20 == 0:
-                    logger.info(f"  Processed {total_count} messages...")
+                if writer.seen % 1000 == 0:
+                    logger.info(f"  Processed {writer.seen} messages...")
             
-            # Commit to database
-            self.db.commit()
+            new_message_count = writer.close()
+            total_count = writer.seen
             
-            # Update channel's last_scraped time
-            channel = self.db.query(ChannelInfo).filter_by(channel_name=channel_name).first()
-            if channel:
-                channel.last_scraped = datetime.utcnow()
-                self.db.commit()
+            if watermark and edit_window:
+                # Resumable too: a flood wait here must not throw away the channel
+                recent = iter_messages_resumable(
+                    self.client, entity, channel_name, self.limiter,
+                    min_id=max(0, watermark - edit_window), max_id=watermark + 1
+                )
+                refreshed = [message async for message in recent]
+                update_message_stats(self.db, channel_name, refreshed)
+                logger.info(f"  Refreshed views/forwards for {len(refreshed)} recent messages")
+            
+            # Advance the watermark and last_scraped time
+            channel.last_message_id = max(watermark, writer.max_message_id)
+            channel.last_scraped = datetime.utcnow()
+            self.db.commit()
             
             logger.info(f"✓ Saved {new_message_count} new messages (Total processed: {total_count})")
             
             # Also save backup to JSON
-            await self.save_backup_json(channel_name, entity, min(50, message_limit))
+            try:
+                backup.close()
+            except Exception as e:
+                logger.error(f"  Backup failed: {e}")
             
             return new_message_count
             
+        except FloodWaitError:
+            # Let the channel runner pause every worker and retry this channel
+            self.db.rollback()
+            if backup is not None:
+                backup.discard()
+            raise
         except Exception as e:
             self.db.rollback()
+            if backup is not None:
+                backup.discard()
             logger.error(f"✗ Error scraping {channel_name}: {e}")
+            if isinstance(e, RPCError):
+                # Access hashes are per account: a cached peer from another
+                # session is rejected; resolve the channel afresh next run
+                self.entities.invalidate(channel_name)
             return 0
     
-    async def save_backup_json(self, channel_name, entity, limit=50):
-        """Save backup to JSON file"""
-        try:
-            messages = []
-            async for message in self.client.iter_messages(entity, limit=limit):
-                messages.append({
-                    'id': message.id,
-                    'date': message.date.isoformat() if message.date else None,
-                    'message': message.text,
-                    'sender_id': message.sender_id,
-                    'views': message.views,
-                    'forwards': message.forwards
-                })
-            
-            filename = f"{channel_name}_backup_{datetime.now().strftime('%Y%m%d')}.json"
-            filepath = self.data_dir / filename
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(messages, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"  Backup saved: {filename}")
-            
-        except Exception as e:
-            logger.error(f"  Backup failed: {e}")
-    
     def show_database_stats(self):
         """Display database statistics"""
         try:
@@ -227,44 +249,18 @@ class MedicalTelegramScraper:
             logger.error(f"Error getting stats: {e}")
             return {}
     
-    def export_to_csv(self):
-        """Export data to CSV for analysis"""
+    def export_to_csv(self, csv_file="telegram_messages_export.csv"):
+        """Export data to CSV for analysis (streamed, see export.py)"""
         try:
-            import pandas as pd
-            
-            # Query all messages
-            messages = self.db.query(TelegramMessage).all()
+            total = export_messages(csv_file, 'csv', bind=self.db.get_bind())
             
-            if not messages:
+            if not total:
                 logger.warning("No messages to export")
                 return
             
-            # Convert to DataFrame
-            data = []
-            for msg in messages:
-                data.append({
-                    'message_id': msg.message_id,
-                    'channel': msg.channel_name,
-                    'date': msg.date,
-                    'message': msg.message_text,
-                    'views': msg.views,
-                    'forwards': msg.forwards,
-                    'scraped_at': msg.scraped_at
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # Export to CSV
-            csv_file = "telegram_messages_export.csv"
-            df.to_csv(csv_file, index=False, encoding='utf-8-sig')
-            
             logger.info(f"✓ Data exported to {csv_file}")
-            logger.info(f"  Total records: {len(df)}")
-            logger.info(f"  Columns: {', '.join(df.columns)}")
-            
-            # Show sample
-            logger.info("\nSample of exported data:")
-            print(df.head(3).to_string())
+            logger.info(f"  Total records: {total}")
+            logger.info(f"  Columns: {', '.join(EXPORT_COLUMNS)}")
             
             return csv_file
             
@@ -306,11 +302,21 @@ async def main():
         logger.info("SCRAPING MESSAGES")
         logger.info("="*50)
         
-        total_new_messages = 0
-        for channel_name, entity in working_channels:
-            new_messages = await scraper.scrape_channel_messages(channel_name, entity, message_limit=50)
-            total_new_messages += new_messages
-            await asyncio.sleep(2)  # Delay between channels
+        # Optional re-scan of recent messages to refresh views/forwards
+        edit_window = int(os.getenv('SCRAPE_EDIT_WINDOW', '0'))
+        
+        # Channels run concurrently; the shared rate limiter paces requests
+        async def scrape(channel):
+            channel_name, entity = channel
+            return await scraper.scrape_channel_messages(
+                channel_name, entity, message_limit=50, edit_window=edit_window
+            )
+        
+        results = await run_channels(working_channels, scrape, scraper.limiter)
+        total_new_messages = sum(results)
+        
+        # Index product mentions in the newly stored messages
+        update_product_mentions(scraper.db)
         
         # Step 3: Show statistics
         scraper.show_database_stats()
@@ -1,6 +1,7 @@
 # verify_task2.py
 import os
-from database_sqlite import SessionLocal, TelegramMessage, ChannelInfo
+from sqlalchemy.orm import sessionmaker
+from database_sqlite import make_engine, TelegramMessage, ChannelInfo
 import pandas as pd
 
 def verify_task2():
@@ -17,8 +18,9 @@ def verify_task2():
     print(f"✓ Database file found: {db_file}")
     print(f"  Size: {os.path.getsize(db_file) / 1024:.1f} KB")
     
-    # Connect to database
-    db = SessionLocal()
+    # Connect to database (read-mostly profile; does not block a running scrape)
+    engine = make_engine(db_file, profile="read-mostly")
+    db = sessionmaker(bind=engine)()
     
     try:
         # Count records
@@ -85,6 +87,7 @@ def verify_task2():
     
     finally:
         db.close()
+        engine.dispose()
 
 if __name__ == "__main__":
     verify_task2()
\ No newline at end of file
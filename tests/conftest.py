@@ -0,0 +1,65 @@
+# conftest.py - Shared fixtures: a migrated SQLite warehouse and the API on top of it
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'api'))
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, TelegramMessage, make_engine
+from ingest import make_message_writer
+from message_record import MessageRecord
+from migrations import apply_migrations
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    """Engine on an empty SQLite warehouse, created from the models and migrated"""
+    engine = make_engine(tmp_path / 'warehouse.db', 'ingest')
+    Base.metadata.create_all(engine)
+    apply_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+def add_messages(engine, texts, channel_name='channel_a', start=datetime(2026, 1, 1)):
+    """Store one message per text, an hour apart, through the ingest writer
+
+    Like a scrape, this updates the activity rollups and bumps the data version.
+    """
+    with Session(engine) as db:
+        first = (db.query(func.max(TelegramMessage.message_id))
+                 .filter_by(channel_name=channel_name).scalar() or 0) + 1
+        writer = make_message_writer(db, channel_name)
+        for i, message_text in enumerate(texts):
+            writer.add(MessageRecord(first + i, channel_name, message_text=message_text, views=i,
+                                     forwards=0, date=start + timedelta(hours=first + i)))
+        writer.close()
+
+
+@pytest.fixture
+def api(warehouse, monkeypatch):
+    """TestClient for api/main.py reading the warehouse fixture"""
+    from fastapi.testclient import TestClient
+
+    url = warehouse.url.render_as_string()
+    monkeypatch.setenv('DATABASE_URL', url)
+    import cache
+    import database
+    import main
+
+    engine = database.make_async_engine(url)
+    sessions = database.async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(main, 'AsyncSessionLocal', sessions)
+    # Read the data version on every request, so a bump shows at once
+    monkeypatch.setattr(main, 'cache', cache.ResponseCache(sessions, cache.MemoryBackend(), version_ttl=0))
+    with TestClient(main.app) as client:
+        yield client
+    asyncio.run(engine.dispose())
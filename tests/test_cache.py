@@ -0,0 +1,35 @@
+# test_cache.py - Report response cache, ETags and data_version invalidation
+from conftest import add_messages
+
+ACTIVITY = "/api/channels/channel_a/activity"
+
+
+def test_not_modified_until_the_data_version_changes(api, warehouse):
+    add_messages(warehouse, ["paracetamol"] * 3)
+    first = api.get(ACTIVITY)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert api.get(ACTIVITY, headers={"If-None-Match": etag}).status_code == 304
+
+    # New messages bump the version: the cached body is not served any more
+    add_messages(warehouse, ["ibuprofen"] * 2)
+    second = api.get(ACTIVITY, headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["etag"] != etag
+    assert sum(day["message_count"] for day in second.json()["data"]["activity"]) == 5
+    assert api.get(ACTIVITY, headers={"If-None-Match": second.headers["etag"]}).status_code == 304
+
+
+def test_unchanged_report_keeps_its_etag_across_a_bump(api, warehouse):
+    add_messages(warehouse, ["paracetamol"], channel_name='channel_a')
+    etag = api.get(ACTIVITY).headers["etag"]
+    # Another channel's data bumps the version, but this body is the same
+    add_messages(warehouse, ["paracetamol"], channel_name='channel_b')
+    assert api.get(ACTIVITY, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_missing_data_version_table_is_a_cache_miss(api, warehouse):
+    add_messages(warehouse, ["paracetamol"])
+    with warehouse.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE data_version")
+    assert api.get("/api/channels").status_code == 200
@@ -0,0 +1,87 @@
+# test_image_detection.py - Detection reuse by content hash, unreadable photos, collected rows
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from database_sqlite import ImageDetection, MediaFile
+from image_detection import ImageDetector, write_detections
+
+
+class StubModel:
+    """Finds one bottle in every image and counts the images it was given"""
+
+    def __init__(self):
+        self.images = 0
+
+    def predict(self, images, **kwargs):
+        self.images += len(images)
+        boxes = SimpleNamespace(cls=np.array([0.0]), conf=np.array([0.9]))
+        return [SimpleNamespace(names={0: 'bottle'}, boxes=boxes) for _ in images]
+
+
+def write_jpeg(path, seed):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    image = np.random.default_rng(seed).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+    cv2.imwrite(str(path), image)
+
+
+@pytest.fixture
+def db(warehouse):
+    with Session(warehouse) as session:
+        yield session
+
+
+def detect(db, images_dir, model):
+    return ImageDetector(db, model=model, workers=1, images_dir=images_dir).run()
+
+
+def test_same_photo_reuses_the_stored_detection(db, tmp_path):
+    images_dir = tmp_path / 'images'
+    for message_id in (1, 2, 3):
+        write_jpeg(images_dir / 'channel_a' / f"{message_id}.jpg", seed=message_id)
+    db.add_all([
+        MediaFile(channel_name='channel_a', message_id=1, content_hash='h1'),
+        MediaFile(channel_name='channel_a', message_id=2, content_hash='h1'),
+        MediaFile(channel_name='channel_b', message_id=9, content_hash='h3'),
+        ImageDetection(channel_name='channel_b', message_id=9, content_hash='h3',
+                       image_category='lifestyle', detected_objects='[]', object_count=1),
+        MediaFile(channel_name='channel_a', message_id=3, content_hash='h3'),
+    ])
+    db.commit()
+
+    model = StubModel()
+    assert detect(db, images_dir, model) == 3
+    # 1 and 2 share their bytes and 3 is a repost of a scored photo: one image to score
+    assert model.images == 1
+    categories = dict(db.query(ImageDetection.message_id, ImageDetection.image_category)
+                      .filter_by(channel_name='channel_a'))
+    assert categories == {1: 'product_display', 2: 'product_display', 3: 'lifestyle'}
+
+
+def test_unreadable_photos_are_recorded_once(db, tmp_path):
+    images_dir = tmp_path / 'images'
+    write_jpeg(images_dir / 'channel_a' / '1.jpg', seed=1)
+    (images_dir / 'channel_a' / '2.jpg').write_bytes(b'not a jpeg')
+
+    model = StubModel()
+    assert detect(db, images_dir, model) == 2
+    row = db.query(ImageDetection).filter_by(message_id=2).one()
+    assert (row.image_category, row.object_count) == ('unreadable', 0)
+
+    # Nothing left to decode or score on the next run
+    assert detect(db, images_dir, model) == 0
+    assert model.images == 1
+
+
+def test_collected_rows_are_written_later(db, tmp_path):
+    images_dir = tmp_path / 'images'
+    write_jpeg(images_dir / 'channel_a' / '1.jpg', seed=1)
+
+    detector = ImageDetector(db, model=StubModel(), workers=1, images_dir=images_dir, collect=True)
+    assert detector.run() == 1
+    assert db.query(ImageDetection).count() == 0
+    write_detections(db, detector.rows)
+    assert db.query(ImageDetection.image_category).scalar() == 'product_display'
@@ -0,0 +1,26 @@
+# test_media_pipeline.py - Background photo downloads
+import asyncio
+
+from telethon.tl.types import MessageMediaPhoto, PhotoEmpty
+
+from fake_telegram import FakeTelegramClient
+from media_pipeline import MediaDownloader, has_photo
+
+
+def test_expired_photos_are_not_downloaded(tmp_path):
+    client = FakeTelegramClient({'channel_a': 6}, photo_ratio=1.0)
+
+    async def run():
+        entity = await client.get_entity('channel_a')
+        messages = [message async for message in client.iter_messages(entity)]
+        # Expired / self-destructed photos: no photo, or an empty one
+        messages[0].media = MessageMediaPhoto(photo=None)
+        messages[1].media = MessageMediaPhoto(photo=PhotoEmpty(id=1))
+        async with MediaDownloader(client, images_dir=tmp_path) as downloader:
+            futures = [await downloader.submit(message, 'channel_a') for message in messages]
+        return messages, [future.result() for future in futures]
+
+    messages, paths = asyncio.run(run())
+    assert [has_photo(message) for message in messages] == [False, False, True, True, True, True]
+    assert paths[:2] == [None, None]
+    assert all(path is not None and path.exists() for path in paths[2:])
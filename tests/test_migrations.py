@@ -0,0 +1,85 @@
+# test_migrations.py - Upgrading a warehouse created before the migrations existed
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, ChannelInfo, make_engine
+from migrations import MIGRATIONS, apply_migrations
+
+# Schema of the original models, before any migration
+BASELINE_SCHEMA = [
+    """CREATE TABLE telegram_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, message_id BIGINT NOT NULL,
+        channel_name VARCHAR(255) NOT NULL, channel_title VARCHAR(255), message_text TEXT,
+        sender_id BIGINT, views INTEGER, forwards INTEGER, date DATETIME, scraped_at DATETIME
+    )""",
+    """CREATE TABLE channels (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, channel_name VARCHAR(255) NOT NULL UNIQUE,
+        channel_title VARCHAR(255), telegram_id BIGINT UNIQUE, description TEXT,
+        participant_count INTEGER, is_active INTEGER, last_scraped DATETIME, created_at DATETIME
+    )""",
+]
+
+MESSAGES = [
+    # (message_id, channel_name, message_text, views, date); message 1 was stored twice
+    (1, 'channel_a', 'paracetamol 500mg', 10, '2026-01-01 09:15:00.000000'),
+    (1, 'channel_a', 'paracetamol 500mg', 10, '2026-01-01 09:15:00.000000'),
+    (2, 'channel_a', 'vitamin c', 5, '2026-01-01 17:40:00.000000'),
+    (3, 'channel_a', 'ibuprofen tablets', 7, '2026-01-02 08:00:00.000000'),
+    (1, 'channel_b', 'paracetamol syrup', 1, '2026-01-02 12:30:00.000000'),
+]
+
+
+def baseline_warehouse(path):
+    engine = make_engine(path, 'ingest')
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO channels (channel_name, channel_title) VALUES ('channel_a', 'A')"))
+        connection.execute(
+            text("INSERT INTO telegram_messages (message_id, channel_name, message_text, views, forwards, date) "
+                 "VALUES (:message_id, :channel_name, :message_text, :views, 0, :date)"),
+            [dict(zip(['message_id', 'channel_name', 'message_text', 'views', 'date'], row)) for row in MESSAGES],
+        )
+    return engine
+
+
+def test_baseline_warehouse_is_migrated(tmp_path):
+    engine = baseline_warehouse(tmp_path / 'warehouse.db')
+    # As create_tables() does: new tables from the models, then the migrations
+    Base.metadata.create_all(engine)
+    assert apply_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+
+    columns = {column['name'] for column in inspect(engine).get_columns('channels')}
+    assert {'last_message_id', 'access_hash', 'resolved_at'} <= columns
+    indexes = {index['name'] for index in inspect(engine).get_indexes('telegram_messages')}
+    assert {'ux_telegram_messages_channel_message', 'ix_telegram_messages_date'} <= indexes
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM telegram_messages")).scalar() == 4
+        # Messages stored before the search index existed are indexed too
+        found = connection.execute(text(
+            "SELECT m.channel_name, m.message_id FROM telegram_messages_fts "
+            "JOIN telegram_messages m ON m.id = telegram_messages_fts.rowid "
+            "WHERE telegram_messages_fts MATCH 'paracetamol' ORDER BY m.channel_name"
+        )).fetchall()
+        assert found == [('channel_a', 1), ('channel_b', 1)]
+        daily = connection.execute(text(
+            "SELECT channel_name, day, message_count, total_views FROM channel_activity_daily "
+            "ORDER BY channel_name, day"
+        )).fetchall()
+        assert daily == [('channel_a', '2026-01-01', 2, 15), ('channel_a', '2026-01-02', 1, 7),
+                         ('channel_b', '2026-01-02', 1, 1)]
+
+    # The models read the migrated tables
+    with Session(engine) as db:
+        assert db.query(ChannelInfo).one().last_message_id is None
+
+    assert apply_migrations(engine) == []
+    engine.dispose()
+
+
+def test_fresh_warehouse_records_every_migration(warehouse):
+    with warehouse.connect() as connection:
+        versions = connection.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars()
+        assert list(versions) == [version for version, _, _ in MIGRATIONS]
+    assert apply_migrations(warehouse) == []
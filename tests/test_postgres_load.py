@@ -0,0 +1,62 @@
+# test_postgres_load.py - DATABASE_URL engines and the COPY load path
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.orm import Session
+
+from database_sqlite import Base, make_warehouse_engine
+from ingest import CopyMessageWriter, make_message_writer
+from message_record import MessageRecord
+from migrations import apply_migrations
+
+
+def test_warehouse_engine_follows_the_url(tmp_path):
+    sqlite = make_warehouse_engine(f"sqlite:///{tmp_path / 'warehouse.db'}")
+    assert sqlite.dialect.name == 'sqlite'
+    assert sqlite.url.database == str(tmp_path / 'warehouse.db')
+    for url in ("postgresql://u:p@db/warehouse", "postgres://u:p@db/warehouse"):
+        postgres = make_warehouse_engine(url)
+        assert postgres.url.drivername == 'postgresql+psycopg2'
+        assert postgres.url.database == 'warehouse'
+
+
+@pytest.fixture(scope='module')
+def postgres(tmp_path_factory):
+    """Engine on a throwaway local Postgres, skipped without the pgserver package"""
+    pgserver = pytest.importorskip('pgserver')
+    server = pgserver.get_server(tmp_path_factory.mktemp('postgres'), cleanup_mode='stop')
+    engine = create_engine(make_url(server.get_uri()).set(drivername='postgresql+psycopg2'))
+    Base.metadata.create_all(engine)
+    apply_migrations(engine)
+    yield engine
+    engine.dispose()
+    server.cleanup()
+
+
+def records(ids, day=datetime(2026, 1, 1)):
+    return [MessageRecord(message_id, 'channel_a', message_text=f"message {message_id}", views=10,
+                          forwards=1, date=day + timedelta(minutes=message_id))
+            for message_id in ids]
+
+
+def test_copy_writer_skips_stored_messages(postgres):
+    with Session(postgres) as db:
+        writer = make_message_writer(db, 'channel_a', batch_size=40)
+        assert isinstance(writer, CopyMessageWriter)
+        for record in records(range(1, 101)):
+            writer.add(record)
+        assert writer.close() == 100
+
+        # A rerun over an overlapping range only adds the new messages
+        writer = make_message_writer(db, 'channel_a', batch_size=40)
+        for record in records(range(51, 151)):
+            writer.add(record)
+        assert writer.close() == 50
+
+        assert db.execute(text("SELECT COUNT(DISTINCT message_id) FROM telegram_messages")).scalar() == 150
+        assert db.execute(text(
+            "SELECT message_count, total_views FROM channel_activity_daily WHERE channel_name = 'channel_a'"
+        )).one() == (150, 1500)
+        # Both loads bumped the version the API cache keys on
+        assert db.execute(text("SELECT version FROM data_version")).scalar() >= 2
@@ -0,0 +1,79 @@
+# test_search.py - Ranked full-text search and its cursor
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conftest import add_messages
+from database import make_async_engine
+from search import search_messages
+
+
+def matching_texts(count):
+    """Texts that all match "paracetamol", with varied scores, between non-matching ones"""
+    texts = []
+    for i in range(count):
+        texts.append("paracetamol " * (1 + i % 5) + f"batch {i}")
+        texts.append(f"vitamin c offer {i}")
+    return texts
+
+
+async def all_pages(engine, query, limit, candidates, during_paging=None, **filters):
+    """Follow next_cursor to the end; returns the pages' row lists"""
+    pages = []
+    cursor = None
+    async with AsyncSession(engine) as db:
+        while True:
+            rows, cursor = await search_messages(db, query, limit=limit, cursor=cursor,
+                                                 candidates=candidates, **filters)
+            pages.append(rows)
+            if during_paging and len(pages) == 1:
+                during_paging()
+            if cursor is None:
+                return pages
+
+
+def run_search(warehouse, *args, **kwargs):
+    engine = make_async_engine(warehouse.url.render_as_string())
+
+    async def run():
+        try:
+            return await all_pages(engine, *args, **kwargs)
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('limit, candidates', [(37, 70), (20, 20), (100, 2000)])
+def test_paging_returns_every_match_once(warehouse, limit, candidates):
+    add_messages(warehouse, matching_texts(250))
+    add_messages(warehouse, matching_texts(250), channel_name='channel_b')
+
+    pages = run_search(warehouse, "paracetamol", limit, candidates)
+    ids = [row.id for rows in pages for row in rows]
+    assert len(ids) == len(set(ids)) == 500
+    assert all(len(rows) == limit for rows in pages[:-1])
+    assert all("paracetamol" in row.message_text for rows in pages for row in rows)
+
+
+def test_filters_and_new_messages_while_paging(warehouse):
+    add_messages(warehouse, matching_texts(250))
+    add_messages(warehouse, matching_texts(250), channel_name='channel_b')
+
+    # Messages stored after the first page are not mixed into later pages
+    pages = run_search(warehouse, "paracetamol", 37, 70, channel='channel_b',
+                       date_from=datetime(2026, 1, 5),
+                       during_paging=lambda: add_messages(warehouse, matching_texts(50), 'channel_b'))
+    rows = [row for page in pages for row in page]
+    # Matches have the odd message ids, posted hourly: 2026-01-05 starts at id 96
+    assert sorted(row.message_id for row in rows) == list(range(97, 500, 2))
+    assert {row.channel_name for row in rows} == {'channel_b'}
+
+
+def test_invalid_cursor_is_a_client_error(api, warehouse):
+    add_messages(warehouse, ["paracetamol 500mg"] * 3)
+    for cursor in ("garbage", "bm90IGpzb24=", "WzEsMl0=", "WzEsMiwtMV0=", "WyJ4IiwyLDNd"):
+        response = api.get("/api/search/messages", params={"query": "paracetamol", "cursor": cursor})
+        assert response.status_code == 400, cursor
+        assert response.json() == {"detail": "invalid cursor"}